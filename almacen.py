@@ -0,0 +1,96 @@
+# Almacén de sesión en el servidor
+#
+# La cookie de Flask solo lleva un identificador de sesión; `datos` y `resultados` se
+# guardan aquí. Los valores se guardan serializados con pickle, de modo que cada lectura
+# devuelve una copia independiente (igual que al leer la cookie).
+#
+# AlmacenMemoria vive en un solo proceso: con varios workers cada uno tendría sus propias
+# sesiones y una petición atendida por otro worker no encontraría los datos del paso
+# anterior. En esos despliegues se debe usar ALMACEN_SESION=sqlite:<ruta>.
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class AlmacenMemoria:
+    """Almacén LRU en la memoria del proceso. Conserva las `max_sesiones` más recientes."""
+
+    def __init__(self, max_sesiones=1000):
+        self.max_sesiones = max_sesiones
+        self._sesiones = OrderedDict()
+        self._lock = threading.Lock()
+
+    def leer(self, sid, clave):
+        with self._lock:
+            sesion = self._sesiones.get(sid)
+            if sesion is None or clave not in sesion:
+                return None
+            self._sesiones.move_to_end(sid)
+            valor = sesion[clave]
+        return pickle.loads(valor)
+
+    def guardar(self, sid, clave, valor):
+        """Guarda el valor y devuelve su tamaño serializado en bytes."""
+        valor = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._sesiones.setdefault(sid, {})[clave] = valor
+            self._sesiones.move_to_end(sid)
+            while len(self._sesiones) > self.max_sesiones:
+                self._sesiones.popitem(last=False)
+        return len(valor)
+
+
+class AlmacenSQLite:
+    """Almacén en un archivo SQLite, compartido entre procesos. Descarta sesiones sin uso por más de `ttl` segundos."""
+
+    def __init__(self, ruta, ttl=7 * 24 * 3600):
+        self.ruta = ruta
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._conexion() as con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS sesiones ("
+                "sid TEXT, clave TEXT, valor BLOB, actualizado REAL, PRIMARY KEY (sid, clave))"
+            )
+            con.execute("CREATE INDEX IF NOT EXISTS idx_actualizado ON sesiones (actualizado)")
+
+    def _conexion(self):
+        # Una conexión por hilo
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.ruta, timeout=10)
+            con.execute("PRAGMA journal_mode=WAL")
+            self._local.con = con
+        return con
+
+    def leer(self, sid, clave):
+        fila = self._conexion().execute(
+            "SELECT valor FROM sesiones WHERE sid = ? AND clave = ?", (sid, clave)
+        ).fetchone()
+        return pickle.loads(fila[0]) if fila else None
+
+    def guardar(self, sid, clave, valor):
+        """Guarda el valor y devuelve su tamaño serializado en bytes."""
+        ahora = time.time()
+        valor = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._conexion() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO sesiones (sid, clave, valor, actualizado) VALUES (?, ?, ?, ?)",
+                (sid, clave, valor, ahora),
+            )
+            con.execute("DELETE FROM sesiones WHERE actualizado < ?", (ahora - self.ttl,))
+        return len(valor)
+
+
+def crear_almacen(config=None):
+    """Crea el almacén según ALMACEN_SESION: "memoria" (por defecto, un solo proceso) o "sqlite:<ruta>" (varios procesos)."""
+    config = config or os.environ.get("ALMACEN_SESION", "memoria")
+    if config.startswith("sqlite:"):
+        return AlmacenSQLite(config[len("sqlite:"):])
+    if config == "memoria":
+        return AlmacenMemoria(int(os.environ.get("ALMACEN_MAX_SESIONES", 1000)))
+    raise ValueError(f"Almacén de sesión desconocido: {config}")
@@ -1,19 +1,80 @@
 # Proyecto Flask: proyección poblacional con 4 datos y 3 tipos de proyección
 
 
-import pandas as pd
 import numpy as np
-from scipy.stats import gmean
-from flask import Flask, render_template, request, session, redirect, url_for
-import math
+from flask import Flask, render_template, request, session, redirect, url_for, jsonify, send_file, g, Response, before_render_template, template_rendered
 import os
 import logging
-import pprint
+import uuid
+import io
+import hashlib
+import time
+import cProfile
+import tempfile
+from cache import CacheResultados, calcular_resultados_con_cache, huella_entrada
+from lote import RANGOS, evaluar_lote, fila_a_json
+from almacen import crear_almacen
+from distritos import IndiceDistritos
+from incremental import EvaluadorIncremental
+from importacion import importar_tablas
+from exportacion import EscritorResultados, parquet_disponible
+from reportes import FORMATOS as FORMATOS_REPORTE, reporte as generar_reporte
+from escenarios import barrer, matriz_aulas, rango, tornado
+from simulacion import simular
+from referencia import referencia
+from trabajos import ColaTrabajos
+from proyeccion import entrada_desde_datos
+from metricas import Metricas
+from modelo import Resultados, TablaEdadAnio
+from niveles import NIVELES, edades_de_niveles, niveles_de
+from registro import configurar_registro, registrar, resumen_datos, resumen_resultados
 
 
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", "322ss11aAZ2S2sss")
+# datos y resultados se guardan en el servidor; la cookie solo lleva el id de sesión.
+# Con varios procesos (gunicorn -w N) usar ALMACEN_SESION=sqlite:<ruta>: la memoria no se comparte.
+almacen = crear_almacen()
+# Resultados ya calculados, indexados por la huella de las entradas
+cache_resultados = CacheResultados(
+    max_entradas=int(os.environ.get("CACHE_MAX_ENTRADAS", 512)),
+    ttl=float(os.environ.get("CACHE_TTL", 3600)),
+)
+# Bandas de la simulación de Monte Carlo, aparte para no desplazar resultados del cache anterior
+cache_simulaciones = CacheResultados(
+    max_entradas=int(os.environ.get("CACHE_SIMULACIONES_MAX", 64)),
+    ttl=float(os.environ.get("CACHE_TTL", 3600)),
+)
+# Series precalculadas por distrito, compartidas entre colegios del mismo distrito
+indice_distritos = IndiceDistritos()
+# Tasas de crecimiento de referencia por ubigeo (se cargan una vez, solo lectura)
+tabla_referencia = referencia()
+# Último cálculo de cada sesión: al editar un valor solo se recalculan las etapas afectadas
+evaluador_incremental = EvaluadorIncremental(int(os.environ.get("ALMACEN_MAX_SESIONES", 256)))
+# Tiempos por tramo y por petición (expuestos en /metrics)
+metricas = Metricas()
+# Exportación a Parquet solo si pyarrow está instalado (dependencia opcional)
+PARQUET_DISPONIBLE = parquet_disponible()
+# Perfilado opcional por petición con el encabezado X-Perfilar (solo si PERFILADO=1)
+PERFILADO = os.environ.get("PERFILADO") == "1"
+PERFILES_DIR = os.environ.get("PERFILES_DIR", os.path.join(tempfile.gettempdir(), "perfiles_demanda"))
+# Procesos para la simulación de Monte Carlo (sin valor, en el mismo proceso)
+SIMULACION_WORKERS = int(os.environ.get("SIMULACION_WORKERS", 0))
+MAX_MUESTRAS = 100_000
+# Cola de trabajos largos (lotes, simulaciones, barridos) fuera de la petición
+cola_trabajos = ColaTrabajos(
+    os.environ.get("TRABAJOS_DIR"),
+    hilos=int(os.environ.get("TRABAJOS_HILOS", 1)),
+    ttl=float(os.environ.get("TRABAJOS_TTL", 24 * 3600)),
+    plazo=float(os.environ.get("TRABAJOS_PLAZO", 300)),
+)
+# Los despachadores arrancan con la aplicación: los trabajos pendientes de un proceso
+# anterior se atienden sin esperar a que alguien encole uno nuevo
+cola_trabajos.iniciar()
+TRABAJOS_WORKERS = int(os.environ.get("TRABAJOS_WORKERS", 0)) or None
+# Registro estructurado en JSON (LOG_NIVEL, LOG_MUESTREO)
+configurar_registro()
 """
 
 # NOTAS DE APRENDIZAJE
@@ -39,15 +100,114 @@ def to_int(val):
     except (TypeError, ValueError):
         return 0
 
+def id_sesion():
+    if "sid" not in session:
+        session["sid"] = uuid.uuid4().hex
+    return session["sid"]
+
+def leer_sesion(clave, defecto=None):
+    with metricas.tramo("sesion_leer"):
+        valor = almacen.leer(id_sesion(), clave)
+    return defecto if valor is None else valor
+
+def guardar_sesion(clave, valor):
+    with metricas.tramo("sesion_guardar"):
+        tamanio = almacen.guardar(id_sesion(), clave, valor)
+    metricas.fijar("demanda_sesion_bytes", tamanio, "Tamaño serializado del último valor guardado en la sesión", clave=clave)
+
+def normalizar_tablas(datos):
+    # Las tablas se guardan como TablaEdadAnio (ya validadas); solo las sesiones antiguas
+    # o los datos importados traen diccionarios, que se convierten una vez
+    with metricas.tramo("normalizar_tablas"):
+        for tabla in ("dic_pop_edad", "dic_mat_by_anio", "dic_no_promv"):
+            if isinstance(datos.get(tabla), dict):
+                datos[tabla] = TablaEdadAnio.desde_dict(datos[tabla])
+
+def asignar_tasa_referencia(datos):
+    # Tasa de crecimiento de la tabla de referencia (respaldo si falta un censo)
+    datos["tasa_referencia"] = tabla_referencia.tasa(datos.get("ubigeo"), datos.get("departamento"))
+
+def campos_desde_archivo(archivo):
+    # Convierte las tablas de un CSV/Parquet en los campos del formulario de paso2
+    tablas = importar_tablas(archivo)
+    if len(tablas) != 1:
+        raise ValueError("El archivo debe contener los datos de un solo proyecto.")
+    prefijos = {"dic_pop_edad": "pop_edad", "dic_mat_by_anio": "matricula", "dic_no_promv": "noprom"}
+    campos = {}
+    for tabla, filas in next(iter(tablas.values())).items():
+        for anio, fila in filas.items():
+            for edad, valor in fila.items():
+                campos[f"{prefijos[tabla]}_{anio}_{edad}"] = valor
+    return campos
+
+
+# ##################################
+# INSTRUMENTACIÓN
+# ##################################
+@app.before_request
+def iniciar_medicion():
+    g.inicio_peticion = time.perf_counter()
+    g.perfil = None
+    if PERFILADO and request.headers.get("X-Perfilar"):
+        g.perfil = cProfile.Profile()
+        g.perfil.enable()
+
+@app.after_request
+def registrar_medicion(respuesta):
+    ruta = request.endpoint or "desconocida"
+    duracion = time.perf_counter() - g.inicio_peticion
+    metricas.observar("demanda_peticion_segundos", duracion,
+                      "Duración de las peticiones", ruta=ruta, metodo=request.method)
+    metricas.incrementar("demanda_peticiones_total", 1, "Peticiones atendidas", ruta=ruta, estado=respuesta.status_code)
+    registrar(logging.INFO, "peticion", lambda: {"ruta": ruta, "metodo": request.method, "estado": respuesta.status_code,
+                                                 "duracion_ms": round(duracion * 1000, 2)}, muestrear=True)
+    if g.get("perfil") is not None:
+        g.perfil.disable()
+        os.makedirs(PERFILES_DIR, exist_ok=True)
+        ruta_perfil = os.path.join(PERFILES_DIR, f"{ruta}_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}.prof")
+        g.perfil.dump_stats(ruta_perfil)
+        respuesta.headers["X-Perfil"] = os.path.basename(ruta_perfil)
+    return respuesta
+
+# Tiempo de render de plantillas (señales de Flask)
+def _inicio_render(sender, template, context, **extra):
+    g.inicio_render = time.perf_counter()
+
+def _fin_render(sender, template, context, **extra):
+    if "inicio_render" in g:
+        metricas.observar("demanda_tramo_segundos", time.perf_counter() - g.inicio_render,
+                          "Duración de cada tramo del cálculo", tramo="render")
+
+before_render_template.connect(_inicio_render, app)
+template_rendered.connect(_fin_render, app)
+
+@app.route("/metrics")
+def metrics():
+    for nombre, valor in cache_resultados.estadisticas().items():
+        metricas.fijar("demanda_cache_resultados", valor, "Estado del cache de resultados", campo=nombre)
+    for nombre, valor in cache_simulaciones.estadisticas().items():
+        metricas.fijar("demanda_cache_simulaciones", valor, "Estado del cache de simulaciones", campo=nombre)
+    metricas.fijar("demanda_distritos_aciertos", indice_distritos.aciertos, "Aciertos del índice de distritos")
+    metricas.fijar("demanda_distritos_fallos", indice_distritos.fallos, "Fallos del índice de distritos")
+    metricas.fijar("demanda_etapas_calculadas", evaluador_incremental.etapas_calculadas, "Etapas del motor recalculadas")
+    metricas.fijar("demanda_etapas_reutilizadas", evaluador_incremental.etapas_reutilizadas, "Etapas del motor reutilizadas del cálculo anterior de la sesión")
+    return Response(metricas.exponer(), mimetype="text/plain; version=0.0.4")
+
+# Valor que toma un campo de paso1 fuera de rango
+DEFECTOS_PASO1 = {
+    "radio_influencia": 3, "area_distrito": 77.7, "est_by_aula": 30, "anio_form": 2024,
+    "cantidad_anios_matricula": 5, "anio_censo1": 2007, "anio_censo2": 2017, "turnos": 2,
+}
 
 # Paso 1: DATOS GENERALES
 @app.route("/", methods=["GET", "POST"])
 def paso1():
     error = None
-    datos = session.get('datos', {
+    datos = leer_sesion('datos', {
         'nombre_proyecto': 'Colegio XYZ',
         'nombre_colegio': 'Mejoramiento y Ampliación del Colegio XYZ',
         'distrito': 'CHAcla',
+        'ubigeo': '',
         'nivel': 'Secundaria',
         'radio_influencia': 3,
         'area_distrito': 77.72,
@@ -86,9 +246,9 @@ def paso1():
     default_dicts = {
         "pob_censo1": pop_censo1_default,
         "pob_censo2": pop_censo2_default,
-        "dic_mat_by_anio": dic_mat_by_anio_default,
-        "dic_pop_edad": dic_pop_edad_default,
-        "dic_no_promv": dic_no_promv_default
+        "dic_mat_by_anio": TablaEdadAnio.desde_dict(dic_mat_by_anio_default),
+        "dic_pop_edad": TablaEdadAnio.desde_dict(dic_pop_edad_default),
+        "dic_no_promv": TablaEdadAnio.desde_dict(dic_no_promv_default)
     }
 
     # Asignar valores por defecto solo si faltan
@@ -98,7 +258,7 @@ def paso1():
             datos[key] = default_value
             asignado_defecto = True
     if asignado_defecto:
-        session["datos"] = datos
+        guardar_sesion("datos", datos)
 
     if request.method == 'POST':
         # Actualizar datos con lo enviado por el usuario
@@ -106,8 +266,18 @@ def paso1():
             if campo in request.form:
                 datos[campo] = request.form.get(campo, "")
 
-        # Edades según nivel
-        datos["edades"] = list(range(6, 12)) if datos.get("nivel") == "Primaria" else list(range(12, 17))
+        # Ubigeo opcional (código INEI del departamento, provincia o distrito)
+        datos["ubigeo"] = request.form.get("ubigeo", datos.get("ubigeo", "")).strip()
+        if datos["ubigeo"] and not (datos["ubigeo"].isdigit() and len(datos["ubigeo"]) in (2, 4, 6)):
+            error = "El ubigeo debe tener 2, 4 o 6 dígitos."
+            datos["ubigeo"] = ""
+
+        # Edades según nivel; varios niveles consecutivos se calculan juntos (eje de edades concatenado)
+        try:
+            datos["edades"] = edades_de_niveles(niveles_de(datos))
+        except ValueError as e:
+            error = str(e)
+            datos["edades"] = list(NIVELES["Secundaria"])
 
         # Validaciones y conversiones
         def validar_rango(valor, tipo, minv, maxv, defecto, mensaje):
@@ -118,11 +288,9 @@ def paso1():
                 return defecto          # Devuelve el valor por defecto si está fuera de rango
             return v                    # Si está bien, devuelve el valor convertido
 
-        datos["radio_influencia"] = validar_rango(datos["radio_influencia"], to_float, 0.97, 117, 3, "El radio de influencia debe estar entre 0.97 y 117 km.")
-        datos["area_distrito"] = validar_rango(datos["area_distrito"], to_float, 3, 42298, 77.7, "El área del distrito debe estar entre 3 y 42298 km².")
-        datos["est_by_aula"] = validar_rango(datos["est_by_aula"], to_float, 5, 50, 30, "El número de estudiantes por aula debe estar entre 5 y 50.")
-        datos["anio_form"] = validar_rango(datos["anio_form"], to_int, 2017, 2035, 2024, "El año de formulación debe estar entre 2017 y 2035.")
-        datos["cantidad_anios_matricula"] = validar_rango(datos["cantidad_anios_matricula"], to_int, 1, 10, 5, "La cantidad de años de matrícula debe estar entre 1 y 10.")
+        # Rangos compartidos con la evaluación en lote (lote.RANGOS)
+        for campo, tipo, minv, maxv, mensaje in RANGOS:
+            datos[campo] = validar_rango(datos[campo], to_int if tipo is int else to_float, minv, maxv, DEFECTOS_PASO1[campo], mensaje)
         datos["anio_i"] = to_int(datos["anio_i"])
         datos["anio_f"] = to_int(datos["anio_f"])
         if not (datos["anio_form"] < datos["anio_i"] < datos["anio_f"]):
@@ -131,9 +299,6 @@ def paso1():
         if not (datos["anio_form"] < datos["anio_f"]):
             error = "El año final debe ser mayor al año de formulación."
             datos["anio_f"] = datos["anio_i"] + 9
-        datos["anio_censo1"] = validar_rango(datos["anio_censo1"], to_int, 2007, 2100, 2007, "El primer año de censo debe ser mayor o igual a 2007.")
-        datos["anio_censo2"] = validar_rango(datos["anio_censo2"], to_int, 2017, 2100, 2017, "El segundo año de censo debe ser mayor o igual a 2017.")
-        datos["turnos"] = validar_rango(datos["turnos"], to_int, 1, 4, 2, "La cantidad de turnos debe estar entre 1 y 4.")
 
         # Variables derivadas
         anios_hist = list(range(datos["anio_form"] - datos["cantidad_anios_matricula"], datos["anio_form"]))
@@ -146,74 +311,59 @@ def paso1():
         if error:
             return render_template("paso1.html", datos=datos, error=error)
         else:
-            session["datos"] = datos
+            guardar_sesion("datos", datos)
 
-    logging.warning("Datos en paso1:\n" + pprint.pformat(datos, indent=3))
+    with metricas.tramo("logging"):
+        registrar(logging.INFO, "paso1", lambda: {"metodo": request.method, "error": error, **resumen_datos(datos)}, muestrear=True)
+        registrar(logging.DEBUG, "paso1.datos", lambda: {"datos": datos})
     return render_template("paso1.html", datos=datos, error=error)
 
 # Paso 2: Población, matrícula y no promovidos
 @app.route("/paso2", methods=["GET", "POST"])
 def paso2():
     error = None
-    datos = session.get('datos', {})
-    # Convertir a int los valores de diccionarios si es que vienen como strings
-    if isinstance(datos.get("dic_pop_edad"), dict):
-        datos["dic_pop_edad"] = {to_int(anio): {to_int(edad): to_int(cant) for edad, cant in edades.items()} for anio, edades in datos["dic_pop_edad"].items()}    
-    if isinstance(datos.get("dic_mat_by_anio"), dict):
-        datos["dic_mat_by_anio"] = {to_int(anio): {to_int(edad): to_int(cant) for edad, cant in edades.items()} for anio, edades in datos["dic_mat_by_anio"].items()}
-    if isinstance(datos.get("dic_no_promv"), dict):
-        datos["dic_no_promv"] = {to_int(anio): {to_int(edad): to_int(cant) for edad, cant in edades.items()} for anio, edades in datos["dic_no_promv"].items()}
+    datos = leer_sesion('datos', {})
+    normalizar_tablas(datos)
 
     if request.method == 'POST':
         # ---------------------------------------------------
+        # Archivo CSV/Parquet opcional: sus celdas reemplazan las del formulario
+        formulario = request.form.to_dict()
+        archivo = request.files.get("archivo_tablas")
+        if archivo and archivo.filename:
+            try:
+                formulario.update(campos_desde_archivo(archivo))
+            except ValueError as e:
+                error = str(e)
+        # ---------------------------------------------------
         # POST para guardar población total del distrito
-        valor = request.form.get("pob_censo1")
+        valor = formulario.get("pob_censo1")
         valor_int = to_int(valor)
         if valor_int <= 0:
             error = "Los valores de población total deben ser positivos. Corrige los datos."
         datos["pob_censo1"] = valor_int
         
-        valor = request.form.get("pob_censo2")
+        valor = formulario.get("pob_censo2")
         valor_int = to_int(valor)
         if valor_int <= 0:
             error = "Los valores de población deben ser positivos."
         datos["pob_censo2"] = valor_int
         # ---------------------------------------------------
-        # POST para guardar población por edades del distrito
-        dic_pop_edad = {}            
-        for anio in [datos['anio_censo1'], datos['anio_censo2']]:
-            dic_pop_edad[int(anio)] = {}
-            for edad in datos.get("edades", []):
-                valor = request.form.get(f'pop_edad_{anio}_{edad}', 0) or 0
-                valor_int = to_int(valor)
-                if valor_int < 0:
-                    error = "No se permiten valores negativos en población por edades. Corrige los datos."
-                dic_pop_edad[int(anio)][int(edad)] = valor_int
-        datos["dic_pop_edad"] = dic_pop_edad
-        # ---------------------------------------------------
-        # POST para guardar datos de matrícula
-        dic_matricula = {}
-        for anio in datos.get("anios_hist", []):
-            dic_matricula[int(anio)] = {}
-            for edad in datos.get("edades", []):
-                valor = request.form.get(f'matricula_{anio}_{edad}', 0) or 0
-                valor_int = to_int(valor)
-                if valor_int < 0:
-                    error = "No se permiten valores negativos en matrícula. Corrige los datos."
-                dic_matricula[int(anio)][int(edad)] = valor_int
-        datos["dic_mat_by_anio"] = dic_matricula
-        # ---------------------------------------------------
-        # POST para guardar datos de no promovidos
-        dic_no_promv = {}
-        for anio in datos.get("anios_hist", []):
-            dic_no_promv[int(anio)] = {}
-            for edad in datos.get("edades", []):
-                valor = request.form.get(f'noprom_{anio}_{edad}', 0) or 0
-                valor_int = to_int(valor)
-                if valor_int < 0:
-                    error = "No se permiten valores negativos en no promovidos. Corrige los datos."
-                dic_no_promv[int(anio)][int(edad)] = valor_int
-        datos["dic_no_promv"] = dic_no_promv
+        # POST para guardar población por edades, matrícula y no promovidos
+        edades = datos.get("edades", [])
+        tablas = (
+            ("dic_pop_edad", "pop_edad", [datos['anio_censo1'], datos['anio_censo2']], "No se permiten valores negativos en población por edades. Corrige los datos."),
+            ("dic_mat_by_anio", "matricula", datos.get("anios_hist", []), "No se permiten valores negativos en matrícula. Corrige los datos."),
+            ("dic_no_promv", "noprom", datos.get("anios_hist", []), "No se permiten valores negativos en no promovidos. Corrige los datos."),
+        )
+        for tabla, prefijo, anios, mensaje in tablas:
+            try:
+                datos[tabla] = TablaEdadAnio.desde_formulario(formulario, prefijo, anios, edades)
+            except ValueError as e:
+                error = str(e)
+                continue
+            if datos[tabla].hay_negativos():
+                error = mensaje
         
         # Si hubo error, NO guardar en sesión y mostrar el mensaje
         if error:
@@ -223,10 +373,12 @@ def paso2():
                 error=error
             )
         else:
-            session["datos"] = datos        
+            guardar_sesion("datos", datos)        
 
     # Mostrar datos
-    logging.warning("Datos en paso2:\n" + pprint.pformat(datos, indent=3)) # Es loging.warning para que se vea en la consola de Heroku. Si se pone después del return no se ve, porque no se ejecuta.
+    with metricas.tramo("logging"):
+        registrar(logging.INFO, "paso2", lambda: {"metodo": request.method, "error": error, **resumen_datos(datos)}, muestrear=True)
+        registrar(logging.DEBUG, "paso2.datos", lambda: {"datos": datos})
     return render_template(
         "paso2.html",
         datos=datos,
@@ -238,259 +390,312 @@ def paso3():
     # ##################################
     # RECUPERAR DATOS DE SESIÓN
     # ##################################    
-    datos = session.get("datos", {})
-    resultados = session.get("resultados", {})
-    # Convertir a int los valores de diccionarios si es que vienen como strings
-    if isinstance(datos.get("dic_pop_edad"), dict):
-        datos["dic_pop_edad"] = {to_int(anio): {to_int(edad): to_int(cant) for edad, cant in edades.items()} for anio, edades in datos["dic_pop_edad"].items()}    
-    if isinstance(datos.get("dic_mat_by_anio"), dict):
-        datos["dic_mat_by_anio"] = {to_int(anio): {to_int(edad): to_int(cant) for edad, cant in edades.items()} for anio, edades in datos["dic_mat_by_anio"].items()}
-    if isinstance(datos.get("dic_no_promv"), dict):
-        datos["dic_no_promv"] = {to_int(anio): {to_int(edad): to_int(cant) for edad, cant in edades.items()} for anio, edades in datos["dic_no_promv"].items()}    
+    datos = leer_sesion("datos", {})
+    # Sesión vacía o perdida (p. ej. expulsada del almacén): se vuelve a empezar
+    if not datos.get("edades") or "anio_form" not in datos:
+        return redirect(url_for("paso1"))
+    normalizar_tablas(datos)
     
+    asignar_tasa_referencia(datos)
     # ##################################
-    # VARIABLES Y PARÁMETROS
-    # ##################################    
-    pob_censo1 = datos.get("pob_censo1", 0) or 0
-    pob_censo2 = datos.get("pob_censo2", 0) or 0
-    anio_censo1 = datos.get("anio_censo1", 2007)
-    anio_censo2 = datos.get("anio_censo2", 2017)
-    anios_hist = datos.get("anios_hist", [])
-    anios_proy = datos.get("anios_proyec", [])
-    anios_total = datos.get("anios_total", [])
-    r = datos.get("radio_influencia", 3)
-    area = datos.get("area_distrito", 77.7) or 1  # Evitar división por cero
-    edades = datos.get("edades", [])
-    dic_pop_edad = datos.get("dic_pop_edad", {})
-    dic_mat_by_anio = datos.get("dic_mat_by_anio", {})
-    dic_no_promv = datos.get("dic_no_promv", {})
-    est_by_aula = datos.get("est_by_aula", 30)
-    turnos = datos.get("turnos", 2)
-    nombre_colegio = datos.get("nombre_colegio", "INSERTAR NOMBRE DEL COLEGIO")
-    nombre_proyecto = datos.get("nombre_proyecto", "INSERTAR NOMBRE DEL PROYECTO")
+    # PROYECCIONES (motor vectorizado, con cache)
     # ##################################
-    # CÁLCULO DE LA POBLACIÓN TOTAL
-    # ##################################
-    # Población de todo el distrito
-    dic_pop_total = {}
-    if pob_censo1 > 0 and pob_censo2 > 0:
-        tasa_poptotal = (pob_censo2 / pob_censo1) ** (1 / (anio_censo2 - anio_censo1)) - 1
-        # Se tasas negativas simpre se ponen en 0
-        if tasa_poptotal < 0:
-            tasa_poptotal = 0
-    else:
-        tasa_poptotal = 0
-        
-    resultados["tasa_poptotal"] = tasa_poptotal
-    for anio in anios_total:
-        if pob_censo2:
-            dic_pop_total[anio] = int(pob_censo2 * (1 + tasa_poptotal) ** (anio - anio_censo2))
-        elif pob_censo1:
-            dic_pop_total[anio] = int(pob_censo1 * (1 + tasa_poptotal) ** (anio - anio_censo1))
-        else:
-            dic_pop_total[anio] = 0
-    resultados["tasa_poptotal"] = tasa_poptotal
-    resultados["dic_pop_total"] = dic_pop_total
-    ###################################
-    # CÁLCULO DE LA POBLACIÓN REFERENCIAL
-    ###################################
-    # Población del área de infuencia de todas las edades
-    dic_pop_ref = {}    
-    for anio in anios_proy:
-        dic_pop_ref[anio] = int((math.pi * (r ** 2) / area) * dic_pop_total[anio])
-    resultados["dic_pop_ref"] = dic_pop_ref
-
-    ###################################
-    # CÁLCULO DE LA POBLACIÓN POTENCIAL
-    ###################################
-    # Población que vive en el área de influencia y del grupo etario normativo
-    tasa_by_edad = {}
-    for edad in edades:
-        a = dic_pop_edad[anio_censo1][edad]
-        b = dic_pop_edad[anio_censo2][edad]
-        if a > 0 and b > 0:
-            tasa = (b / a) ** (1 / (anio_censo2 - anio_censo1)) - 1
-        else:
-            tasa = 0
-        tasa_by_edad[edad] = tasa
-    resultados["tasa_by_edad"] = tasa_by_edad
-
-    dic_pop_potencial = {}
-    for edad in edades:
-        dic_pop_potencial[edad] = {}
-        val_censo1 = dic_pop_edad[anio_censo1][edad]
-        val_censo2 = dic_pop_edad[anio_censo2][edad]
-        if val_censo2 > 0:
-            base = val_censo2
-            anio_base = anio_censo2
-        elif val_censo1 > 0:
-            base = val_censo1
-            anio_base = anio_censo1
-        else:
-            base = 0
-            anio_base = anio_censo2
-        pob_base = base * (math.pi * r**2) / area
-        for anio in anios_total:
-            dic_pop_potencial[edad][anio] = round(pob_base * (1 + tasa_by_edad[edad]) ** (anio - anio_base))
-    resultados["dic_pop_potencial"] = dic_pop_potencial
-    ###################################
-    # CÁLCULO DE LA EFECTIVA SIN PROYECTO
-    ###################################
-    # --- Proporción de matrícula sobre población potencial. Solo primer grado
-    list_tasas_1g = []
-    for anio in anios_hist:
-        mat_1g = dic_mat_by_anio[anio][min(edades)] if dic_mat_by_anio.get(anio) and dic_mat_by_anio[anio].get(min(edades)) else 0
-        pop_1g = dic_pop_potencial[min(edades)][anio] if dic_pop_potencial.get(min(edades)) and dic_pop_potencial[min(edades)].get(anio) else 0
-        if mat_1g > 0:
-            list_tasas_1g.append(mat_1g / pop_1g)
-    if list_tasas_1g:
-        prop_1g = gmean(list_tasas_1g)
-    else: 
-        prop_1g = 0
-    resultados["prop_1g"] = prop_1g
-    resultados["list_tasas_1g"] = list_tasas_1g
-
-    # --- Tasa de transición de matriculla de un grado a otro (un año al siguiente)
-    tasa_transicion = {}
-    for e in edades[1:]:
-        grado_ant = [dic_mat_by_anio[a][e-1] for a in anios_hist[:-1] if dic_mat_by_anio.get(a) and dic_mat_by_anio[a].get(e-1)]
-        grado_post = [dic_mat_by_anio[a + 1][e] for a in anios_hist if dic_mat_by_anio.get(a + 1) and dic_mat_by_anio[a + 1].get(e)]
-        tasa_transicion[e] = gmean([p / m for m, p in zip(grado_ant, grado_post) if m > 0 and p > 0]) if grado_ant and grado_post else 0
-    resultados["tasa_transicion"] = tasa_transicion
-    
-    # --- Proyección de la matrícula efectiva sin proyecto
-    dic_mat_efec_sp = {}
-    anios_proy2 = list(range(datos["anio_form"] - 1, datos["anio_f"] + 1))
-    for e in edades:
-        dic_mat_efec_sp[e] = {}
-        for a in anios_proy2:
-            if a == datos["anio_form"] - 1:
-                dic_mat_efec_sp[e][a] = dic_mat_by_anio[a][e] if dic_mat_by_anio.get(a) and dic_mat_by_anio[a].get(e) else 0
-            elif e == min(edades):
-                dic_mat_efec_sp[e][a] = round(dic_pop_potencial[e][a] * prop_1g) if prop_1g > 0 else 0
-            else:
-                dic_mat_efec_sp[e][a] = round(dic_mat_efec_sp.get(e-1, {}).get(a-1, 0) * tasa_transicion.get(e, 0))
-    resultados["dic_mat_efec_sp"] = dic_mat_efec_sp
-    
-    # --- Proyección de la matrícula efectiva con proyecto
-    
-    # --- Promedio de la tasa de no promovidos sobre la matrícula del primer grado
-    for anio in anios_hist:
-        list_np = [dic_no_promv[anio][min(edades)]  if dic_no_promv.get(anio) and dic_no_promv[anio].get(min(edades)) else 0]
-        list_mat = [dic_mat_by_anio[anio][min(edades)] if dic_mat_by_anio.get(anio) and dic_mat_by_anio[anio].get(min(edades)) else 0]
-        list_divs = [n / m for n, m in zip(list_np, list_mat) if m > 0]
-    prop_np_1g = gmean(list_divs) if list_divs else 0
-    tasas_cp = {}
-    for e in edades:
-        if e == min(edades):
-            tasas_cp[e] = prop_1g * (prop_np_1g + 1)
-        else:
-            tasas_cp[e] = tasa_transicion[e] if tasa_transicion[e] > 1 else 1
-    resultados["tasas_cp"] = tasas_cp
-
-    # # --- Proyección
-    dic_mat_efec_cp = {}
-    for e in edades:
-        dic_mat_efec_cp[e] = {}
-        for a in anios_proy2:
-            if a == datos["anio_form"] - 1:
-                dic_mat_efec_cp[e][a] = dic_mat_by_anio[a][e] if dic_mat_by_anio.get(a) and dic_mat_by_anio[a].get(e) else 0
-            elif e == min(edades):
-                dic_mat_efec_cp[e][a] = round(dic_pop_potencial[e][a] * tasas_cp[e]) if tasas_cp[e] > 0 else 0
-            else:
-                dic_mat_efec_cp[e][a] = round(dic_mat_efec_cp.get(e-1, {}).get(a-1, 0) * tasas_cp.get(e, 0))
-    resultados["dic_mat_efec_cp"] = dic_mat_efec_cp
-    
-    ## Cálculo de aulas por edad y por turno
-    aulas_by_edad = {}
-    for e in edades:
-        max_aulas = max([math.ceil(dic_mat_efec_cp[e][a] / est_by_aula) for a in anios_proy2]) if est_by_aula > 0 else 0 # Redondeado al entero superior
-        aulas_by_edad[e] = {
-            'secciones_total': math.ceil(max_aulas),
-            'aulas_necesarias': (max_aulas // turnos) + (max_aulas % turnos)
-        }
-    resultados["aulas_by_edad"] = aulas_by_edad
-    ##################################
-    # ADAPTACIONES PARA EL RENDER
-    ##################################
-    # Tasa de crecimiento poblacional del distrito
-    tasa_poptotal = resultados.get("tasa_poptotal", 0)
-    tic_dist_by_dep = {
-        'AMAZONAS': {'tic_dist': 0.0024458725302197804},
-        'ANCASH': {'tic_dist': -0.009722077727700852},
-        'APURIMAC': {'tic_dist': -0.010176041095758207},
-        'AREQUIPA': {'tic_dist': 0.002698241495252799},
-        'AYACUCHO': {'tic_dist': -0.01915314237340786},
-        'CAJAMARCA': {'tic_dist': -0.007530965006825317},
-        'CALLAO': {'tic_dist': 0.007068794294313888},
-        'CUSCO': {'tic_dist': -6.320814722067003e-05},
-        'HUANCAVELICA': {'tic_dist': -0.027428666320475928},
-        'HUANUCO': {'tic_dist': -0.02378710461378163},
-        'ICA': {'tic_dist': 0.021343104369419066},
-        'JUNIN': {'tic_dist': -0.005575224112039148},
-        'LA LIBERTAD': {'tic_dist': 0.0020484522421301823},
-        'LAMBAYEQUE': {'tic_dist': 0.01155271401947159},
-        'LIMA': {'tic_dist': -0.000993094165232594},
-        'LORETO': {'tic_dist': 0.001119823964029474},
-        'MADRE DE DIOS': {'tic_dist': 0.03184191249719129},
-        'MOQUEGUA': {'tic_dist': -0.020255832081772174},
-        'PASCO': {'tic_dist': -0.013286263519479721},
-        'PIURA': {'tic_dist': 0.0050009478848328705},
-        'PUNO': {'tic_dist': -0.015083404010697627},
-        'SAN MARTIN': {'tic_dist': 0.012149903727460838},
-        'TACNA': {'tic_dist': -0.006558413043240586},
-        'TUMBES': {'tic_dist': 0.02346913477418145},
-        'UCAYALI': {'tic_dist': 0.0171539403116399}        
-    }
-    tic_dist_by_dep[nombre_colegio.upper()] = {"tic_dist": tasa_poptotal}
-    resultados["area_influencia"] = round(math.pi * r**2, 2)
-    turnos = int(datos.get("turnos", 2))
-    list_turnos = list(range(1, turnos + 1))
-    resultados["list_turnos"] = list_turnos
-    # ##################################
-    # Ordenar los diccionarios 
-    # ##################################
-    # Solo considerar años desde el año de formulación
-    anios_proy3 = list(range(datos["anio_form"], datos["anio_f"] + 1))
-    for edad in edades:
-        resultados["dic_mat_efec_sp"][edad] = {anio: resultados["dic_mat_efec_sp"][edad][anio] for anio in anios_proy3}
-        resultados["dic_mat_efec_cp"][edad] = {anio: resultados["dic_mat_efec_cp"][edad][anio] for anio in anios_proy3}
-        resultados["dic_pop_potencial"][edad] = {anio: resultados["dic_pop_potencial"][edad][anio] for anio in anios_total if anio >= datos["anio_form"]}
-    # Población total y población referencial
-    resultados["dic_pop_total"] = {anio: resultados["dic_pop_total"][anio] for anio in anios_total if anio >= datos["anio_form"]}
-    resultados["dic_pop_ref"] = {anio: resultados["dic_pop_ref"][anio] for anio in anios_proy if anio >= datos["anio_form"]}
-
-    # Obteener el valor mínimo de cada diccionario
-    min_mat_efec_sp = min([v for d in resultados["dic_mat_efec_sp"].values() for v in d.values()])
-    min_mat_efec_cp = min([v for d in resultados["dic_mat_efec_cp"].values() for v in d.values()])
-    min_pop_potencial = min([v for d in resultados["dic_pop_potencial"].values() for v in d.values()])
-    resultados["min_mat_efec_sp"] = min_mat_efec_sp * 0.9
-    resultados["min_mat_efec_cp"] = min_mat_efec_cp * 0.9
-    resultados["min_pop_potencial"] = min_pop_potencial * 0.9
-    
-    # Obtener la suma de valores de cada diccionario por año
-    dicc = ["dic_mat_efec_sp", "dic_mat_efec_cp", "dic_pop_potencial"]
-    for d in dicc:
-        suma_by_anio = {}
-        for anio in anios_proy3:
-            suma_by_anio[anio] = sum([resultados[d][edad][anio] for edad in edades if resultados[d].get(edad) and resultados[d][edad].get(anio)])
-        resultados[f"suma_tot_byaño_{d}"] = suma_by_anio
-    
-    # Máximo valor de las sumas
-    for d in dicc:
-        resultados[f"max_suma_tot_byaño_{d}"] = max(resultados[f"suma_tot_byaño_{d}"].values())
-    
+    try:
+        with metricas.tramo("calculo"):
+            resultados = calcular_resultados_con_cache(datos, cache_resultados, indice_distritos, evaluador_incremental, id_sesion())
+    except ZeroDivisionError as e:
+        # Población potencial nula con matrícula: se corrige en paso2
+        return render_template("paso2.html", datos=datos, error=f"{e} Corrige los datos.")
+    metricas.fijar("demanda_resultados_celdas", sum(len(fila) for tabla in TABLAS_EDAD_ANIO for fila in resultados[tabla].values()),
+                   "Celdas edad×año de los últimos resultados calculados")
 
-            
-    session["datos"] = datos
-    session["resultados"] = resultados
-    logging.warning("Datos en paso3:\n" + pprint.pformat(datos, indent=3))
-    logging.warning("Resultados en paso3:\n" + pprint.pformat(resultados, indent=3))
+    guardar_sesion("datos", datos)
+    guardar_sesion("resultados", resultados)
+    with metricas.tramo("logging"):
+        registrar(logging.INFO, "paso3", lambda: {**resumen_datos(datos), **resumen_resultados(resultados)}, muestrear=True)
+        registrar(logging.DEBUG, "paso3.datos", lambda: {"datos": datos, "resultados": resultados})
     return render_template(
         "paso3.html",
         datos=datos,
-        resultados=resultados
+        resultados=resultados,
+        parquet=PARQUET_DISPONIBLE
+    )
+
+# Exportación de los resultados de la sesión en formato columnar
+@app.route("/exportar/<formato>")
+def exportar(formato):
+    if formato not in ("csv", "parquet"):
+        return "Formato no soportado", 404
+    resultados = leer_sesion("resultados")
+    if not resultados:
+        return redirect(url_for("paso3"))
+    datos = leer_sesion("datos", {})
+    salida = io.BytesIO()
+    try:
+        with EscritorResultados(salida, formato) as escritor:
+            escritor.escribir(datos.get("nombre_proyecto", ""), resultados)
+    except ValueError as e:
+        return str(e), 501
+    salida.seek(0)
+    mimetype = "text/csv" if formato == "csv" else "application/vnd.apache.parquet"
+    return send_file(salida, mimetype=mimetype, as_attachment=True, download_name=f"resultados.{formato}")
+
+# Informe del proyecto (PDF o XLSX) generado en el servidor
+@app.route("/reporte/<formato>")
+def reporte(formato):
+    if formato not in FORMATOS_REPORTE:
+        return "Formato no soportado", 404
+    resultados = leer_sesion("resultados")
+    if not resultados:
+        return redirect(url_for("paso3"))
+    datos = leer_sesion("datos", {})
+    with metricas.tramo("reporte"):
+        contenido = generar_reporte(datos, resultados, formato)
+    return send_file(io.BytesIO(contenido), mimetype=FORMATOS_REPORTE[formato], as_attachment=True, download_name=f"informe.{formato}")
+
+# API de resultados: una tabla en codificación compacta (encabezados + valores planos)
+TABLAS_EDAD_ANIO = ("dic_pop_potencial", "dic_mat_efec_sp", "dic_mat_efec_cp")
+TABLAS_ANIO = ("dic_pop_total", "dic_pop_ref", "suma_tot_byaño_dic_mat_efec_sp", "suma_tot_byaño_dic_mat_efec_cp", "suma_tot_byaño_dic_pop_potencial")
+
+CAMPOS_EDAD_ANIO = {"dic_pop_potencial": "potencial", "dic_mat_efec_sp": "mat_efec_sp", "dic_mat_efec_cp": "mat_efec_cp"}
+
+def tabla_compacta(resultados, tabla):
+    if tabla in TABLAS_EDAD_ANIO and isinstance(resultados, Resultados):
+        # Directo desde la matriz, sin armar los diccionarios
+        matriz = getattr(resultados, CAMPOS_EDAD_ANIO[tabla])
+        return {"edades": list(resultados.edades), "anios": list(resultados.anios), "valores": matriz.ravel().tolist()}
+    if tabla in TABLAS_EDAD_ANIO:
+        filas = resultados[tabla]
+        edades = list(filas)
+        anios = list(filas[edades[0]]) if edades else []
+        return {"edades": edades, "anios": anios, "valores": [filas[e][a] for e in edades for a in anios]}
+    if tabla in TABLAS_ANIO:
+        return {"anios": list(resultados[tabla]), "valores": list(resultados[tabla].values())}
+    if tabla == "aulas_by_nivel" and tabla in resultados:
+        filas = resultados[tabla]
+        turnos = list(resultados["list_turnos"])
+        return {"niveles": list(filas), "turnos": turnos, "valores": [filas[n]["aulas_by_turnos"][t] for n in filas for t in turnos]}
+    if tabla == "aulas_by_edad":
+        columnas = ["secciones_total", "aulas_necesarias"]
+        filas = resultados[tabla]
+        return {"edades": list(filas), "columnas": columnas, "valores": [filas[e][c] for e in filas for c in columnas]}
+    return None
+
+@app.route("/api/resultados/<id_resultados>/<tabla>")
+def api_resultados(id_resultados, tabla):
+    # El id es la huella de las entradas: el contenido de una URL nunca cambia.
+    # Solo se sirven los resultados de la propia sesión (no el cache global, que es de todos)
+    resultados = leer_sesion("resultados")
+    if not isinstance(resultados, Resultados) or resultados.id != id_resultados:
+        return jsonify({"error": "Resultados no encontrados."}), 404
+    datos_tabla = tabla_compacta(resultados, tabla)
+    if datos_tabla is None:
+        return jsonify({"error": f"Tabla desconocida: {tabla}"}), 404
+    respuesta = jsonify(datos_tabla)
+    respuesta.set_etag(hashlib.sha1(f"{id_resultados}-{tabla}".encode()).hexdigest())
+    respuesta.cache_control.private = True
+    respuesta.cache_control.max_age = 3600
+    return respuesta.make_conditional(request)
+
+# Barrido de escenarios: aulas en una grilla de radio × estudiantes por aula × turnos
+def parametros_barrido(formulario, datos):
+    # Rangos del formulario; por defecto, alrededor de los valores del proyecto
+    radio = to_float(datos.get("radio_influencia", 3)) or 3
+    est = to_int(datos.get("est_by_aula", 30)) or 30
+    parametros = {
+        "radio_min": round(radio / 2, 2), "radio_max": round(radio * 2, 2), "radio_pasos": 10,
+        "est_min": max(est - 10, 1), "est_max": est + 10, "est_pasos": 11,
+        "turnos": "1,2,3,4",
+    }
+    parametros.update({k: v for k, v in formulario.items() if k in parametros and str(v).strip()})
+    return parametros
+
+def calcular_barrido(datos, parametros):
+    # Lanza ValueError si los rangos no son válidos
+    try:
+        radios = rango(parametros["radio_min"], parametros["radio_max"], parametros["radio_pasos"])
+        est_by_aula = np.round(rango(parametros["est_min"], parametros["est_max"], parametros["est_pasos"]))
+        turnos = [int(t) for t in str(parametros["turnos"]).replace(";", ",").split(",") if t.strip()]
+    except (TypeError, ValueError):
+        raise ValueError("Los rangos del barrido deben ser numéricos y los turnos una lista separada por comas.")
+    entrada = entrada_desde_datos(datos)
+    distrito = indice_distritos.obtener(entrada, datos.get("distrito"))
+    with metricas.tramo("escenarios"):
+        return barrer(entrada, radios, est_by_aula, turnos, distrito)
+
+def base_barrido(datos):
+    # Valores del proyecto (punto de partida del gráfico de tornado)
+    return {"radio": to_float(datos.get("radio_influencia")), "est_by_aula": to_float(datos.get("est_by_aula")), "turnos": to_int(datos.get("turnos"))}
+
+@app.route("/escenarios", methods=["GET", "POST"])
+def escenarios():
+    datos = leer_sesion("datos", {})
+    if not datos.get("edades"):
+        return redirect(url_for("paso1"))
+    normalizar_tablas(datos)
+    asignar_tasa_referencia(datos)
+    error = None
+    parametros = parametros_barrido(request.form.to_dict() if request.method == "POST" else {}, datos)
+    try:
+        cubo = calcular_barrido(datos, parametros)
+    except ValueError as e:
+        error = str(e)
+        parametros = parametros_barrido({}, datos)
+        cubo = calcular_barrido(datos, parametros)
+    turno = to_int(request.form.get("turno", datos.get("turnos")))
+    if turno not in cubo["turnos"]:
+        turno = cubo["turnos"][0]
+    return render_template(
+        "escenarios.html",
+        datos=datos,
+        parametros=parametros,
+        cubo=cubo,
+        turno=turno,
+        mapa=matriz_aulas(cubo, turno),
+        tornado=tornado(cubo, base_barrido(datos)),
+        error=error
     )
+
+@app.route("/api/escenarios", methods=["POST"])
+def api_escenarios():
+    datos = leer_sesion("datos", {})
+    if not datos.get("edades"):
+        return jsonify({"error": "No hay datos del proyecto en la sesión."}), 400
+    normalizar_tablas(datos)
+    asignar_tasa_referencia(datos)
+    parametros = request.get_json(silent=True)
+    if not isinstance(parametros, dict):
+        return jsonify({"error": "Se esperan los rangos del barrido en formato JSON."}), 400
+    parametros = parametros_barrido(parametros, datos)
+    try:
+        cubo = calcular_barrido(datos, parametros)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({**cubo, "tornado": tornado(cubo, base_barrido(datos))})
+
+# Simulación de Monte Carlo: bandas de percentiles de la matrícula y de las aulas
+def parametros_simulacion(pedido):
+    # (muestras, semilla) de una petición: sin valor, 10 000 muestras y semilla 0; las
+    # muestras se limitan a MAX_MUESTRAS. Lanza ValueError si algún valor no es válido.
+    valores = {"muestras": 10_000, "semilla": 0}
+    for campo in valores:
+        if pedido.get(campo) not in (None, ""):
+            try:
+                valores[campo] = int(pedido.get(campo))
+            except (TypeError, ValueError):
+                raise ValueError(f"{campo} debe ser un número entero.") from None
+    if valores["muestras"] < 1:
+        raise ValueError("La cantidad de muestras debe ser al menos 1.")
+    if valores["semilla"] < 0:
+        raise ValueError("La semilla debe ser un entero no negativo.")
+    return min(valores["muestras"], MAX_MUESTRAS), valores["semilla"]
+
+@app.route("/api/simulacion")
+def api_simulacion():
+    datos = leer_sesion("datos", {})
+    if not datos.get("edades"):
+        return jsonify({"error": "No hay datos del proyecto en la sesión."}), 400
+    normalizar_tablas(datos)
+    asignar_tasa_referencia(datos)
+    try:
+        muestras, semilla = parametros_simulacion(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    entrada = entrada_desde_datos(datos)
+    # Con la misma semilla la simulación es reproducible: se guarda en su propio cache
+    clave = f"{huella_entrada(entrada)}:{muestras}:{semilla}"
+    bandas = cache_simulaciones.obtener(clave)
+    if bandas is None:
+        try:
+            with metricas.tramo("simulacion"):
+                bandas = simular(entrada, muestras, semilla, workers=SIMULACION_WORKERS,
+                                 distrito=indice_distritos.obtener(entrada, datos.get("distrito")))
+        except (ZeroDivisionError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+        cache_simulaciones.guardar(clave, bandas)
+    return jsonify(bandas)
+
+# Tabla de referencia: tasa de crecimiento por ubigeo
+@app.route("/api/referencia/<ubigeo>")
+def api_referencia(ubigeo):
+    fila = tabla_referencia.buscar(ubigeo)
+    if fila is None:
+        return jsonify({"error": f"Ubigeo sin tasa de referencia: {ubigeo}"}), 404
+    return jsonify({**fila, "version": tabla_referencia.version})
+
+# API de lote: varios proyectos en una sola llamada
+@app.route("/api/lote", methods=["POST"])
+def api_lote():
+    proyectos = request.get_json(silent=True)
+    if isinstance(proyectos, dict):
+        proyectos = proyectos.get("proyectos")
+    if not isinstance(proyectos, list) or not all(isinstance(p, dict) for p in proyectos):
+        return jsonify({"error": "Se espera una lista de proyectos en formato JSON."}), 400
+    return jsonify([fila_a_json(fila) for fila in evaluar_lote(proyectos)])
+
+# Trabajos en segundo plano: se encolan y se consulta su avance
+@app.route("/jobs", methods=["POST"])
+def jobs():
+    pedido = request.get_json(silent=True)
+    if not isinstance(pedido, dict):
+        return jsonify({"error": "Se espera un trabajo en formato JSON."}), 400
+    tipo = pedido.get("tipo")
+    if tipo in ("lote", "reportes"):
+        proyectos = pedido.get("proyectos")
+        if not isinstance(proyectos, list) or not all(isinstance(p, dict) for p in proyectos):
+            return jsonify({"error": "Se espera una lista de proyectos en formato JSON."}), 400
+        parametros = {"proyectos": proyectos, "workers": TRABAJOS_WORKERS}
+        if tipo == "reportes":
+            formatos = pedido.get("formatos", list(FORMATOS_REPORTE))
+            if not isinstance(formatos, list) or not formatos or not set(formatos) <= set(FORMATOS_REPORTE):
+                return jsonify({"error": f"Formatos de informe válidos: {', '.join(FORMATOS_REPORTE)}."}), 400
+            parametros["formatos"] = formatos
+    elif tipo in ("simulacion", "escenarios"):
+        # Sobre el proyecto de la sesión
+        datos = leer_sesion("datos", {})
+        if not datos.get("edades"):
+            return jsonify({"error": "No hay datos del proyecto en la sesión."}), 400
+        normalizar_tablas(datos)
+        asignar_tasa_referencia(datos)
+        if tipo == "simulacion":
+            try:
+                muestras, semilla = parametros_simulacion(pedido)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            parametros = {"datos": datos, "muestras": muestras, "semilla": semilla, "workers": SIMULACION_WORKERS}
+        else:
+            ejes = {eje: pedido.get(eje) for eje in ("radio", "est_by_aula", "turnos")}
+            if not all(isinstance(v, list) and v for v in ejes.values()):
+                return jsonify({"error": "Se esperan listas de valores para radio, est_by_aula y turnos."}), 400
+            parametros = {"datos": datos, **ejes}
+    else:
+        return jsonify({"error": f"Tipo de trabajo desconocido: {tipo}"}), 400
+    id_trabajo = cola_trabajos.encolar(tipo, parametros)
+    respuesta = jsonify({"id": id_trabajo, "url": url_for("estado_trabajo", id_trabajo=id_trabajo)})
+    respuesta.status_code = 202
+    respuesta.headers["Location"] = url_for("estado_trabajo", id_trabajo=id_trabajo)
+    return respuesta
+
+@app.route("/jobs/<id_trabajo>")
+def estado_trabajo(id_trabajo):
+    estado = cola_trabajos.estado(id_trabajo)
+    if estado is None:
+        return jsonify({"error": "Trabajo no encontrado."}), 404
+    if estado["estado"] == "terminado":
+        estado["url_resultado"] = url_for("resultado_trabajo", id_trabajo=id_trabajo)
+    return jsonify(estado)
+
+@app.route("/jobs/<id_trabajo>/resultado")
+def resultado_trabajo(id_trabajo):
+    estado = cola_trabajos.estado(id_trabajo)
+    if estado is None:
+        return jsonify({"error": "Trabajo no encontrado."}), 404
+    if estado["estado"] != "terminado":
+        return jsonify({"error": "El trabajo aún no termina.", "estado": estado["estado"]}), 409
+    ruta = cola_trabajos.ruta_resultado(id_trabajo, estado["tipo"])
+    mimetype = {".jsonl": "application/x-ndjson", ".zip": "application/zip"}.get(os.path.splitext(ruta)[1], "application/json")
+    return send_file(ruta, mimetype=mimetype, as_attachment=True, download_name=os.path.basename(ruta))
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     app.run(debug=True, host="0.0.0.0", port=port)    
@@ -0,0 +1,248 @@
+# Benchmarks de la demanda educativa: microbenchmarks y escalamiento
+#
+# Uso (desde la raíz del repositorio):
+#   python benchmarks/bench_demanda.py                 # corre todo y agrega el registro al historial
+#   python benchmarks/bench_demanda.py --rapido        # menos repeticiones y tamaños
+#   python benchmarks/bench_demanda.py --comparar      # compara las dos últimas corridas del historial
+#
+# Cada corrida se guarda como una línea JSON en benchmarks/historial.jsonl junto con el
+# commit actual, de modo que las regresiones se ven entre commits.
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+import tracemalloc
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from escenarios import barrer  # noqa: E402
+from incremental import EvaluadorIncremental  # noqa: E402
+from lote import evaluar_lote, evaluar_lote_paralelo  # noqa: E402
+from simulacion import simular  # noqa: E402
+from proyeccion import calcular_resultados, entrada_desde_datos, proyectar  # noqa: E402
+
+HISTORIAL = os.path.join(RAIZ, "benchmarks", "historial.jsonl")
+
+
+# ##################################
+# GENERADORES DE DATOS SINTÉTICOS
+# ##################################
+# Valores por defecto de paso1 (Secundaria, edades 12-16)
+MAT_DEFECTO = [163, 119, 120, 97, 99]
+POP_DEFECTO = {2007: [9153, 8881, 9217, 9539, 8739], 2017: [10292, 10292, 9615, 9385, 9558]}
+NO_PROM_DEFECTO = [23, 19, 8, 10, 6]
+
+
+def generar_datos(horizonte=12, edades=None, cantidad_anios=5, semilla=0, anio_form=2024):
+    """`datos` como los que arman paso1 y paso2, a partir de los valores por defecto con ruido."""
+    rng = np.random.default_rng(semilla)
+    edades = list(edades or range(12, 17))
+    base = lambda valores, i: valores[i % len(valores)]
+    anios_hist = list(range(anio_form - cantidad_anios, anio_form))
+    anio_f = anio_form + horizonte
+    ruido = lambda v: int(v * rng.uniform(0.85, 1.15))
+    return {
+        "nombre_proyecto": f"Colegio {semilla}",
+        "nombre_colegio": f"Colegio {semilla}",
+        "distrito": "CHACLA",
+        "nivel": "Primaria" if edades[0] < 12 else "Secundaria",
+        "radio_influencia": float(rng.uniform(1, 5)),
+        "area_distrito": 77.72,
+        "est_by_aula": 30.0,
+        "turnos": 2,
+        "anio_form": anio_form,
+        "cantidad_anios_matricula": cantidad_anios,
+        "anio_i": anio_form + 1,
+        "anio_f": anio_f,
+        "anio_censo1": 2007,
+        "anio_censo2": 2017,
+        "edades": edades,
+        "anios_hist": anios_hist,
+        "anios_total": list(range(anio_form - cantidad_anios, anio_f + 1)),
+        "anios_proyec": list(range(anio_form, anio_f + 1)),
+        "pob_censo1": 478278,
+        "pob_censo2": 624172,
+        "dic_pop_edad": {a: {e: ruido(base(v, i)) for i, e in enumerate(edades)} for a, v in POP_DEFECTO.items()},
+        "dic_mat_by_anio": {a: {e: ruido(base(MAT_DEFECTO, i)) for i, e in enumerate(edades)} for a in anios_hist},
+        "dic_no_promv": {a: {e: ruido(base(NO_PROM_DEFECTO, i)) for i, e in enumerate(edades)} for a in anios_hist},
+    }
+
+
+def generar_proyectos(n, **kwargs):
+    return [dict(generar_datos(semilla=i, **kwargs), id=i) for i in range(n)]
+
+
+# ##################################
+# MEDICIONES
+# ##################################
+def medir(funcion, repeticiones):
+    """Mejor tiempo por llamada (segundos) de `repeticiones` llamadas, en 3 rondas."""
+    tiempos = timeit.repeat(funcion, number=repeticiones, repeat=3)
+    return min(tiempos) / repeticiones
+
+
+def bench_calculo(rep):
+    datos = generar_datos()
+    entrada = entrada_desde_datos(datos)
+    return {
+        "calculo_resultados_s": medir(lambda: calcular_resultados(datos), rep),
+        "calculo_motor_s": medir(lambda: proyectar(entrada), rep),
+        "calculo_incremental_turnos_s": medir(lambda: bench_incremental(entrada, "turnos", 1, 2), rep),
+        "calculo_incremental_matricula_s": medir(lambda: bench_incremental(entrada, "matricula", entrada["matricula"], entrada["matricula"] + 1), rep),
+        # Grilla de 10 radios × 10 estudiantes por aula × 4 turnos en una pasada
+        "escenarios_10x10x4_s": medir(lambda: barrer(entrada, np.linspace(1, 6, 10), np.arange(20, 40, 2), [1, 2, 3, 4]), rep),
+        "simulacion_10k_muestras_s": medir(lambda: simular(entrada, 10_000), max(rep // 20, 1)),
+    }
+
+
+_evaluador = EvaluadorIncremental()
+
+
+def bench_incremental(entrada, campo, valor_a, valor_b):
+    # Alterna un solo campo entre dos valores: cada llamada recalcula solo lo afectado
+    previo = _evaluador._sesiones.get("bench")
+    valor = valor_b if previo is not None and np.array_equal(previo[0][campo], valor_a) else valor_a
+    _evaluador.proyectar("bench", {**entrada, campo: np.asarray(valor)})
+
+
+def bench_escalamiento(rep, rapido):
+    horizontes = [10, 30] if rapido else [10, 20, 30, 50]
+    salida = {}
+    for h in horizontes:
+        datos = generar_datos(horizonte=h)
+        salida[f"horizonte_{h}_s"] = medir(lambda: calcular_resultados(datos), rep)
+    for nombre, edades in (("primaria", range(6, 12)), ("secundaria", range(12, 17)), ("combinado", range(6, 17))):
+        datos = generar_datos(edades=edades)
+        salida[f"edades_{nombre}_s"] = medir(lambda: calcular_resultados(datos), rep)
+    for cantidad in ([3, 10] if rapido else [1, 3, 5, 10]):
+        datos = generar_datos(cantidad_anios=cantidad)
+        salida[f"anios_hist_{cantidad}_s"] = medir(lambda: calcular_resultados(datos), rep)
+    return salida
+
+
+def bench_lote(rapido):
+    salida = {}
+    for n in ([100, 1000] if rapido else [100, 1000, 5000]):
+        proyectos = generar_proyectos(n)
+        inicio = time.perf_counter()
+        evaluar_lote(proyectos)
+        salida[f"lote_{n}_proyectos_por_s"] = n / (time.perf_counter() - inicio)
+    proyectos = generar_proyectos(1000 if rapido else 5000)
+    inicio = time.perf_counter()
+    for _ in evaluar_lote_paralelo(proyectos):
+        pass
+    salida[f"lote_paralelo_{len(proyectos)}_proyectos_por_s"] = len(proyectos) / (time.perf_counter() - inicio)
+    # Memoria que ocupan los resultados de un lote ya calculado
+    proyectos = generar_proyectos(1000)
+    tracemalloc.start()
+    filas = evaluar_lote(proyectos)
+    salida["lote_1000_memoria_kb_por_proyecto"] = tracemalloc.get_traced_memory()[0] / 1000 / len(filas)
+    tracemalloc.stop()
+    return salida
+
+
+def bench_flask(rep):
+    # Petición completa de paso3 (sesión del servidor + cálculo + plantilla)
+    logging.disable(logging.CRITICAL)
+    import app as modulo_app
+    from flask.sessions import SecureCookieSessionInterface
+
+    datos = generar_datos()
+    cliente = modulo_app.app.test_client()
+    with modulo_app.app.test_request_context("/"):
+        modulo_app.guardar_sesion("datos", datos)
+        sid = modulo_app.id_sesion()
+    with cliente.session_transaction() as sesion:
+        sesion["sid"] = sid
+
+    def peticion_sin_cache():
+        modulo_app.cache_resultados._entradas.clear()
+        modulo_app.evaluador_incremental._sesiones.clear()
+        cliente.get("/paso3")
+
+    salida = {
+        "flask_paso3_s": medir(peticion_sin_cache, rep),
+        "flask_paso3_cache_s": medir(lambda: cliente.get("/paso3"), rep),
+    }
+
+    # Tamaño de la sesión si datos y resultados viajaran en la cookie firmada (como diccionarios)
+    serializador = SecureCookieSessionInterface().get_signing_serializer(modulo_app.app)
+    resultados = calcular_resultados(datos).a_dict()
+    salida["cookie_datos_resultados_bytes"] = len(serializador.dumps({"datos": datos, "resultados": resultados}))
+    salida["cookie_solo_id_bytes"] = len(serializador.dumps({"sid": sid}))
+    logging.disable(logging.NOTSET)
+    return salida
+
+
+# ##################################
+# HISTORIAL
+# ##################################
+def commit_actual():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def comparar():
+    with open(HISTORIAL, encoding="utf-8") as f:
+        corridas = [json.loads(linea) for linea in f if linea.strip()]
+    if len(corridas) < 2:
+        print("Se necesitan al menos dos corridas en el historial.")
+        return
+    anterior, actual = corridas[-2], corridas[-1]
+    print(f"{anterior['commit']} -> {actual['commit']}")
+    for clave, valor in actual["metricas"].items():
+        previo = anterior["metricas"].get(clave)
+        if previo:
+            print(f"{clave:45s} {previo:14.6g} {valor:14.6g} {valor / previo - 1:+8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del cálculo de demanda educativa")
+    parser.add_argument("--rapido", action="store_true", help="Menos repeticiones y tamaños")
+    parser.add_argument("--comparar", action="store_true", help="Compara las dos últimas corridas del historial")
+    parser.add_argument("--sin-guardar", action="store_true", help="No agrega la corrida al historial")
+    args = parser.parse_args()
+    if args.comparar:
+        comparar()
+        return
+
+    rep = 20 if args.rapido else 100
+    metricas = {}
+    for nombre, bench in (
+        ("cálculo", lambda: bench_calculo(rep)),
+        ("escalamiento", lambda: bench_escalamiento(rep, args.rapido)),
+        ("lote", lambda: bench_lote(args.rapido)),
+        ("flask", lambda: bench_flask(rep // 2)),
+    ):
+        print(f"# {nombre}")
+        resultado = bench()
+        for clave, valor in resultado.items():
+            print(f"{clave:45s} {valor:14.6g}")
+        metricas.update(resultado)
+
+    if not args.sin_guardar:
+        registro = {
+            "commit": commit_actual(),
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "maquina": platform.node(),
+            "metricas": metricas,
+        }
+        with open(HISTORIAL, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro) + "\n")
+
+
+if __name__ == "__main__":
+    main()
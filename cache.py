@@ -0,0 +1,99 @@
+# Cache de cálculos indexado por una huella (hash) canónica de las entradas
+#
+# La huella se calcula sobre la entrada del motor (arrays ya normalizados), de modo que
+# dos `datos` con las mismas tablas dan la misma huella aunque sus claves vengan como
+# texto o como enteros, o tengan celdas que el cálculo no usa.
+
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from proyeccion import CAMPOS_NUMERICOS, ERROR_POBLACION_NULA, entrada_desde_datos, proyectar, resultados_desde_arrays
+
+
+def huella_entrada(entrada):
+    """Hash SHA-256 de una entrada del motor."""
+    h = hashlib.sha256()
+    h.update(repr((entrada["edades"], entrada["n_hist"])).encode())
+    for campo in CAMPOS_NUMERICOS:
+        valor = np.ascontiguousarray(entrada[campo])
+        h.update(f"{campo}:{valor.dtype.str}:{valor.shape}".encode())
+        h.update(valor.tobytes())
+    return h.hexdigest()
+
+
+class CacheResultados:
+    """Cache LRU con expiración (TTL) y contadores de aciertos y fallos."""
+
+    def __init__(self, max_entradas=512, ttl=3600):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, huella):
+        """Devuelve una copia del valor guardado, o None si no está o ya expiró."""
+        with self._lock:
+            item = self._entradas.get(huella)
+            if item is not None and item[0] < time.monotonic():
+                del self._entradas[huella]
+                self.expulsiones += 1
+                item = None
+            if item is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(huella)
+            self.aciertos += 1
+        return pickle.loads(item[1])
+
+    def guardar(self, huella, valor):
+        item = (time.monotonic() + self.ttl, pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            self._entradas[huella] = item
+            self._entradas.move_to_end(huella)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.expulsiones += 1
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "entradas": len(self._entradas),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "expulsiones": self.expulsiones,
+            }
+
+
+def calcular_resultados_con_cache(datos, cache, distritos=None, incremental=None, clave=None):
+    """Igual que proyeccion.calcular_resultados, pero reutiliza resultados ya calculados.
+
+    Si se pasa un IndiceDistritos, en un fallo de cache se reutilizan las series del distrito.
+    Con un EvaluadorIncremental y la `clave` de la sesión, un fallo de cache recalcula solo
+    las etapas afectadas por lo que cambió desde el último cálculo de esa sesión.
+    """
+    entrada = entrada_desde_datos(datos)
+    huella = huella_entrada(entrada)
+    resultados = cache.obtener(huella)
+    if resultados is None:
+        distrito = None
+        if distritos is not None:
+            def distrito():
+                return distritos.obtener(entrada, datos.get("distrito"))
+        if incremental is not None:
+            arrays, _ = incremental.proyectar(clave, entrada, distrito)
+        else:
+            arrays = proyectar(entrada, distrito() if distrito else None)
+        if arrays["invalido"]:
+            raise ZeroDivisionError(ERROR_POBLACION_NULA)
+        resultados = resultados_desde_arrays(entrada, arrays)
+        # La huella identifica a los resultados (API de resultados, ETag)
+        resultados.id = huella
+        cache.guardar(huella, resultados)
+    return resultados
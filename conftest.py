@@ -0,0 +1,73 @@
+# Datos de prueba compartidos por los módulos test_*.py
+#
+# Uso: python -m pytest -q
+
+import json
+
+import numpy as np
+import pytest
+
+
+# ##################################
+# DATOS DE PRUEBA
+# ##################################
+def datos_defecto():
+    """El proyecto por defecto de paso1 y paso2 (Secundaria, 2024 a 2036)."""
+    return {
+        "nombre_proyecto": "Colegio XYZ", "distrito": "CHAcla", "nivel": "Secundaria",
+        "radio_influencia": 3, "area_distrito": 77.72, "est_by_aula": 30, "turnos": 2,
+        "anio_form": 2024, "cantidad_anios_matricula": 5, "anio_i": 2027, "anio_f": 2036,
+        "anio_censo1": 2007, "anio_censo2": 2017, "edades": [12, 13, 14, 15, 16],
+        "anios_hist": [2019, 2020, 2021, 2022, 2023],
+        "pob_censo1": 478278, "pob_censo2": 624172,
+        "dic_mat_by_anio": {
+            2019: {12: 163, 13: 119, 14: 120, 15: 97, 16: 99},
+            2020: {12: 173, 13: 146, 14: 103, 15: 112, 16: 89},
+            2021: {12: 170, 13: 168, 14: 142, 15: 102, 16: 113},
+            2022: {12: 170, 13: 161, 14: 157, 15: 135, 16: 96},
+            2023: {12: 164, 13: 166, 14: 138, 15: 138, 16: 127},
+        },
+        "dic_pop_edad": {
+            2007: {12: 9153, 13: 8881, 14: 9217, 15: 9539, 16: 8739},
+            2017: {12: 10292, 13: 10292, 14: 9615, 15: 9385, 16: 9558},
+        },
+        "dic_no_promv": {
+            2019: {12: 23, 13: 19, 14: 8, 15: 10, 16: 6},
+            2020: {12: 0, 13: 1, 14: 0, 15: 1, 16: 19},
+            2021: {12: 1, 13: 1, 14: 2, 15: 0, 16: 0},
+            2022: {12: 3, 13: 5, 14: 8, 15: 3, 16: 1},
+            2023: {12: 8, 13: 18, 14: 11, 15: 8, 16: 11},
+        },
+    }
+
+
+def proyecto_aleatorio(rng, id_proyecto):
+    """Un proyecto válido para paso1 y paso2 con valores al azar."""
+    edades = list(range(6, 12)) if rng.random() < 0.5 else list(range(12, 17))
+    anio_form = int(rng.integers(2018, 2030))
+    anios_hist = list(range(anio_form - int(rng.integers(1, 11)), anio_form))
+
+    def tabla(anios, minimo, maximo):
+        return {a: {e: int(rng.integers(minimo, maximo)) for e in edades} for a in anios}
+
+    return {
+        "id": id_proyecto, "distrito": f"D{rng.integers(3)}", "edades": edades,
+        "radio_influencia": float(rng.uniform(0.97, 10)), "area_distrito": float(rng.uniform(3, 5000)),
+        "est_by_aula": float(rng.uniform(5, 50)), "turnos": int(rng.integers(1, 5)),
+        "anio_form": anio_form, "anio_i": anio_form + 1, "anio_f": anio_form + int(rng.integers(2, 20)),
+        "anio_censo1": 2007, "anio_censo2": 2017, "anios_hist": anios_hist,
+        "pob_censo1": int(rng.integers(1000, 10**6)), "pob_censo2": int(rng.integers(1000, 10**6)),
+        "dic_pop_edad": tabla([2007, 2017], 100, 20000),
+        "dic_mat_by_anio": tabla(anios_hist, 1, 300),
+        "dic_no_promv": tabla(anios_hist, 0, 30),
+    }
+
+
+@pytest.fixture(scope="session")
+def proyectos():
+    rng = np.random.default_rng(7)
+    return [proyecto_aleatorio(rng, i) for i in range(60)]
+
+
+def como_json(resultados):
+    return json.loads(json.dumps(resultados.a_dict()))
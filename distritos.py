@@ -0,0 +1,80 @@
+# Índice de series precalculadas a nivel de distrito
+#
+# La tasa de crecimiento del distrito, las tasas por edad, la población total y el
+# crecimiento por edad solo dependen del censo. Se calculan una vez por distrito, años
+# censales y nivel (edades), y cada colegio solo aplica su escala pi*r^2/area y su
+# propia matrícula.
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from proyeccion import proyectar_distrito
+
+
+# Campos de la entrada que definen las series del distrito
+CAMPOS_CENSO = ("pob_censo", "anio_censo", "pop_edad", "tasa_referencia")
+
+
+class IndiceDistritos:
+    """Series de distrito por (distrito, años censales, edades, datos censales), con LRU.
+
+    Cada entrada cubre un rango de años; si se pide un rango mayor se recalcula una sola
+    vez con la unión de ambos rangos.
+    """
+
+    def __init__(self, max_distritos=1024):
+        self.max_distritos = max_distritos
+        self.aciertos = 0
+        self.fallos = 0
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def clave(entrada, distrito=""):
+        # Los datos censales entran en la clave: dos distritos con el mismo nombre pero
+        # distintos censos no comparten series
+        h = hashlib.sha256()
+        for campo in CAMPOS_CENSO:
+            h.update(np.ascontiguousarray(entrada[campo], dtype=float).tobytes())
+        return (
+            str(distrito or "").strip().upper(),
+            tuple(int(a) for a in entrada["anio_censo"]),
+            tuple(entrada["edades"]),
+            h.hexdigest(),
+        )
+
+    def obtener(self, entrada, distrito=""):
+        """Series de distrito para los años de `entrada` (las mismas que proyectar_distrito)."""
+        anios = entrada["anios_total"]
+        if len(anios) == 0 or np.any(np.diff(anios) != 1):
+            return proyectar_distrito(entrada)
+        clave = self.clave(entrada, distrito)
+        ini, fin = int(anios[0]), int(anios[-1])
+        with self._lock:
+            item = self._series.get(clave)
+            if item is not None and item[0] <= ini and fin <= item[1]:
+                self._series.move_to_end(clave)
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+                if item is not None:
+                    ini, fin = min(ini, item[0]), max(fin, item[1])
+                censo = {campo: entrada[campo] for campo in CAMPOS_CENSO}
+                censo["anios_total"] = np.arange(ini, fin + 1)
+                series = {k: np.asarray(v) for k, v in proyectar_distrito(censo).items()}
+                for valor in series.values():
+                    valor.setflags(write=False)
+                item = (ini, fin, series)
+                self._series[clave] = item
+                self._series.move_to_end(clave)
+                while len(self._series) > self.max_distritos:
+                    self._series.popitem(last=False)
+
+        desde = int(anios[0]) - item[0]
+        hasta = desde + len(anios)
+        series = dict(item[2])
+        series["pop_total"] = series["pop_total"][desde:hasta]
+        series["crecimiento_edad"] = series["crecimiento_edad"][:, desde:hasta]
+        return series
@@ -0,0 +1,106 @@
+# Barrido de escenarios (análisis de sensibilidad) de las aulas necesarias
+#
+# Evalúa la grilla completa radio_influencia × est_by_aula × turnos en una sola pasada:
+# las series del distrito se calculan una vez, el cálculo del colegio se hace con una
+# dimensión de lote de radios (el radio solo escala la población por pi*r^2/area) y las
+# aulas se combinan por broadcasting con los estudiantes por aula y los turnos, que no
+# afectan a la matrícula proyectada.
+
+import numpy as np
+from proyeccion import CAMPOS_NUMERICOS, calcular_aulas, proyectar, proyectar_distrito
+
+
+DIMENSIONES = ("radio", "est_by_aula", "turnos", "edad")
+
+# Tamaño máximo de la grilla (radios × estudiantes por aula × turnos)
+MAX_ESCENARIOS = 20_000
+
+
+def rango(inicio, fin, pasos):
+    """`pasos` valores equiespaciados de `inicio` a `fin`, ambos incluidos."""
+    pasos = int(pasos)
+    if pasos < 1:
+        raise ValueError("La cantidad de pasos debe ser al menos 1.")
+    return np.linspace(float(inicio), float(fin), pasos)
+
+
+def barrer(entrada, radios, est_by_aula, turnos, distrito=None):
+    """Secciones y aulas por edad para cada combinación de la grilla.
+
+    Los valores de cada eje se ordenan y se quitan los repetidos. Devuelve el cubo en
+    formato compacto: los ejes, la forma y los valores planos en el orden de DIMENSIONES
+    (la edad varía más rápido). `aulas_total` suma las aulas de todas las edades y
+    `invalido` marca los radios sin población potencial en el primer grado.
+    """
+    radios = np.unique(np.asarray(radios, dtype=float))
+    est_by_aula = np.unique(np.asarray(est_by_aula, dtype=float))
+    turnos = np.unique(np.asarray(turnos, dtype=int))
+    if not (len(radios) and len(est_by_aula) and len(turnos)):
+        raise ValueError("Cada parámetro del barrido necesita al menos un valor.")
+    if len(radios) * len(est_by_aula) * len(turnos) > MAX_ESCENARIOS:
+        raise ValueError(f"La grilla no puede tener más de {MAX_ESCENARIOS} escenarios.")
+    if radios[0] <= 0 or est_by_aula[0] <= 0 or turnos[0] < 1:
+        raise ValueError("El radio y los estudiantes por aula deben ser positivos, y los turnos al menos 1.")
+
+    if distrito is None:
+        distrito = proyectar_distrito(entrada)
+    # Lote de radios: el resto de la entrada se repite sin copiarse
+    lote = {campo: np.broadcast_to(entrada[campo], radios.shape + np.shape(entrada[campo])) for campo in CAMPOS_NUMERICOS}
+    lote.update(edades=entrada["edades"], n_hist=entrada["n_hist"], radio=radios)
+    arrays = proyectar(lote, distrito)
+
+    # (radios, 1, 1, edades, años) con (1, est, 1) y (1, 1, turnos)
+    secciones, aulas = calcular_aulas(
+        arrays["mat_efec_cp"][:, None, None],
+        est_by_aula[None, :, None],
+        turnos[None, None, :],
+    )
+    secciones = np.broadcast_to(secciones, aulas.shape)
+    invalido = arrays["invalido"]
+    secciones = np.where(invalido[:, None, None, None], 0, secciones).astype(int)
+    aulas = np.where(invalido[:, None, None, None], 0, aulas).astype(int)
+    return {
+        "dimensiones": list(DIMENSIONES),
+        "forma": list(aulas.shape),
+        "radio": radios.tolist(),
+        "est_by_aula": est_by_aula.tolist(),
+        "turnos": turnos.tolist(),
+        "edad": list(entrada["edades"]),
+        "secciones_total": secciones.ravel().tolist(),
+        "aulas_necesarias": aulas.ravel().tolist(),
+        "aulas_total": aulas.sum(axis=-1).ravel().tolist(),
+        "invalido": invalido.tolist(),
+    }
+
+
+def matriz_aulas(cubo, turno):
+    """Aulas totales radio × est_by_aula para un número de turnos (para el mapa de calor)."""
+    forma = cubo["forma"][:3]
+    k = cubo["turnos"].index(turno)
+    return np.reshape(cubo["aulas_total"], forma)[:, :, k].tolist()
+
+
+def tornado(cubo, base):
+    """Rango de aulas totales al mover cada parámetro de su mínimo a su máximo.
+
+    Los demás parámetros quedan en el valor de la grilla más cercano a `base`
+    ({"radio", "est_by_aula", "turnos"}). Devuelve una fila por parámetro, de mayor a
+    menor efecto.
+    """
+    ejes = DIMENSIONES[:3]
+    total = np.reshape(cubo["aulas_total"], cubo["forma"][:3])
+    indices = [int(np.abs(np.asarray(cubo[eje]) - float(base[eje])).argmin()) for eje in ejes]
+    filas = []
+    for d, eje in enumerate(ejes):
+        corte = list(indices)
+        corte[d] = slice(None)
+        serie = total[tuple(corte)]
+        filas.append({
+            "parametro": eje,
+            "valor_bajo": cubo[eje][0],
+            "valor_alto": cubo[eje][-1],
+            "aulas_bajo": int(serie[0]),
+            "aulas_alto": int(serie[-1]),
+            "aulas_base": int(total[tuple(indices)]),
+        })
+    return sorted(filas, key=lambda f: -abs(f["aulas_alto"] - f["aulas_bajo"]))
@@ -0,0 +1,139 @@
+# Exportación de resultados en formato columnar (Parquet vía Arrow, o CSV)
+#
+# Cada fila es una celda de una tabla de `resultados`:
+#   proyecto, tabla, indicador, edad, anio, valor
+# `indicador` distingue las columnas de aulas_by_edad; `edad` o `anio` quedan vacíos en
+# las tablas que no los tienen. La escritura es incremental: los proyectos se acumulan en
+# un búfer pequeño y se vuelcan como un grupo de filas, sin tener el lote completo en memoria.
+
+import csv
+import io
+import os
+
+
+COLUMNAS = ("proyecto", "tabla", "indicador", "edad", "anio", "valor")
+
+# Tablas edad×año de `resultados`
+TABLAS_EDAD_ANIO = ("dic_pop_potencial", "dic_mat_efec_sp", "dic_mat_efec_cp")
+# Sumas por año
+TABLAS_ANIO = ("suma_tot_byaño_dic_mat_efec_sp", "suma_tot_byaño_dic_mat_efec_cp", "suma_tot_byaño_dic_pop_potencial")
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None, None
+    return pa, pq
+
+
+def parquet_disponible():
+    """True si pyarrow está instalado (dependencia opcional de la exportación a Parquet)."""
+    return _pyarrow()[0] is not None
+
+
+def filas_resultados(proyecto, resultados, columnas=None):
+    """Agrega a `columnas` (dict de listas) las filas de un proyecto y lo devuelve."""
+    if columnas is None:
+        columnas = {c: [] for c in COLUMNAS}
+    proyecto = str(proyecto)
+
+    def agregar(tabla, indicador, edad, anio, valor):
+        columnas["proyecto"].append(proyecto)
+        columnas["tabla"].append(tabla)
+        columnas["indicador"].append(indicador)
+        columnas["edad"].append(edad)
+        columnas["anio"].append(anio)
+        columnas["valor"].append(float(valor))
+
+    for tabla in TABLAS_EDAD_ANIO:
+        for edad, fila in resultados.get(tabla, {}).items():
+            for anio, valor in fila.items():
+                agregar(tabla, "", int(edad), int(anio), valor)
+    for edad, aulas in resultados.get("aulas_by_edad", {}).items():
+        for indicador, valor in aulas.items():
+            agregar("aulas_by_edad", indicador, int(edad), None, valor)
+    for edad, valor in resultados.get("tasa_transicion", {}).items():
+        agregar("tasa_transicion", "", int(edad), None, valor)
+    for tabla in TABLAS_ANIO:
+        for anio, valor in resultados.get(tabla, {}).items():
+            agregar(tabla, "", None, int(anio), valor)
+    return columnas
+
+
+class EscritorResultados:
+    """Escritor incremental de resultados a Parquet o CSV.
+
+    `destino` es una ruta o un archivo binario abierto. Con formato=None se usa Parquet si
+    pyarrow está disponible (o si la ruta termina en .parquet) y CSV en caso contrario.
+    Se usa como context manager:
+
+        with EscritorResultados("resultados.parquet") as escritor:
+            for fila in evaluar_lote_paralelo(proyectos):
+                escritor.escribir(fila["id"], fila["resultados"])
+    """
+
+    def __init__(self, destino, formato=None, proyectos_por_grupo=500):
+        pa, pq = _pyarrow()
+        if formato is None:
+            nombre = str(destino) if isinstance(destino, (str, os.PathLike)) else ""
+            formato = "csv" if nombre.lower().endswith(".csv") or (pa is None and not nombre.lower().endswith(".parquet")) else "parquet"
+        if formato not in ("parquet", "csv"):
+            raise ValueError(f"Formato de exportación desconocido: {formato}")
+        if formato == "parquet" and pa is None:
+            raise ValueError("Para exportar a Parquet se requiere pyarrow. Use formato CSV.")
+        self.formato = formato
+        self.destino = destino
+        self.proyectos_por_grupo = proyectos_por_grupo
+        self._buffer = {c: [] for c in COLUMNAS}
+        self._pendientes = 0
+        self._escritor = None
+        self._archivo = None
+        if formato == "parquet":
+            self._schema = pa.schema([
+                ("proyecto", pa.string()), ("tabla", pa.string()), ("indicador", pa.string()),
+                ("edad", pa.int32()), ("anio", pa.int32()), ("valor", pa.float64()),
+            ])
+            self._escritor = pq.ParquetWriter(destino, self._schema, compression="zstd")
+        else:
+            if isinstance(destino, (str, os.PathLike)):
+                self._archivo = open(destino, "w", encoding="utf-8", newline="")
+            else:
+                self._archivo = io.TextIOWrapper(destino, encoding="utf-8", newline="")
+            self._escritor = csv.writer(self._archivo)
+            self._escritor.writerow(COLUMNAS)
+
+    def escribir(self, proyecto, resultados):
+        filas_resultados(proyecto, resultados, self._buffer)
+        self._pendientes += 1
+        if self._pendientes >= self.proyectos_por_grupo:
+            self._volcar()
+
+    def _volcar(self):
+        if not self._pendientes:
+            return
+        if self.formato == "parquet":
+            pa, _ = _pyarrow()
+            self._escritor.write_table(pa.Table.from_pydict(self._buffer, schema=self._schema))
+        else:
+            self._escritor.writerows(zip(*(self._buffer[c] for c in COLUMNAS)))
+        self._buffer = {c: [] for c in COLUMNAS}
+        self._pendientes = 0
+
+    def cerrar(self):
+        self._volcar()
+        if self.formato == "parquet":
+            self._escritor.close()
+        elif isinstance(self.destino, (str, os.PathLike)):
+            self._archivo.close()
+        else:
+            # El archivo binario lo cierra quien lo abrió
+            self._archivo.flush()
+            self._archivo.detach()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
@@ -0,0 +1,148 @@
+# Importación masiva de población por edades, matrícula y no promovidos desde CSV/Parquet
+#
+# Formato largo: columnas [proyecto], tabla, anio, edad, valor
+# Formato ancho: columnas [proyecto], tabla, anio y una columna por edad ("12", "13", ...)
+# `tabla` es "poblacion", "matricula" o "no_promovidos" (también se aceptan los nombres
+# de los diccionarios: dic_pop_edad, dic_mat_by_anio, dic_no_promv).
+# El archivo se lee por bloques y cada bloque se reduce a matrices edades×años por
+# proyecto (TablaEdadAnio) antes de leer el siguiente, de modo que extractos de cientos de
+# miles de filas no se cargan completos en memoria.
+
+import os
+import numpy as np
+import pandas as pd
+from modelo import TablaEdadAnio
+
+
+TABLAS = {
+    "poblacion": "dic_pop_edad",
+    "matricula": "dic_mat_by_anio",
+    "no_promovidos": "dic_no_promv",
+    "dic_pop_edad": "dic_pop_edad",
+    "dic_mat_by_anio": "dic_mat_by_anio",
+    "dic_no_promv": "dic_no_promv",
+}
+
+MENSAJES_NEGATIVOS = {
+    "dic_pop_edad": "No se permiten valores negativos en población por edades. Corrige los datos.",
+    "dic_mat_by_anio": "No se permiten valores negativos en matrícula. Corrige los datos.",
+    "dic_no_promv": "No se permiten valores negativos en no promovidos. Corrige los datos.",
+}
+
+
+def _leer_bloques(fuente, formato_archivo, tam_bloque, columna_proyecto):
+    if formato_archivo == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Para leer archivos Parquet se requiere pyarrow.")
+        archivo = pq.ParquetFile(fuente)
+        for lote in archivo.iter_batches(batch_size=tam_bloque):
+            yield lote.to_pandas()
+    else:
+        # Los códigos de proyecto se leen como texto (conservan ceros a la izquierda)
+        yield from pd.read_csv(fuente, chunksize=tam_bloque, dtype={columna_proyecto: str})
+
+
+def _normalizar_bloque(bloque, columna_proyecto):
+    bloque = bloque.rename(columns=lambda c: str(c).strip().lower())
+    faltantes = {"tabla", "anio"} - set(bloque.columns)
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(sorted(faltantes))}")
+    if columna_proyecto not in bloque.columns:
+        bloque[columna_proyecto] = ""
+
+    # Formato ancho: una columna por edad
+    if "edad" not in bloque.columns or "valor" not in bloque.columns:
+        columnas_edad = [c for c in bloque.columns if c.isdigit()]
+        if not columnas_edad:
+            raise ValueError("El archivo debe tener columnas edad y valor, o una columna por edad.")
+        bloque = bloque.melt(id_vars=[columna_proyecto, "tabla", "anio"], value_vars=columnas_edad, var_name="edad", value_name="valor")
+
+    tabla = bloque["tabla"].astype(str).str.strip().str.lower().map(TABLAS)
+    if tabla.isna().any():
+        desconocidas = sorted(bloque.loc[tabla.isna(), "tabla"].astype(str).unique())
+        raise ValueError(f"Tablas desconocidas en el archivo: {', '.join(desconocidas)}")
+    valor = pd.to_numeric(bloque["valor"], errors="coerce").fillna(0)
+
+    # Validación vectorizada de negativos
+    negativos = valor < 0
+    if negativos.any():
+        raise ValueError(MENSAJES_NEGATIVOS[tabla[negativos].iloc[0]])
+
+    return pd.DataFrame({
+        "proyecto": bloque[columna_proyecto].astype(str),
+        "tabla": tabla,
+        "anio": pd.to_numeric(bloque["anio"], errors="raise").astype(np.int32),
+        "edad": pd.to_numeric(bloque["edad"], errors="raise").astype(np.int32),
+        "valor": valor.astype(np.int64),
+    })
+
+
+def _reducir_bloque(bloque, acumulado):
+    # Vuelca un bloque normalizado en las matrices edades×años de cada (proyecto, tabla).
+    # `acumulado` guarda por clave (edades, anios, valores, presentes); las celdas del
+    # bloque reemplazan a las anteriores y los ejes se amplían si aparecen edades o años nuevos.
+    codigos, claves = pd.MultiIndex.from_arrays([bloque["proyecto"], bloque["tabla"]]).factorize()
+    orden = np.argsort(codigos, kind="stable")  # conserva el orden de las filas dentro de cada grupo
+    cortes = np.flatnonzero(np.diff(codigos[orden])) + 1
+    edad, anio, valor = (bloque[c].to_numpy()[orden] for c in ("edad", "anio", "valor"))
+    for clave, inicio, fin in zip(claves, np.r_[0, cortes], np.r_[cortes, len(orden)]):
+        edades, i = np.unique(edad[inicio:fin], return_inverse=True)
+        anios, j = np.unique(anio[inicio:fin], return_inverse=True)
+        valores = np.zeros((len(edades), len(anios)), dtype=np.int64)
+        presentes = np.zeros(valores.shape, dtype=bool)
+        valores[i, j] = valor[inicio:fin]  # con celdas repetidas, prevalece la última
+        presentes[i, j] = True
+        if clave in acumulado:
+            edades_prev, anios_prev, valores_prev, presentes_prev = acumulado[clave]
+            if not (np.array_equal(edades, edades_prev) and np.array_equal(anios, anios_prev)):
+                edades_union, anios_union = np.union1d(edades_prev, edades), np.union1d(anios_prev, anios)
+                valores_prev, presentes_prev = _ampliar(edades_prev, anios_prev, valores_prev, presentes_prev, edades_union, anios_union)
+                valores, presentes = _ampliar(edades, anios, valores, presentes, edades_union, anios_union)
+                edades, anios = edades_union, anios_union
+            valores = np.where(presentes, valores, valores_prev)
+            presentes |= presentes_prev
+        acumulado[clave] = (edades, anios, valores, presentes)
+
+
+def _ampliar(edades, anios, valores, presentes, edades_union, anios_union):
+    # Las matrices de un bloque en ejes más amplios (que los contienen)
+    i, j = np.searchsorted(edades_union, edades), np.searchsorted(anios_union, anios)
+    nuevos = np.zeros((len(edades_union), len(anios_union)), dtype=valores.dtype)
+    nuevos_presentes = np.zeros(nuevos.shape, dtype=bool)
+    nuevos[np.ix_(i, j)] = valores
+    nuevos_presentes[np.ix_(i, j)] = presentes
+    return nuevos, nuevos_presentes
+
+
+def importar_tablas(fuente, formato_archivo=None, columna_proyecto="proyecto", tam_bloque=100_000):
+    """Lee un CSV o Parquet (ruta o archivo abierto) y devuelve las tablas por proyecto.
+
+    Devuelve {proyecto: {"dic_pop_edad": TablaEdadAnio, "dic_mat_by_anio": ..., "dic_no_promv": ...}}.
+    Cada bloque leído se vuelca en las matrices de sus proyectos antes de leer el siguiente.
+    Si el archivo no tiene columna de proyecto, todo queda bajo la clave "". Si una celda
+    se repite, prevalece la última; las celdas que faltan dentro de una tabla valen 0.
+    Lanza ValueError si el archivo no es válido.
+    """
+    if formato_archivo is None:
+        nombre = fuente if isinstance(fuente, (str, os.PathLike)) else getattr(fuente, "filename", None) or getattr(fuente, "name", "")
+        formato_archivo = "parquet" if str(nombre).lower().endswith((".parquet", ".pq")) else "csv"
+
+    acumulado = {}
+    for bloque in _leer_bloques(fuente, formato_archivo, tam_bloque, columna_proyecto):
+        _reducir_bloque(_normalizar_bloque(bloque, columna_proyecto.lower()), acumulado)
+
+    tablas = {}
+    for (proyecto, tabla), (edades, anios, valores, _) in sorted(acumulado.items()):
+        tablas.setdefault(proyecto, {})[tabla] = TablaEdadAnio(edades, anios, valores)
+    return tablas
+
+
+def completar_con_tablas(proyectos, tablas):
+    """Agrega a cada proyecto las tablas importadas que corresponden a su "id"."""
+    completos = []
+    for proyecto in proyectos:
+        propias = tablas.get(str(proyecto.get("id", "")), tablas.get("", {}))
+        completos.append({**proyecto, **propias})
+    return completos
@@ -0,0 +1,75 @@
+# Recálculo incremental para la edición "qué pasa si"
+#
+# Al editar paso1/paso2 el usuario suele cambiar un solo valor (est_by_aula, turnos,
+# radio_influencia, una celda de matrícula). El evaluador recuerda, por sesión, la última
+# entrada y los valores de cada etapa de proyeccion.ETAPAS; ante una entrada nueva
+# compara campo por campo y vuelve a ejecutar solo las etapas que dependen (directa o
+# indirectamente) de lo que cambió. Por ejemplo, cambiar turnos solo recalcula las aulas.
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from proyeccion import CAMPOS_DISTRITO, CAMPOS_NUMERICOS, ETAPAS, SALIDAS, proyectar_distrito
+from distritos import CAMPOS_CENSO
+
+
+def campos_cambiados(anterior, entrada):
+    """Campos numéricos de `entrada` que difieren de `anterior`.
+
+    Devuelve None si cambió la forma (edades o años históricos): no hay nada reutilizable.
+    """
+    if anterior is None or anterior["edades"] != entrada["edades"] or anterior["n_hist"] != entrada["n_hist"]:
+        return None
+    return {campo for campo in CAMPOS_NUMERICOS if not np.array_equal(anterior[campo], entrada[campo], equal_nan=True)}
+
+
+class EvaluadorIncremental:
+    """Último cálculo de cada sesión (LRU de `max_sesiones`) y recálculo por etapas."""
+
+    def __init__(self, max_sesiones=256):
+        self.max_sesiones = max_sesiones
+        self.etapas_calculadas = 0
+        self.etapas_reutilizadas = 0
+        self._sesiones = OrderedDict()
+        self._lock = threading.Lock()
+
+    def proyectar(self, clave, entrada, distrito=None):
+        """Igual que proyeccion.proyectar, reutilizando las etapas del cálculo anterior de `clave`.
+
+        `distrito` es una función sin argumentos que devuelve las series del distrito (por
+        ejemplo, desde un IndiceDistritos); solo se llama si cambió el censo o los años.
+        Devuelve (arrays, nombres de las etapas recalculadas).
+        """
+        with self._lock:
+            previo = self._sesiones.get(clave)
+        anterior, valores = previo if previo is not None else (None, None)
+
+        cambiados = campos_cambiados(anterior, entrada)
+        if cambiados is None:
+            valores, cambiados = {}, set(CAMPOS_NUMERICOS)
+        else:
+            valores = dict(valores)
+        valores.update(entrada)
+
+        recalculadas = []
+        if cambiados & {"anios_total", *CAMPOS_CENSO}:
+            series = distrito() if distrito is not None else proyectar_distrito(entrada)
+            valores.update({campo: series[campo] for campo in CAMPOS_DISTRITO})
+            cambiados.update(CAMPOS_DISTRITO)
+            recalculadas.append("distrito")
+        for nombre, dependencias, etapa in ETAPAS:
+            if cambiados.intersection(dependencias):
+                salidas = etapa(valores)
+                valores.update(salidas)
+                cambiados.update(salidas)
+                recalculadas.append(nombre)
+
+        with self._lock:
+            self.etapas_calculadas += len(recalculadas)
+            self.etapas_reutilizadas += len(ETAPAS) + 1 - len(recalculadas)
+            self._sesiones[clave] = (entrada, valores)
+            self._sesiones.move_to_end(clave)
+            while len(self._sesiones) > self.max_sesiones:
+                self._sesiones.popitem(last=False)
+        return {campo: valores[campo] for campo in SALIDAS}, recalculadas
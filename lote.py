@@ -0,0 +1,252 @@
+# Evaluación en lote: muchos proyectos (colegios) en una sola llamada
+#
+# Los proyectos con la misma forma (edades, años históricos y horizonte) se apilan en
+# arrays con una dimensión de lote y se calculan con una sola pasada del motor.
+
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from distritos import IndiceDistritos
+from exportacion import EscritorResultados
+from importacion import completar_con_tablas, importar_tablas
+from modelo import TablaEdadAnio
+from niveles import edades_de_niveles, niveles_de
+from referencia import referencia
+from registro import configurar_registro, registrar, resumen_resultados
+from proyeccion import CAMPOS_NUMERICOS, ERROR_POBLACION_NULA, entrada_desde_datos, proyectar, resultados_desde_arrays
+
+
+# ##################################
+# VALIDACIÓN DE LOS PROYECTOS
+# ##################################
+# Rangos de paso1: (campo, tipo, mínimo, máximo, mensaje)
+RANGOS = (
+    ("radio_influencia", float, 0.97, 117, "El radio de influencia debe estar entre 0.97 y 117 km."),
+    ("area_distrito", float, 3, 42298, "El área del distrito debe estar entre 3 y 42298 km²."),
+    ("est_by_aula", float, 5, 50, "El número de estudiantes por aula debe estar entre 5 y 50."),
+    ("anio_form", int, 2017, 2035, "El año de formulación debe estar entre 2017 y 2035."),
+    ("cantidad_anios_matricula", int, 1, 10, "La cantidad de años de matrícula debe estar entre 1 y 10."),
+    ("anio_censo1", int, 2007, 2100, "El primer año de censo debe ser mayor o igual a 2007."),
+    ("anio_censo2", int, 2017, 2100, "El segundo año de censo debe ser mayor o igual a 2017."),
+    ("turnos", int, 1, 4, "La cantidad de turnos debe estar entre 1 y 4."),
+)
+# Tablas de paso2 y su mensaje si tienen valores negativos
+TABLAS = (
+    ("dic_pop_edad", "No se permiten valores negativos en población por edades."),
+    ("dic_mat_by_anio", "No se permiten valores negativos en matrícula."),
+    ("dic_no_promv", "No se permiten valores negativos en no promovidos."),
+)
+
+
+def _numero(valor, tipo, campo):
+    # Como float(valor), pero un texto que no es un número (o un entero con decimales) es un error
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"{campo}: {valor!r} no es un número.") from None
+    if tipo is int:
+        if not numero.is_integer():
+            raise ValueError(f"{campo}: {valor!r} no es un entero.")
+        return int(numero)
+    return numero
+
+
+def validar_proyecto(proyecto):
+    """Aplica a un proyecto de lote las validaciones de paso1 y paso2.
+
+    Los campos ausentes toman los valores por defecto del motor; los presentes deben ser
+    números en los rangos de paso1, los censos positivos y las celdas de las tablas enteros
+    no negativos (una celda vacía vale 0). Lanza ValueError con el primer problema.
+    """
+    for campo, tipo, minimo, maximo, mensaje in RANGOS:
+        if campo in proyecto and not minimo <= _numero(proyecto[campo], tipo, campo) <= maximo:
+            raise ValueError(mensaje)
+    anio_form = _numero(proyecto.get("anio_form", 0), int, "anio_form")
+    anio_f = _numero(proyecto.get("anio_f", 0), int, "anio_f")
+    if "anio_i" in proyecto and not anio_form < _numero(proyecto["anio_i"], int, "anio_i") < anio_f:
+        raise ValueError("El año de inicio de operaciones debe ser mayor al año de formulación y menor al año final.")
+    if not anio_form < anio_f:
+        raise ValueError("El año final debe ser mayor al año de formulación.")
+    # Un censo ausente se reemplaza por la tasa de referencia; uno presente debe ser positivo
+    for campo in ("pob_censo1", "pob_censo2"):
+        if proyecto.get(campo) is not None and _numero(proyecto[campo], float, campo) <= 0:
+            raise ValueError("Los valores de población total deben ser positivos.")
+    for campo, mensaje in TABLAS:
+        tabla = proyecto.get(campo)
+        if isinstance(tabla, TablaEdadAnio):
+            negativos = tabla.hay_negativos()
+        elif isinstance(tabla, dict):
+            for anio, fila in tabla.items():
+                if fila is not None and not isinstance(fila, dict):
+                    raise ValueError(f"{campo}[{anio}]: se espera {{edad: valor}}.")
+            celdas = [(anio, edad, valor) for anio, fila in tabla.items() for edad, valor in (fila or {}).items()]
+            for anio, edad, valor in celdas:
+                _numero(anio, int, f"{campo} (año)")
+                _numero(edad, int, f"{campo} (edad)")
+            negativos = any(_numero(valor, int, f"{campo}[{anio}][{edad}]") < 0
+                            for anio, edad, valor in celdas if valor not in (None, ""))
+        elif tabla is None:
+            negativos = False
+        else:
+            raise ValueError(f"{campo}: se espera una tabla {{año: {{edad: valor}}}}.")
+        if negativos:
+            raise ValueError(mensaje)
+
+
+def completar_datos(proyecto):
+    """Agrega a un proyecto los campos que paso1 deriva (edades de sus niveles y años históricos) y su tasa de referencia."""
+    datos = dict(proyecto)
+    if not datos.get("edades"):
+        datos["edades"] = edades_de_niveles(niveles_de(datos))
+    if not datos.get("anios_hist"):
+        anio_form = int(datos["anio_form"])
+        cantidad = int(datos.get("cantidad_anios_matricula", 5))
+        datos["anios_hist"] = list(range(anio_form - cantidad, anio_form))
+    if datos.get("tasa_referencia") is None:
+        datos["tasa_referencia"] = referencia().tasa(datos.get("ubigeo"), datos.get("departamento"))
+    return datos
+
+
+def apilar(entradas):
+    """Apila entradas de la misma forma en una sola entrada con dimensión de lote."""
+    lote = {campo: np.stack([e[campo] for e in entradas]) for campo in CAMPOS_NUMERICOS}
+    lote["edades"] = entradas[0]["edades"]
+    lote["n_hist"] = entradas[0]["n_hist"]
+    return lote
+
+
+def evaluar_lote(proyectos, inicio=0, distritos=None):
+    """Calcula los `resultados` de una lista de proyectos.
+
+    Cada proyecto es un diccionario con los campos de paso1 y paso2, validados con las
+    mismas reglas (validar_proyecto). Devuelve una lista en el mismo orden con
+    {"id", "resultados", "error"}; un proyecto con datos inválidos solo marca su propio error.
+    Sin "id", se usa la posición (desplazada por `inicio`).
+    Las series de cada distrito se calculan una sola vez (`distritos`, un IndiceDistritos).
+    """
+    if distritos is None:
+        distritos = IndiceDistritos()
+    salida = [{"id": p.get("id", inicio + i), "resultados": None, "error": None} for i, p in enumerate(proyectos)]
+
+    # Agrupar por forma
+    grupos = {}
+    for i, proyecto in enumerate(proyectos):
+        try:
+            validar_proyecto(proyecto)
+            entrada = entrada_desde_datos(completar_datos(proyecto))
+        except (KeyError, TypeError, ValueError) as e:
+            salida[i]["error"] = f"Datos inválidos: {e}"
+            continue
+        forma = (tuple(entrada["edades"]), entrada["n_hist"], len(entrada["anios_total"]))
+        distrito = distritos.obtener(entrada, proyecto.get("distrito"))
+        grupos.setdefault(forma, []).append((i, entrada, distrito))
+
+    # Una pasada del motor por grupo
+    for miembros in grupos.values():
+        series = {clave: np.stack([m[2][clave] for m in miembros]) for clave in miembros[0][2]}
+        arrays = proyectar(apilar([m[1] for m in miembros]), series)
+        for j, (i, entrada, _) in enumerate(miembros):
+            propios = {clave: valor[j] for clave, valor in arrays.items()}
+            if propios["invalido"]:
+                salida[i]["error"] = ERROR_POBLACION_NULA
+            else:
+                salida[i]["resultados"] = resultados_desde_arrays(entrada, propios)
+    return salida
+
+
+def fila_a_json(fila):
+    """Fila de evaluar_lote con sus resultados como diccionario (para escribirla en JSON)."""
+    return {**fila, "resultados": fila["resultados"].a_dict() if fila["resultados"] is not None else None}
+
+
+# ##################################
+# EJECUCIÓN EN PARALELO POR BLOQUES
+# ##################################
+# Series de distrito de cada proceso del pool, reutilizadas entre bloques
+_distritos_proceso = IndiceDistritos()
+
+
+def _evaluar_bloque(inicio, bloque):
+    # Se ejecuta en un proceso del pool. Si el bloque falla completo, se reintenta
+    # proyecto por proyecto para aislar al que causa el error.
+    try:
+        return evaluar_lote(bloque, inicio, _distritos_proceso)
+    except Exception:
+        salida = []
+        for i, proyecto in enumerate(bloque):
+            try:
+                salida.extend(evaluar_lote([proyecto], inicio + i, _distritos_proceso))
+            except Exception as e:
+                salida.append({"id": proyecto.get("id", inicio + i), "resultados": None, "error": f"Error de cálculo: {e}"})
+        return salida
+
+
+def evaluar_lote_paralelo(proyectos, workers=None, tam_bloque=250, executor=None):
+    """Evalúa proyectos en bloques repartidos en un ProcessPoolExecutor.
+
+    Es un generador: entrega los resultados en el orden de entrada a medida que terminan
+    los bloques. Un bloque que falla (incluida la caída de su proceso) solo marca el
+    error de sus propios proyectos. Con `executor` se usa ese pool en lugar de abrir uno
+    de `workers` procesos.
+    """
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            yield from evaluar_lote_paralelo(proyectos, workers, tam_bloque, executor)
+        return
+    proyectos = list(proyectos)
+    inicios = range(0, len(proyectos), tam_bloque)
+    futuros = [executor.submit(_evaluar_bloque, i, proyectos[i:i + tam_bloque]) for i in inicios]
+    for i, futuro in zip(inicios, futuros):
+        try:
+            yield from futuro.result()
+        except Exception as e:
+            for j, proyecto in enumerate(proyectos[i:i + tam_bloque]):
+                yield {"id": proyecto.get("id", i + j), "resultados": None, "error": f"Error en el bloque: {e}"}
+
+
+if __name__ == "__main__":
+    # Uso: python lote.py proyectos.json salida.jsonl --workers 16 [--tablas tablas.parquet]
+    # Si la salida termina en .parquet o .csv se escriben las tablas en formato columnar.
+    parser = argparse.ArgumentParser(description="Evaluación en lote de la demanda educativa")
+    parser.add_argument("entrada", help="Archivo JSON con la lista de proyectos")
+    parser.add_argument("salida", help="Archivo JSON Lines con un resultado por proyecto, o .parquet/.csv")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--tam-bloque", type=int, default=250)
+    parser.add_argument("--tablas", help="CSV/Parquet con población por edades, matrícula y no promovidos por proyecto (columna proyecto = id)")
+    args = parser.parse_args()
+    with open(args.entrada, encoding="utf-8") as f:
+        proyectos = json.load(f)
+    if args.tablas:
+        proyectos = completar_con_tablas(proyectos, importar_tablas(args.tablas))
+    # En lote se registra por defecto el 1 % de los eventos por proyecto
+    configurar_registro(muestreo=os.environ.get("LOG_MUESTREO", 0.01))
+    inicio = time.perf_counter()
+    conteo = {"proyectos": 0, "errores": 0}
+
+    def registrar_filas(filas):
+        # Un evento (muestreado) por proyecto y un resumen al final
+        for fila in filas:
+            conteo["proyectos"] += 1
+            conteo["errores"] += bool(fila["error"])
+            registrar(logging.INFO, "lote.proyecto", lambda: {"id": fila["id"], "error": fila["error"],
+                                                              **(resumen_resultados(fila["resultados"]) if fila["resultados"] else {})}, muestrear=True)
+            yield fila
+
+    filas = registrar_filas(evaluar_lote_paralelo(proyectos, args.workers, args.tam_bloque))
+    if args.salida.lower().endswith((".parquet", ".csv")):
+        # Los errores se reportan por consola; solo los proyectos calculados van al archivo
+        with EscritorResultados(args.salida) as escritor:
+            for fila in filas:
+                if fila["error"]:
+                    print(f"{fila['id']}: {fila['error']}")
+                else:
+                    escritor.escribir(fila["id"], fila["resultados"])
+    else:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            for fila in filas:
+                f.write(json.dumps(fila_a_json(fila), ensure_ascii=False) + "\n")
+    registrar(logging.INFO, "lote.fin", {**conteo, "duracion_s": round(time.perf_counter() - inicio, 3), "salida": args.salida})
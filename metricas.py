@@ -0,0 +1,94 @@
+# Métricas de rendimiento en formato de texto de Prometheus
+#
+# Histogramas de tiempo por tramo de cálculo y por petición, contadores y medidores
+# (gauges). Registrar una observación cuesta un bisect y una suma bajo un lock, así que
+# puede quedar activo en producción.
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+
+BUCKETS_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in sorted(etiquetas.items())) + "}"
+
+
+class Metricas:
+    """Registro de histogramas, contadores y medidores con etiquetas."""
+
+    def __init__(self, buckets=BUCKETS_SEGUNDOS):
+        self.buckets = buckets
+        self._histogramas = {}
+        self._contadores = {}
+        self._medidores = {}
+        self._ayuda = {}
+        self._lock = threading.Lock()
+
+    def observar(self, nombre, valor, ayuda="", **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        i = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            self._ayuda.setdefault(nombre, ayuda)
+            h = self._histogramas.get(clave)
+            if h is None:
+                h = self._histogramas[clave] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            h[0][i] += 1
+            h[1] += valor
+            h[2] += 1
+
+    def incrementar(self, nombre, valor=1, ayuda="", **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._ayuda.setdefault(nombre, ayuda)
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def fijar(self, nombre, valor, ayuda="", **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._ayuda.setdefault(nombre, ayuda)
+            self._medidores[clave] = valor
+
+    @contextmanager
+    def tramo(self, nombre):
+        """Mide la duración de un bloque en demanda_tramo_segundos{tramo=nombre}."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar("demanda_tramo_segundos", time.perf_counter() - inicio,
+                          "Duración de cada tramo del cálculo", tramo=nombre)
+
+    def exponer(self):
+        """Texto en formato de exposición de Prometheus."""
+        lineas = []
+        with self._lock:
+            vistos = set()
+
+            def encabezado(nombre, tipo):
+                if nombre not in vistos:
+                    vistos.add(nombre)
+                    lineas.append(f"# HELP {nombre} {self._ayuda.get(nombre, '')}")
+                    lineas.append(f"# TYPE {nombre} {tipo}")
+
+            for (nombre, etiquetas), (conteos, suma, total) in sorted(self._histogramas.items()):
+                encabezado(nombre, "histogram")
+                etiquetas = dict(etiquetas)
+                acumulado = 0
+                for limite, conteo in zip(self.buckets + ("+Inf",), conteos):
+                    acumulado += conteo
+                    lineas.append(f"{nombre}_bucket{_etiquetas({**etiquetas, 'le': limite})} {acumulado}")
+                lineas.append(f"{nombre}_sum{_etiquetas(etiquetas)} {suma}")
+                lineas.append(f"{nombre}_count{_etiquetas(etiquetas)} {total}")
+            for (nombre, etiquetas), valor in sorted(self._contadores.items()):
+                encabezado(nombre, "counter")
+                lineas.append(f"{nombre}{_etiquetas(dict(etiquetas))} {valor}")
+            for (nombre, etiquetas), valor in sorted(self._medidores.items()):
+                encabezado(nombre, "gauge")
+                lineas.append(f"{nombre}{_etiquetas(dict(etiquetas))} {valor}")
+        return "\n".join(lineas) + "\n"
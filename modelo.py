@@ -0,0 +1,340 @@
+# Modelo de datos compacto: tablas edad×año y resultados con ejes fijos y arrays int32
+#
+# Las tablas de entrada (población por edades, matrícula, no promovidos) y los resultados
+# viajaban como diccionarios anidados {anio: {edad: valor}}: un objeto de Python por celda
+# y claves que había que volver a convertir a int en cada petición. Aquí cada tabla guarda
+# sus ejes (edades y años) y una matriz int32. Los valores se convierten y validan una sola
+# vez al entrar (formulario, archivo, JSON o bytes) y después se usan tal cual.
+#
+# Ambas clases se pueden leer como los diccionarios de siempre (tabla[anio][edad],
+# resultados["dic_mat_efec_cp"]), de modo que las plantillas y las APIs no cambian; esas
+# vistas se arman solo cuando alguien las pide.
+
+import json
+import math
+import struct
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+
+import numpy as np
+from niveles import aulas_por_nivel
+
+
+INT32_MAX = np.iinfo(np.int32).max
+ERROR_VALOR_GRANDE = f"Los valores de las tablas no pueden superar {INT32_MAX:,}."
+
+
+def _entero(valor):
+    # Igual que to_int de la aplicación: lo que no es un entero vale 0
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _cabe_en_int32(valores):
+    return not valores.size or (valores.min() >= -INT32_MAX and valores.max() <= INT32_MAX)
+
+
+def _a_int32(valores):
+    # Lanza ValueError si algún valor no entra en int32 (incluidos los que ni siquiera
+    # entran en int64, que numpy rechaza con OverflowError)
+    try:
+        valores = np.asarray(valores, dtype=np.int64)
+    except OverflowError:
+        raise ValueError(ERROR_VALOR_GRANDE) from None
+    if not _cabe_en_int32(valores):
+        raise ValueError(ERROR_VALOR_GRANDE)
+    return valores.astype(np.int32)
+
+
+def _entero_compacto(valores):
+    # int32 si los valores caben (siempre, salvo proyecciones de población desmedidas); si no, int64
+    valores = np.asarray(valores, dtype=np.int64)
+    return valores.astype(np.int32) if _cabe_en_int32(valores) else valores
+
+
+# ##################################
+# TABLAS DE ENTRADA
+# ##################################
+@dataclass(slots=True, eq=False)
+class TablaEdadAnio(Mapping):
+    """Tabla edades×años de enteros (int32). Se lee como {anio: {edad: valor}}."""
+
+    edades: tuple
+    anios: tuple
+    valores: np.ndarray
+
+    def __post_init__(self):
+        self.edades = tuple(int(e) for e in self.edades)
+        self.anios = tuple(int(a) for a in self.anios)
+        self.valores = _a_int32(self.valores).reshape(len(self.edades), len(self.anios))
+
+    @classmethod
+    def desde_dict(cls, tabla, anios=None, edades=None):
+        """Desde {anio: {edad: valor}} con claves enteras o de texto. Los faltantes valen 0.
+
+        Sin `anios` o `edades` se usan los de la propia tabla. Lanza ValueError si un valor
+        no entra en int32.
+        """
+        if isinstance(tabla, TablaEdadAnio):
+            return tabla if anios is None and edades is None else tabla.reindexar(
+                tabla.anios if anios is None else anios, tabla.edades if edades is None else edades)
+        tabla = {_entero(anio): {_entero(edad): valor for edad, valor in (fila or {}).items()} for anio, fila in (tabla or {}).items()}
+        if anios is None:
+            anios = sorted(tabla)
+        if edades is None:
+            edades = sorted({edad for fila in tabla.values() for edad in fila})
+        valores = [[_entero(tabla.get(int(anio), {}).get(int(edad))) for anio in anios] for edad in edades]
+        return cls(edades, anios, _a_int32(valores).reshape(len(edades), len(anios)))
+
+    @classmethod
+    def desde_formulario(cls, formulario, prefijo, anios, edades):
+        """Desde las celdas `{prefijo}_{anio}_{edad}` de un formulario. Lo que no es un entero vale 0.
+
+        Lanza ValueError si un valor no entra en int32.
+        """
+        valores = [[_entero(formulario.get(f"{prefijo}_{anio}_{edad}", 0) or 0) for anio in anios] for edad in edades]
+        return cls(edades, anios, _a_int32(valores).reshape(len(edades), len(anios)))
+
+    def hay_negativos(self):
+        return bool((self.valores < 0).any())
+
+    def matriz(self, anios, edades):
+        """Matriz float edades×años en los ejes pedidos; lo que no está en la tabla vale 0."""
+        if tuple(anios) == self.anios and tuple(edades) == self.edades:
+            return self.valores.astype(float)
+        return self.reindexar(anios, edades).valores.astype(float)
+
+    def reindexar(self, anios, edades):
+        """La tabla en otros ejes; las celdas nuevas valen 0."""
+        filas = {e: i for i, e in enumerate(self.edades)}
+        columnas = {a: j for j, a in enumerate(self.anios)}
+        i = np.array([filas.get(int(e), -1) for e in edades], dtype=np.intp)
+        j = np.array([columnas.get(int(a), -1) for a in anios], dtype=np.intp)
+        valores = np.zeros((len(i), len(j)), dtype=np.int32)
+        valores[np.ix_(i >= 0, j >= 0)] = self.valores[np.ix_(i[i >= 0], j[j >= 0])]
+        return TablaEdadAnio(edades, anios, valores)
+
+    def a_dict(self):
+        return {anio: self[anio] for anio in self.anios}
+
+    # Vista de diccionario {anio: {edad: valor}} (plantillas, exportación)
+    def __getitem__(self, anio):
+        try:
+            j = self.anios.index(int(anio))
+        except ValueError:
+            raise KeyError(anio) from None
+        return dict(zip(self.edades, self.valores[:, j].tolist()))
+
+    def __iter__(self):
+        return iter(self.anios)
+
+    def __len__(self):
+        return len(self.anios)
+
+    def __contains__(self, anio):
+        return _entero(anio) in self.anios
+
+    def __eq__(self, otra):
+        if isinstance(otra, TablaEdadAnio):
+            return self.edades == otra.edades and self.anios == otra.anios and np.array_equal(self.valores, otra.valores)
+        return Mapping.__eq__(self, otra)
+
+    __hash__ = None
+
+
+# ##################################
+# RESULTADOS
+# ##################################
+# Campos enteros de Resultados con su forma en función de (E edades, P años proyectados)
+_ENTEROS = (
+    ("pop_total", "P"), ("pop_ref", "P"), ("potencial", "EP"), ("mat_efec_sp", "EP"),
+    ("mat_efec_cp", "EP"), ("secciones_total", "E"), ("aulas_necesarias", "E"),
+)
+# Campos float64: (nombre, forma); "T" es la cantidad de tasas de primer grado válidas
+_REALES = (("tasa_by_edad", "E"), ("tasa_transicion", "e"), ("tasas_cp", "E"), ("tasas_1g", "T"))
+_FORMATO = b"DEM1"
+
+
+@dataclass(slots=True, eq=False)
+class Resultados(Mapping):
+    """Resultados de un proyecto con ejes fijos y arrays int32 (años de proyección).
+
+    Un array de enteros solo pasa a int64 si sus valores no caben en int32.
+
+    Se lee como el diccionario `resultados` de siempre; esa vista se arma la primera vez
+    que se pide un campo y no se serializa.
+    """
+
+    edades: tuple
+    anios: tuple
+    pop_total: np.ndarray
+    pop_ref: np.ndarray
+    potencial: np.ndarray
+    mat_efec_sp: np.ndarray
+    mat_efec_cp: np.ndarray
+    secciones_total: np.ndarray
+    aulas_necesarias: np.ndarray
+    tasa_by_edad: np.ndarray
+    tasa_transicion: np.ndarray
+    tasas_cp: np.ndarray
+    tasas_1g: np.ndarray
+    tasa_poptotal: float
+    prop_1g: float
+    radio: float
+    turnos: int
+    id: str = None
+    _vista: dict = field(default=None, repr=False)
+
+    def __post_init__(self):
+        self.edades = tuple(int(e) for e in self.edades)
+        self.anios = tuple(int(a) for a in self.anios)
+        formas = self._formas(len(self.tasas_1g))
+        for campo, _ in _ENTEROS:
+            setattr(self, campo, _entero_compacto(getattr(self, campo)).reshape(formas[campo]))
+        for campo, _ in _REALES:
+            setattr(self, campo, np.asarray(getattr(self, campo), dtype=np.float64).reshape(formas[campo]))
+
+    def _formas(self, n_tasas_1g):
+        medidas = {"E": len(self.edades), "P": len(self.anios), "e": max(len(self.edades) - 1, 0), "T": n_tasas_1g}
+        return {campo: tuple(medidas[m] for m in forma) for campo, forma in _ENTEROS + _REALES}
+
+    @classmethod
+    def desde_arrays(cls, entrada, arrays):
+        """Desde la entrada y los arrays de proyeccion.proyectar de un solo proyecto."""
+        n_hist = entrada["n_hist"]
+        return cls(
+            edades=entrada["edades"],
+            anios=entrada["anios_total"][n_hist:].tolist(),
+            pop_total=arrays["pop_total"][n_hist:],
+            pop_ref=arrays["pop_ref"],
+            potencial=arrays["potencial"][:, n_hist:],
+            mat_efec_sp=arrays["mat_efec_sp"][:, 1:],
+            mat_efec_cp=arrays["mat_efec_cp"][:, 1:],
+            secciones_total=arrays["secciones_total"],
+            aulas_necesarias=arrays["aulas_necesarias"],
+            tasa_by_edad=arrays["tasa_by_edad"],
+            tasa_transicion=arrays["tasa_transicion"],
+            tasas_cp=arrays["tasas_cp"],
+            tasas_1g=arrays["tasas_1g"][arrays["mascara_1g"]],
+            tasa_poptotal=float(arrays["tasa_poptotal"]),
+            prop_1g=float(arrays["prop_1g"]),
+            radio=float(entrada["radio"]),
+            turnos=int(entrada["turnos"]),
+        )
+
+    # ##################################
+    # SERIALIZACIÓN BINARIA
+    # ##################################
+    def a_bytes(self):
+        """Formato binario compacto: cabecera JSON con los ejes y escalares, luego los arrays."""
+        cabecera = json.dumps({
+            "edades": self.edades, "anios": self.anios, "n_tasas_1g": len(self.tasas_1g),
+            "tasa_poptotal": self.tasa_poptotal, "prop_1g": self.prop_1g, "radio": self.radio,
+            "turnos": self.turnos, "id": self.id,
+            "int64": [c for c, _ in _ENTEROS if getattr(self, c).dtype == np.int64],
+        }, separators=(",", ":")).encode()
+        cuerpo = b"".join(getattr(self, c).astype(getattr(self, c).dtype.newbyteorder("<")).tobytes() for c, _ in _ENTEROS)
+        cuerpo += b"".join(getattr(self, c).astype("<f8").tobytes() for c, _ in _REALES)
+        return _FORMATO + struct.pack("<I", len(cabecera)) + cabecera + cuerpo
+
+    @classmethod
+    def desde_bytes(cls, datos):
+        """Lee el formato de a_bytes. Lanza ValueError si los bytes no son válidos."""
+        datos = memoryview(datos)
+        if bytes(datos[:4]) != _FORMATO or len(datos) < 8:
+            raise ValueError("Formato de resultados desconocido.")
+        largo = struct.unpack("<I", datos[4:8])[0]
+        try:
+            meta = json.loads(bytes(datos[8:8 + largo]))
+            edades, anios, n_tasas_1g = meta["edades"], meta["anios"], int(meta["n_tasas_1g"])
+            anchos = set(meta.get("int64", ()))
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"Cabecera de resultados inválida: {e}") from None
+        medidas = {"E": len(edades), "P": len(anios), "e": max(len(edades) - 1, 0), "T": n_tasas_1g}
+        campos, posicion = {}, 8 + largo
+        tipos = [(campo, forma, "<i8" if campo in anchos else "<i4") for campo, forma in _ENTEROS]
+        tipos += [(campo, forma, "<f8") for campo, forma in _REALES]
+        for campo, forma, tipo in tipos:
+            forma = tuple(medidas[m] for m in forma)
+            n = math.prod(forma) * int(tipo[2])
+            if posicion + n > len(datos):
+                raise ValueError("Resultados truncados.")
+            campos[campo] = np.frombuffer(datos[posicion:posicion + n], dtype=tipo).reshape(forma).astype(tipo[1:])
+            posicion += n
+        if posicion != len(datos):
+            raise ValueError("Sobran bytes al final de los resultados.")
+        return cls(edades=edades, anios=anios, tasa_poptotal=float(meta["tasa_poptotal"]), prop_1g=float(meta["prop_1g"]),
+                   radio=float(meta["radio"]), turnos=int(meta["turnos"]), id=meta.get("id"), **campos)
+
+    def __reduce__(self):
+        # pickle (almacén de sesión, cache, pools de procesos) usa el formato binario
+        return (Resultados.desde_bytes, (self.a_bytes(),))
+
+    # ##################################
+    # VISTA DE DICCIONARIO
+    # ##################################
+    def a_dict(self):
+        """El diccionario `resultados` que usan la plantilla, las APIs y la salida JSON."""
+        vista = dict(self._diccionario())
+        if self.id is not None:
+            vista["id"] = self.id
+        return vista
+
+    def _diccionario(self):
+        if self._vista is not None:
+            return self._vista
+        edades, anios = list(self.edades), list(self.anios)
+
+        def por_edad_y_anio(matriz):
+            return {edad: dict(zip(anios, fila)) for edad, fila in zip(edades, matriz.tolist())}
+
+        vista = {
+            "tasa_poptotal": self.tasa_poptotal,
+            "dic_pop_total": dict(zip(anios, self.pop_total.tolist())),
+            "dic_pop_ref": dict(zip(anios, self.pop_ref.tolist())),
+            "tasa_by_edad": dict(zip(edades, self.tasa_by_edad.tolist())),
+            "dic_pop_potencial": por_edad_y_anio(self.potencial),
+            "prop_1g": self.prop_1g,
+            "list_tasas_1g": self.tasas_1g.tolist(),
+            "tasa_transicion": dict(zip(edades[1:], self.tasa_transicion.tolist())),
+            "dic_mat_efec_sp": por_edad_y_anio(self.mat_efec_sp),
+            "tasas_cp": dict(zip(edades, self.tasas_cp.tolist())),
+            "dic_mat_efec_cp": por_edad_y_anio(self.mat_efec_cp),
+            "aulas_by_edad": {
+                edad: {"secciones_total": s, "aulas_necesarias": a}
+                for edad, s, a in zip(edades, self.secciones_total.tolist(), self.aulas_necesarias.tolist())
+            },
+            # Aulas de cada nivel (cálculo combinado de varios niveles) para 1 a `turnos` turnos
+            "aulas_by_nivel": aulas_por_nivel(edades, self.secciones_total, self.turnos),
+            "area_influencia": round(math.pi * self.radio**2, 2),
+            "list_turnos": list(range(1, self.turnos + 1)),
+            # Valores mínimos de cada tabla (para los ejes de los gráficos)
+            "min_mat_efec_sp": float(self.mat_efec_sp.min()) * 0.9,
+            "min_mat_efec_cp": float(self.mat_efec_cp.min()) * 0.9,
+            "min_pop_potencial": float(self.potencial.min()) * 0.9,
+        }
+        # Suma de valores de cada tabla por año y su máximo
+        tablas = {"dic_mat_efec_sp": self.mat_efec_sp, "dic_mat_efec_cp": self.mat_efec_cp, "dic_pop_potencial": self.potencial}
+        for d, matriz in tablas.items():
+            vista[f"suma_tot_byaño_{d}"] = dict(zip(anios, matriz.sum(axis=0, dtype=np.int64).tolist()))
+        for d in tablas:
+            vista[f"max_suma_tot_byaño_{d}"] = max(vista[f"suma_tot_byaño_{d}"].values())
+        self._vista = vista
+        return vista
+
+    def __getitem__(self, clave):
+        if clave == "id" and self.id is not None:
+            return self.id
+        return self._diccionario()[clave]
+
+    def __iter__(self):
+        yield from self._diccionario()
+        if self.id is not None:
+            yield "id"
+
+    def __len__(self):
+        return len(self._diccionario()) + (self.id is not None)
+
+    __hash__ = None
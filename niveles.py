@@ -0,0 +1,73 @@
+# Niveles educativos (Inicial, Primaria, Secundaria) y cálculo combinado de varios niveles
+#
+# Un colegio con varios niveles se proyecta en una sola corrida del motor sobre un eje de
+# edades concatenado (por ejemplo, 6 a 16 para Primaria y Secundaria). Las series del
+# censo del distrito se calculan una sola vez para todas las edades, y el paso del último
+# grado de un nivel al primero del siguiente (11 -> 12) es una transición de cohorte más,
+# estimada con la matrícula histórica como cualquier otra. Solo el primer grado del
+# primer nivel se proyecta desde la población potencial.
+#
+# Las aulas se informan por nivel y por cantidad de turnos a partir de las secciones de
+# cada edad.
+
+import numpy as np
+
+
+NIVELES = {
+    "Inicial": (3, 4, 5),
+    "Primaria": (6, 7, 8, 9, 10, 11),
+    "Secundaria": (12, 13, 14, 15, 16),
+}
+NIVEL_POR_EDAD = {edad: nivel for nivel, edades in NIVELES.items() for edad in edades}
+OTRAS_EDADES = "Otras edades"
+
+
+def aulas_de_secciones(secciones, turnos):
+    """Aulas necesarias para atender `secciones` en `turnos` turnos."""
+    return secciones // turnos + secciones % turnos
+
+
+def niveles_de(datos):
+    """Niveles del proyecto, en orden: la lista `niveles` o los nombres que aparecen en `nivel`.
+
+    Por ejemplo, nivel = "Primaria y Secundaria". Sin ninguno reconocible, Secundaria.
+    """
+    pedidos = datos.get("niveles") or [datos.get("nivel") or ""]
+    texto = " ".join(str(n) for n in pedidos).lower()
+    return [nivel for nivel in NIVELES if nivel.lower() in texto] or ["Secundaria"]
+
+
+def edades_de_niveles(niveles):
+    """Eje de edades concatenado de los niveles. Lanza ValueError si no son consecutivos."""
+    orden = list(NIVELES)
+    posiciones = sorted(orden.index(nivel) for nivel in set(niveles))
+    if posiciones != list(range(posiciones[0], posiciones[-1] + 1)):
+        raise ValueError("Los niveles de un cálculo combinado deben ser consecutivos (por ejemplo, Primaria y Secundaria).")
+    return [edad for p in posiciones for edad in NIVELES[orden[p]]]
+
+
+def tramos_por_nivel(edades):
+    """[(nivel, índices de sus edades en `edades`)] en orden; las edades sin nivel van al final."""
+    tramos = {}
+    for i, edad in enumerate(edades):
+        tramos.setdefault(NIVEL_POR_EDAD.get(int(edad), OTRAS_EDADES), []).append(i)
+    return sorted(tramos.items(), key=lambda t: list(NIVELES).index(t[0]) if t[0] in NIVELES else len(NIVELES))
+
+
+def aulas_por_nivel(edades, secciones, turnos):
+    """Secciones y aulas necesarias de cada nivel, para 1 a `turnos` turnos.
+
+    Devuelve {nivel: {"edades", "secciones_total", "aulas_by_turnos": {turnos: aulas}}}.
+    Con el número de turnos del proyecto, las aulas coinciden con la suma de aulas_by_edad.
+    """
+    secciones = np.asarray(secciones, dtype=np.int64)
+    lista_turnos = np.arange(1, max(int(turnos), 1) + 1)
+    aulas = aulas_de_secciones(secciones, lista_turnos[:, None])
+    return {
+        nivel: {
+            "edades": [int(edades[i]) for i in indices],
+            "secciones_total": int(secciones[indices].sum()),
+            "aulas_by_turnos": dict(zip(lista_turnos.tolist(), aulas[:, indices].sum(axis=1).tolist())),
+        }
+        for nivel, indices in tramos_por_nivel(edades)
+    }
@@ -0,0 +1,303 @@
+# Motor de proyección de la demanda educativa (sin dependencia de Flask)
+#
+# Las tablas edad×año se manejan como matrices NumPy de 2 dimensiones: filas = edades,
+# columnas = años. Todas las funciones de cálculo aceptan dimensiones adicionales a la
+# izquierda (lote de proyectos), de modo que varios proyectos con la misma forma se
+# calculan en una sola pasada.
+
+import numpy as np
+from modelo import Resultados, TablaEdadAnio
+from niveles import aulas_de_secciones
+
+
+# Campos de la entrada que son arrays numéricos (se pueden apilar en lotes)
+CAMPOS_NUMERICOS = (
+    "anios_total", "pob_censo", "anio_censo", "pop_edad", "matricula", "no_promovidos",
+    "radio", "area", "est_by_aula", "turnos", "tasa_referencia",
+)
+
+ERROR_POBLACION_NULA = "La población potencial del primer grado es cero en un año con matrícula."
+
+
+# ##################################
+# CONVERSIÓN DE DATOS A MATRICES
+# ##################################
+def tabla_a_matriz(tabla, anios, edades):
+    """Convierte una TablaEdadAnio (o {anio: {edad: valor}}) en una matriz edades×años. Los faltantes valen 0."""
+    if isinstance(tabla, TablaEdadAnio):
+        return tabla.matriz(anios, edades)
+    return TablaEdadAnio.desde_dict(tabla, anios, edades).valores.astype(float)
+
+
+def entrada_desde_datos(datos):
+    """Arma la entrada del motor a partir del diccionario `datos` de la sesión."""
+    edades = [int(e) for e in datos.get("edades", [])]
+    anios_hist = [int(a) for a in datos.get("anios_hist", [])]
+    anio_form = int(datos["anio_form"])
+    anio_f = int(datos["anio_f"])
+    anio_censo1 = int(datos.get("anio_censo1", 2007))
+    anio_censo2 = int(datos.get("anio_censo2", 2017))
+    if not edades or not anios_hist or anio_f < anio_form:
+        raise ValueError("Se requieren edades, años históricos y un año final posterior al de formulación.")
+    return {
+        "edades": edades,
+        "n_hist": len(anios_hist),
+        "anios_total": np.array(anios_hist + list(range(anio_form, anio_f + 1))),
+        "pob_censo": np.array([datos.get("pob_censo1", 0) or 0, datos.get("pob_censo2", 0) or 0], dtype=float),
+        "anio_censo": np.array([anio_censo1, anio_censo2]),
+        "pop_edad": tabla_a_matriz(datos.get("dic_pop_edad"), [anio_censo1, anio_censo2], edades),
+        # Años históricos más el año de formulación (usado por la tasa de transición)
+        "matricula": tabla_a_matriz(datos.get("dic_mat_by_anio"), anios_hist + [anio_form], edades),
+        "no_promovidos": tabla_a_matriz(datos.get("dic_no_promv"), anios_hist, edades),
+        "radio": np.asarray(float(datos.get("radio_influencia", 3))),
+        "area": np.asarray(float(datos.get("area_distrito", 77.7) or 1)),  # Evitar división por cero
+        "est_by_aula": np.asarray(float(datos.get("est_by_aula", 30))),
+        "turnos": np.asarray(int(datos.get("turnos", 2))),
+        # Tasa de crecimiento de la tabla de referencia (NaN si no hay): respaldo cuando falta un censo
+        "tasa_referencia": np.asarray(np.nan if datos.get("tasa_referencia") is None else float(datos["tasa_referencia"])),
+    }
+
+
+# ##################################
+# FUNCIONES DE CÁLCULO
+# ##################################
+def tasa_crecimiento(v1, v2, periodo):
+    """Tasa de crecimiento intercensal. Vale 0 si alguno de los valores no es positivo."""
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        tasa = (v2 / v1) ** (1 / periodo) - 1
+    return np.where((v1 > 0) & (v2 > 0), tasa, 0.0)
+
+
+def media_geometrica(valores, mascara):
+    """Media geométrica sobre el último eje considerando solo los valores de la máscara (0 si no hay)."""
+    n = mascara.sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logs = np.where(mascara, np.log(np.where(mascara, valores, 1.0)), 0.0)
+        media = np.exp(logs.sum(axis=-1) / np.maximum(n, 1))
+    return np.where(n > 0, media, 0.0)
+
+
+def _compactar(valores):
+    # Mueve los valores distintos de cero al inicio conservando su orden
+    mascara = valores != 0
+    orden = np.argsort(~mascara, axis=-1, kind="stable")
+    return np.take_along_axis(valores, orden, axis=-1), mascara.sum(axis=-1)
+
+
+def ratios_de_transicion(matricula, n_hist):
+    """Cocientes grado siguiente / grado anterior que entran en la tasa de transición.
+
+    Como en el cálculo por listas, se toman los valores no nulos del grado anterior
+    (años históricos salvo el último) y del grado siguiente (un año después) y se
+    emparejan en orden. Devuelve (cocientes, máscara de pares válidos), edades[1:].
+    """
+    ant, n_ant = _compactar(matricula[..., :-1, :n_hist - 1])
+    post, n_post = _compactar(matricula[..., 1:, 1:])
+    post = post[..., :n_hist - 1]
+    pares = np.arange(n_hist - 1) < np.minimum(n_ant, n_post)[..., None]
+    mascara = pares & (ant > 0) & (post > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = post / ant
+    return ratios, mascara
+
+
+def tasas_de_transicion(matricula, n_hist):
+    """Tasa de transición de un grado al siguiente (un año al siguiente), edades[1:]."""
+    ratios, mascara = ratios_de_transicion(matricula, n_hist)
+    return media_geometrica(ratios, mascara)
+
+
+def proyectar_cohortes(inicial, primer_grado, tasas):
+    """Proyecta la matrícula por cohortes: mat[e][a] = round(mat[e-1][a-1] * tasas[e]).
+
+    inicial: matrícula observada del año anterior a la formulación (..., E)
+    primer_grado: proyección del primer grado desde el año de formulación (..., P)
+    tasas: tasa de paso a cada edad (..., E); la del primer grado no se usa
+    Devuelve una matriz (..., E, P + 1) cuya primera columna es el año observado.
+    """
+    mat = np.empty(inicial.shape + (primer_grado.shape[-1] + 1,))
+    mat[..., 0] = inicial
+    mat[..., 0, 1:] = primer_grado
+    # Se redondea en cada grado, por eso se avanza edad por edad (todos los años a la vez)
+    for i in range(1, inicial.shape[-1]):
+        mat[..., i, 1:] = np.rint(mat[..., i - 1, :-1] * tasas[..., i, None])
+    return mat
+
+
+def proyectar_distrito(entrada):
+    """Series que solo dependen del censo del distrito (no del radio ni de la matrícula del colegio)."""
+    anios = entrada["anios_total"]
+    pob1, pob2 = entrada["pob_censo"][..., 0], entrada["pob_censo"][..., 1]
+    censo1, censo2 = entrada["anio_censo"][..., 0], entrada["anio_censo"][..., 1]
+    periodo = censo2 - censo1
+
+    # Si falta uno de los censos y hay tasa de referencia, se usa esa tasa
+    referencia = entrada["tasa_referencia"]
+    con_referencia = ~np.isnan(referencia)
+
+    # --- Población de todo el distrito. Las tasas negativas siempre se ponen en 0
+    tasa_poptotal = tasa_crecimiento(pob1, pob2, periodo)
+    tasa_poptotal = np.where(con_referencia & ~((pob1 > 0) & (pob2 > 0)), referencia, tasa_poptotal)
+    tasa_poptotal = np.maximum(tasa_poptotal, 0)
+    base = np.where(pob2 != 0, pob2, pob1)
+    anio_base = np.where(pob2 != 0, censo2, censo1)
+    pop_total = np.trunc(base[..., None] * (1 + tasa_poptotal[..., None]) ** (anios - anio_base[..., None]))
+
+    # --- Crecimiento de la población por edad desde el censo base
+    v1, v2 = entrada["pop_edad"][..., 0], entrada["pop_edad"][..., 1]
+    tasa_by_edad = tasa_crecimiento(v1, v2, periodo[..., None])
+    tasa_by_edad = np.where(con_referencia[..., None] & ~((v1 > 0) & (v2 > 0)), referencia[..., None], tasa_by_edad)
+    base_edad = np.where(v2 > 0, v2, np.where(v1 > 0, v1, 0))
+    anio_base = np.where((v2 <= 0) & (v1 > 0), censo1[..., None], censo2[..., None])
+    crecimiento_edad = (1 + tasa_by_edad[..., None]) ** (anios[..., None, :] - anio_base[..., None])
+    return {
+        "tasa_poptotal": tasa_poptotal,
+        "pop_total": pop_total,
+        "tasa_by_edad": tasa_by_edad,
+        "base_edad": base_edad,
+        "crecimiento_edad": crecimiento_edad,
+    }
+
+
+# ##################################
+# ETAPAS DEL CÁLCULO DEL COLEGIO
+# ##################################
+# Cada etapa recibe un diccionario con la entrada y las salidas de las etapas anteriores
+# y devuelve sus propias salidas. ETAPAS declara de qué valores depende cada una, lo que
+# permite recalcular solo las etapas afectadas por un cambio (ver incremental.py).
+def _etapa_pop_ref(v):
+    # Población referencial: área de influencia, todas las edades
+    r, area = v["radio"], v["area"]
+    return {"pop_ref": np.trunc((np.pi * (r ** 2) / area)[..., None] * v["pop_total"][..., v["n_hist"]:])}
+
+
+def _etapa_potencial(v):
+    # Población potencial: área de influencia y grupo etario normativo
+    r, area = v["radio"], v["area"]
+    pob_base = v["base_edad"] * (np.pi * r**2)[..., None] / area[..., None]
+    return {"potencial": np.rint(pob_base[..., None] * v["crecimiento_edad"])}
+
+
+def _etapa_primer_grado(v):
+    # Proporción de matrícula sobre población potencial. Solo primer grado
+    n_hist = v["n_hist"]
+    mat_1g = v["matricula"][..., 0, :n_hist]
+    pop_1g = v["potencial"][..., 0, :n_hist]
+    mascara_1g = mat_1g > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tasas_1g = mat_1g / pop_1g
+    return {
+        "prop_1g": media_geometrica(tasas_1g, mascara_1g),
+        "tasas_1g": tasas_1g,
+        "mascara_1g": mascara_1g,
+        # Matrícula de primer grado sin población potencial: la proporción no está definida
+        "invalido": np.any(mascara_1g & (pop_1g == 0), axis=-1),
+    }
+
+
+def _etapa_transicion(v):
+    return {"tasa_transicion": tasas_de_transicion(v["matricula"], v["n_hist"])}
+
+
+def _etapa_no_promovidos(v):
+    # Tasa de no promovidos sobre la matrícula del primer grado (último año histórico)
+    n_hist = v["n_hist"]
+    mat_ult = v["matricula"][..., 0, n_hist - 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tasa_np = v["no_promovidos"][..., 0, n_hist - 1] / mat_ult
+    return {"prop_np_1g": media_geometrica(tasa_np[..., None], (mat_ult > 0)[..., None])}
+
+
+def _etapa_sin_proyecto(v):
+    # Proyección de la matrícula efectiva sin proyecto
+    n_hist, prop_1g = v["n_hist"], v["prop_1g"]
+    pot_1g = v["potencial"][..., 0, n_hist:]
+    tasas_sp = np.concatenate([prop_1g[..., None], v["tasa_transicion"]], axis=-1)
+    # (los proyectos inválidos de un lote tienen proporciones infinitas; se descartan al final)
+    with np.errstate(invalid="ignore", over="ignore"):
+        primer_sp = np.where(prop_1g[..., None] > 0, np.rint(pot_1g * prop_1g[..., None]), 0)
+        mat_efec_sp = proyectar_cohortes(v["matricula"][..., :, n_hist - 1], primer_sp, tasas_sp)
+    return {"mat_efec_sp": mat_efec_sp}
+
+
+def _etapa_con_proyecto(v):
+    # Proyección de la matrícula efectiva con proyecto
+    n_hist, prop_1g, tasa_transicion = v["n_hist"], v["prop_1g"], v["tasa_transicion"]
+    pot_1g = v["potencial"][..., 0, n_hist:]
+    tasas_cp = np.concatenate([(prop_1g * (v["prop_np_1g"] + 1))[..., None], np.where(tasa_transicion > 1, tasa_transicion, 1.0)], axis=-1)
+    with np.errstate(invalid="ignore", over="ignore"):
+        primer_cp = np.where(tasas_cp[..., :1] > 0, np.rint(pot_1g * tasas_cp[..., :1]), 0)
+        mat_efec_cp = proyectar_cohortes(v["matricula"][..., :, n_hist - 1], primer_cp, tasas_cp)
+    return {"tasas_cp": tasas_cp, "mat_efec_cp": mat_efec_cp}
+
+
+def calcular_aulas(mat_efec_cp, est_by_aula, turnos):
+    """Secciones y aulas necesarias por edad (redondeado al entero superior).
+
+    `est_by_aula` y `turnos` pueden tener más dimensiones que se combinan por broadcasting
+    con las de lote de `mat_efec_cp` (barrido de escenarios).
+    """
+    est_by_aula = est_by_aula[..., None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        secciones = np.ceil(mat_efec_cp / est_by_aula[..., None]).max(axis=-1)
+    secciones = np.where(est_by_aula > 0, secciones, 0)
+    return secciones, aulas_de_secciones(secciones, turnos[..., None])
+
+
+def _etapa_aulas(v):
+    secciones, aulas = calcular_aulas(v["mat_efec_cp"], v["est_by_aula"], v["turnos"])
+    return {"secciones_total": secciones, "aulas_necesarias": aulas}
+
+
+# Series del distrito que usa el cálculo del colegio (salidas de proyectar_distrito)
+CAMPOS_DISTRITO = ("tasa_poptotal", "pop_total", "tasa_by_edad", "base_edad", "crecimiento_edad")
+
+# (nombre, valores de los que depende, función), en orden de cálculo
+ETAPAS = (
+    ("pop_ref", ("radio", "area", "pop_total"), _etapa_pop_ref),
+    ("potencial", ("radio", "area", "base_edad", "crecimiento_edad"), _etapa_potencial),
+    ("primer_grado", ("matricula", "potencial"), _etapa_primer_grado),
+    ("transicion", ("matricula",), _etapa_transicion),
+    ("no_promovidos", ("matricula", "no_promovidos"), _etapa_no_promovidos),
+    ("sin_proyecto", ("matricula", "potencial", "prop_1g", "tasa_transicion"), _etapa_sin_proyecto),
+    ("con_proyecto", ("matricula", "potencial", "prop_1g", "prop_np_1g", "tasa_transicion"), _etapa_con_proyecto),
+    ("aulas", ("mat_efec_cp", "est_by_aula", "turnos"), _etapa_aulas),
+)
+
+# Arrays que devuelve proyectar
+SALIDAS = (
+    "tasa_poptotal", "pop_total", "pop_ref", "tasa_by_edad", "potencial", "prop_1g", "tasas_1g",
+    "mascara_1g", "tasa_transicion", "prop_np_1g", "tasas_cp", "mat_efec_sp", "mat_efec_cp", "secciones_total",
+    "aulas_necesarias", "invalido",
+)
+
+
+def proyectar(entrada, distrito=None):
+    """Calcula todas las proyecciones a partir de la entrada del motor. Devuelve arrays.
+
+    `distrito` permite pasar las series de proyectar_distrito ya calculadas (por ejemplo,
+    desde un IndiceDistritos); en ese caso solo se aplica el cálculo propio del colegio.
+    """
+    if distrito is None:
+        distrito = proyectar_distrito(entrada)
+    valores = {**entrada, **{campo: distrito[campo] for campo in CAMPOS_DISTRITO}}
+    for _, _, etapa in ETAPAS:
+        valores.update(etapa(valores))
+    return {campo: valores[campo] for campo in SALIDAS}
+
+
+# ##################################
+# RESULTADOS
+# ##################################
+def resultados_desde_arrays(entrada, arrays):
+    """Resultados compactos (modelo.Resultados) de un solo proyecto; se leen como el diccionario `resultados`."""
+    return Resultados.desde_arrays(entrada, arrays)
+
+
+def calcular_resultados(datos):
+    """Calcula los `resultados` de un proyecto a partir de `datos`."""
+    entrada = entrada_desde_datos(datos)
+    arrays = proyectar(entrada)
+    if arrays["invalido"]:
+        raise ZeroDivisionError(ERROR_POBLACION_NULA)
+    return resultados_desde_arrays(entrada, arrays)
@@ -0,0 +1,84 @@
+# Tabla de referencia de tasas de crecimiento poblacional por ubigeo
+#
+# Se carga una sola vez por proceso desde datos/tasas_crecimiento.csv (un archivo
+# versionado junto con el código) y queda en memoria como estructura de solo lectura,
+# compartida por todas las peticiones. El archivo tiene una fila por ubigeo: departamento
+# (2 dígitos), provincia (4) o distrito (6). La búsqueda por código es O(1) y, si el
+# código no está, se usa la tasa de su provincia o de su departamento.
+
+import csv
+import os
+import unicodedata
+from functools import lru_cache
+from types import MappingProxyType
+
+import numpy as np
+
+
+RUTA_REFERENCIA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos", "tasas_crecimiento.csv")
+
+
+def normalizar_nombre(nombre):
+    """Nombre en mayúsculas, sin tildes ni espacios repetidos."""
+    nombre = unicodedata.normalize("NFKD", str(nombre or ""))
+    return " ".join("".join(c for c in nombre if not unicodedata.combining(c)).upper().split())
+
+
+class TablaReferencia:
+    """Tasas de crecimiento por ubigeo, de solo lectura."""
+
+    def __init__(self, ubigeos, nombres, tasas, metadatos=None):
+        self.metadatos = MappingProxyType(dict(metadatos or {}))
+        self.version = self.metadatos.get("version", "")
+        self.ubigeos = tuple(ubigeos)
+        self.nombres = tuple(nombres)
+        self.tasas = np.array(tasas, dtype=float)
+        self.tasas.flags.writeable = False
+        self._indice = MappingProxyType({u: i for i, u in enumerate(self.ubigeos)})
+        # Los nombres solo se indexan para departamentos, que no se repiten
+        self._por_nombre = MappingProxyType({normalizar_nombre(n): u for u, n in zip(self.ubigeos, self.nombres) if len(u) == 2})
+
+    def __len__(self):
+        return len(self.ubigeos)
+
+    def __contains__(self, ubigeo):
+        return str(ubigeo).strip() in self._indice
+
+    def buscar(self, ubigeo):
+        """Fila del ubigeo, o de su provincia o departamento si no está: {ubigeo, nombre, tic}. None si no hay."""
+        ubigeo = str(ubigeo or "").strip()
+        for codigo in (ubigeo, ubigeo[:4], ubigeo[:2]):
+            i = self._indice.get(codigo) if codigo else None
+            if i is not None:
+                return {"ubigeo": codigo, "nombre": self.nombres[i], "tic": float(self.tasas[i])}
+        return None
+
+    def tasa(self, ubigeo=None, departamento=None):
+        """Tasa del ubigeo (con respaldo de provincia y departamento) o del departamento por nombre. None si no hay."""
+        fila = self.buscar(ubigeo) if ubigeo else None
+        if fila is None and departamento:
+            fila = self.buscar(self._por_nombre.get(normalizar_nombre(departamento)))
+        return fila["tic"] if fila else None
+
+
+def cargar_referencia(ruta=RUTA_REFERENCIA):
+    """Lee la tabla de referencia. Las líneas "# clave: valor" del inicio son metadatos (versión)."""
+    metadatos = {}
+    with open(ruta, encoding="utf-8", newline="") as f:
+        lineas = [linea for linea in f if linea.strip()]
+    for linea in lineas:
+        if not linea.startswith("#"):
+            break
+        clave, _, valor = linea[1:].partition(":")
+        metadatos[clave.strip()] = valor.strip()
+    filas = list(csv.DictReader(linea for linea in lineas if not linea.startswith("#")))
+    ubigeos = [fila["ubigeo"].strip() for fila in filas]
+    if len(set(ubigeos)) != len(ubigeos):
+        raise ValueError(f"Ubigeos repetidos en la tabla de referencia: {ruta}")
+    return TablaReferencia(ubigeos, [fila["nombre"].strip() for fila in filas], [float(fila["tic"]) for fila in filas], metadatos)
+
+
+@lru_cache(maxsize=None)
+def referencia():
+    """Tabla de referencia del proceso (se carga la primera vez que se pide)."""
+    return cargar_referencia()
@@ -0,0 +1,104 @@
+# Registro estructurado: un objeto JSON por línea
+#
+# Cada evento lleva un nombre y campos de resumen (proyecto, tamaños, duraciones) en lugar
+# de las tablas completas. Los campos se calculan solo si el nivel está habilitado y el
+# evento pasa el muestreo, y la escritura ocurre en un hilo aparte (QueueHandler +
+# QueueListener), de modo que el hilo de la petición no espera a la consola ni al disco.
+#
+# Variables de entorno: LOG_NIVEL (INFO por defecto; DEBUG agrega las tablas completas)
+# y LOG_MUESTREO (fracción de eventos de alto volumen que se registran, 1 por defecto).
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+
+
+logger = logging.getLogger("demanda")
+
+_estado = {"muestreo": 1.0, "listener": None}
+
+
+class FormatoJSON(logging.Formatter):
+    """Formatea un registro como una línea JSON con sus campos estructurados."""
+
+    def format(self, record):
+        linea = {
+            "ts": round(record.created, 3),
+            "nivel": record.levelname,
+            "evento": record.getMessage(),
+        }
+        linea.update(getattr(record, "campos", {}))
+        if record.exc_info:
+            linea["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(linea, ensure_ascii=False, default=str)
+
+
+def configurar_registro(nivel=None, muestreo=None, destino=None):
+    """Configura el logger "demanda" con escritura asíncrona. Se puede llamar más de una vez."""
+    nivel = nivel or os.environ.get("LOG_NIVEL", "INFO")
+    logger.setLevel(nivel.upper() if isinstance(nivel, str) else nivel)
+    _estado["muestreo"] = float(os.environ.get("LOG_MUESTREO", 1.0) if muestreo is None else muestreo)
+    if _estado["listener"] is not None:
+        return logger
+
+    salida = logging.StreamHandler(destino or sys.stderr)
+    salida.setFormatter(FormatoJSON())
+    cola = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(cola, salida)
+    listener.start()
+    atexit.register(listener.stop)
+    _estado["listener"] = listener
+
+    logger.addHandler(logging.handlers.QueueHandler(cola))
+    logger.propagate = False
+    return logger
+
+
+def registrar(nivel, evento, campos=None, muestrear=False):
+    """Registra `evento` con `campos` (dict, o función que lo devuelve).
+
+    Si el nivel no está habilitado no se calcula nada. Con muestrear=True solo se
+    registra una fracción LOG_MUESTREO de los eventos (WARNING y superiores, siempre).
+    """
+    if not logger.isEnabledFor(nivel):
+        return
+    tasa = _estado["muestreo"]
+    if muestrear and nivel < logging.WARNING and tasa < 1:
+        if random.random() >= tasa:
+            return
+    campos = campos() if callable(campos) else dict(campos or {})
+    if muestrear and tasa < 1:
+        campos["muestreo"] = tasa
+    logger.log(nivel, evento, extra={"campos": campos})
+
+
+# ##################################
+# RESÚMENES
+# ##################################
+def resumen_datos(datos):
+    """Campos de resumen de `datos`: identificación del proyecto y tamaño de las tablas."""
+    return {
+        "proyecto": datos.get("nombre_proyecto"),
+        "distrito": datos.get("distrito"),
+        "nivel_educativo": datos.get("nivel"),
+        "anio_form": datos.get("anio_form"),
+        "anio_f": datos.get("anio_f"),
+        "edades": len(datos.get("edades") or ()),
+        "anios_matricula": len(datos.get("dic_mat_by_anio") or ()),
+        "anios_poblacion": len(datos.get("dic_pop_edad") or ()),
+    }
+
+
+def resumen_resultados(resultados):
+    """Campos de resumen de `resultados`: huella, cantidad de celdas y tasas principales."""
+    return {
+        "id_resultados": resultados.get("id"),
+        "celdas": sum(len(fila) for fila in resultados.get("dic_pop_potencial", {}).values()),
+        "tasa_poptotal": resultados.get("tasa_poptotal"),
+        "aulas": sum(fila.get("aulas_necesarias", 0) for fila in resultados.get("aulas_by_edad", {}).values()),
+    }
@@ -0,0 +1,595 @@
+# Informes del proyecto en PDF y XLSX, generados en el servidor
+#
+# El PDF se escribe directamente, sin dependencias: texto en Helvetica, tablas y gráficos
+# vectoriales como operaciones de dibujo, con los flujos comprimidos. El XLSX es un libro
+# Office Open XML mínimo escrito con zipfile. Los gráficos ya dibujados se guardan en un
+# cache por contenido, de modo que los informes con las mismas series (por ejemplo, la
+# población de un mismo distrito) los reutilizan, y el marco fijo de cada página se arma
+# una sola vez.
+#
+# Modo lote: python reportes.py proyectos.json carpeta_salida [--formatos pdf,xlsx] [--workers 8]
+
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+import re
+import threading
+import zipfile
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from lote import evaluar_lote_paralelo
+
+
+FORMATOS = {
+    "pdf": "application/pdf",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+A4 = (595, 842)
+MARGEN = 40
+COLORES = {
+    "negro": (0, 0, 0),
+    "gris": (0.55, 0.55, 0.55),
+    "gris_claro": (0.93, 0.93, 0.93),
+    "azul": (0.21, 0.64, 0.92),
+    "rojo": (1.0, 0.39, 0.52),
+    "amarillo": (1.0, 0.76, 0.03),
+    "verde": (0.29, 0.75, 0.75),
+    "morado": (0.6, 0.4, 1.0),
+    "naranja": (1.0, 0.62, 0.25),
+}
+PALETA = ("azul", "rojo", "verde", "naranja", "morado", "amarillo")
+
+# Anchos de Helvetica (milésimas del tamaño de letra) de los caracteres ASCII 32 a 126
+_ANCHOS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+
+
+def ancho_texto(texto, tam, negrita=False):
+    ancho = sum(_ANCHOS[ord(c) - 32] if 32 <= ord(c) <= 126 else 556 for c in str(texto))
+    return ancho * tam / 1000 * (1.05 if negrita else 1.0)
+
+
+def envolver(texto, ancho, tam, negrita=False):
+    """Divide un texto en líneas que no superan `ancho` puntos."""
+    lineas, actual = [], ""
+    for palabra in str(texto).split():
+        candidata = f"{actual} {palabra}".strip()
+        if actual and ancho_texto(candidata, tam, negrita) > ancho:
+            lineas.append(actual)
+            actual = palabra
+        else:
+            actual = candidata
+    return lineas + [actual] if actual else lineas
+
+
+def _cadena_pdf(texto):
+    texto = str(texto).encode("cp1252", errors="replace")
+    return b"(" + texto.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _redondeado(valor, decimales=2):
+    try:
+        return f"{round(float(valor), decimales):g}"
+    except (TypeError, ValueError):
+        return valor
+
+
+def _numero(valor):
+    return f"{valor:,.0f}" if isinstance(valor, (int, float)) else str(valor)
+
+
+# ##################################
+# DIBUJO
+# ##################################
+class Lienzo:
+    """Operaciones de dibujo de una página (o de un gráfico) en coordenadas PDF."""
+
+    def __init__(self):
+        self.ops = []
+
+    @staticmethod
+    def _color(color, trazo=False):
+        r, g, b = COLORES.get(color, color)
+        return f"{r:.3f} {g:.3f} {b:.3f} {'RG' if trazo else 'rg'}".encode()
+
+    def texto(self, x, y, texto, tam=9, negrita=False, alinear="izq", color="negro"):
+        if alinear == "der":
+            x -= ancho_texto(texto, tam, negrita)
+        elif alinear == "centro":
+            x -= ancho_texto(texto, tam, negrita) / 2
+        fuente = b"/F2" if negrita else b"/F1"
+        self.ops.append(b"BT " + fuente + f" {tam:g} Tf ".encode() + self._color(color)
+                        + f" {x:.2f} {y:.2f} Td ".encode() + _cadena_pdf(texto) + b" Tj ET")
+
+    def linea(self, x1, y1, x2, y2, color="negro", grosor=0.5):
+        self.ops.append(self._color(color, True) + f" {grosor:g} w {x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S".encode())
+
+    def polilinea(self, puntos, color="negro", grosor=1.2):
+        if len(puntos) < 2:
+            return
+        trazo = " ".join(f"{x:.2f} {y:.2f} {'m' if i == 0 else 'l'}" for i, (x, y) in enumerate(puntos))
+        self.ops.append(self._color(color, True) + f" {grosor:g} w {trazo} S".encode())
+
+    def rect(self, x, y, ancho, alto, relleno=None, borde=None, grosor=0.5):
+        op = "B" if relleno and borde else ("f" if relleno else "S")
+        partes = [self._color(relleno)] if relleno else []
+        if borde:
+            partes.append(self._color(borde, True) + f" {grosor:g} w".encode())
+        partes.append(f"{x:.2f} {y:.2f} {ancho:.2f} {alto:.2f} re {op}".encode())
+        self.ops.append(b" ".join(partes))
+
+    def incluir(self, contenido, x, y):
+        """Inserta operaciones ya dibujadas (un gráfico) desplazadas a (x, y)."""
+        self.ops.append(f"q 1 0 0 1 {x:.2f} {y:.2f} cm".encode() + b"\n" + contenido + b"\nQ")
+
+    def contenido(self):
+        return b"\n".join(self.ops)
+
+
+def _escala(maximo):
+    # Máximo "redondo" del eje y su paso (1, 2 o 5 por una potencia de 10)
+    if maximo <= 0:
+        return 1, 1
+    bruto = maximo / 5
+    potencia = 10 ** math.floor(math.log10(bruto))
+    paso = next(m * potencia for m in (1, 2, 5, 10) if m * potencia >= bruto)
+    return paso * math.ceil(maximo / paso), paso
+
+
+# Gráficos ya dibujados, por contenido (LRU)
+_graficos = OrderedDict()
+_graficos_lock = threading.Lock()
+MAX_GRAFICOS = 512
+estadisticas_graficos = {"aciertos": 0, "fallos": 0}
+
+
+def grafico(tipo, ancho, alto, titulo, etiquetas, series):
+    """Operaciones de dibujo de un gráfico de "barras" o "lineas" con origen en (0, 0).
+
+    series: lista de (nombre, valores, color). El resultado se guarda en un cache por
+    contenido y se reutiliza entre informes.
+    """
+    clave = hashlib.sha1(repr((tipo, ancho, alto, titulo, list(etiquetas), [(n, list(v), c) for n, v, c in series])).encode()).hexdigest()
+    with _graficos_lock:
+        if clave in _graficos:
+            _graficos.move_to_end(clave)
+            estadisticas_graficos["aciertos"] += 1
+            return _graficos[clave]
+        estadisticas_graficos["fallos"] += 1
+
+    lienzo = Lienzo()
+    lienzo.texto(0, alto - 10, titulo, tam=10, negrita=True)
+    # Leyenda (en varias filas si no cabe en una)
+    x, y = 0, alto - 24
+    for nombre, _, color in series:
+        ancho_item = ancho_texto(nombre, 7) + 24
+        if x and x + ancho_item > ancho:
+            x, y = 0, y - 11
+        lienzo.rect(x, y, 8, 8, relleno=color)
+        lienzo.texto(x + 11, y + 1, nombre, tam=7)
+        x += ancho_item
+
+    izq, abajo, arriba = 38, 14, alto - y + 8
+    area_ancho, area_alto = ancho - izq, alto - abajo - arriba
+    maximo, paso = _escala(max((max(v) for _, v, _ in series if len(v)), default=0))
+    valor = 0
+    while valor <= maximo + paso / 2:
+        y = abajo + area_alto * valor / maximo
+        lienzo.linea(izq, y, ancho, y, color="gris_claro")
+        lienzo.texto(izq - 3, y - 2.5, _numero(valor), tam=6, alinear="der", color="gris")
+        valor += paso
+    lienzo.linea(izq, abajo, ancho, abajo, color="gris")
+
+    n = max(len(etiquetas), 1)
+    celda = area_ancho / n
+    # Etiquetas del eje x (se saltan algunas si no caben)
+    salto = max(1, math.ceil(n * ancho_texto("0000", 6) * 1.4 / area_ancho))
+    for i, etiqueta in enumerate(etiquetas):
+        if i % salto == 0:
+            lienzo.texto(izq + celda * (i + 0.5), abajo - 9, etiqueta, tam=6, alinear="centro", color="gris")
+
+    if tipo == "barras":
+        ancho_barra = celda * 0.8 / max(len(series), 1)
+        for k, (_, valores, color) in enumerate(series):
+            for i, v in enumerate(valores):
+                alto_barra = area_alto * v / maximo
+                lienzo.rect(izq + celda * (i + 0.1) + ancho_barra * k, abajo, ancho_barra, alto_barra, relleno=color)
+    else:
+        for _, valores, color in series:
+            lienzo.polilinea([(izq + celda * (i + 0.5), abajo + area_alto * v / maximo) for i, v in enumerate(valores)], color=color)
+
+    contenido = lienzo.contenido()
+    with _graficos_lock:
+        _graficos[clave] = contenido
+        while len(_graficos) > MAX_GRAFICOS:
+            _graficos.popitem(last=False)
+    return contenido
+
+
+def tabla(lienzo, x, y, encabezados, filas, anchos, tam=7.5, alto_fila=13):
+    """Dibuja una tabla con encabezado desde (x, y) hacia abajo y devuelve la y final."""
+    total = sum(anchos)
+    lienzo.rect(x, y - alto_fila, total, alto_fila, relleno="gris_claro")
+    for fila_i, fila in enumerate([encabezados] + filas):
+        negrita = fila_i == 0 or str(fila[0]) == "Total"
+        cx = x
+        for j, (valor, ancho) in enumerate(zip(fila, anchos)):
+            if j == 0:
+                lienzo.texto(cx + 3, y - alto_fila + 4, valor, tam=tam, negrita=negrita)
+            else:
+                lienzo.texto(cx + ancho - 3, y - alto_fila + 4, _numero(valor), tam=tam, negrita=negrita, alinear="der")
+            cx += ancho
+        y -= alto_fila
+        lienzo.linea(x, y, x + total, y, color="gris_claro")
+    return y
+
+
+@lru_cache(maxsize=64)
+def _marco_pagina(numero, total):
+    # Encabezado y pie fijos de cada página
+    lienzo = Lienzo()
+    ancho, alto = A4
+    lienzo.rect(0, alto - 28, ancho, 28, relleno="gris_claro")
+    lienzo.texto(MARGEN, alto - 18, "Módulo de Estimación de Demanda - InverData.pe", tam=9, negrita=True)
+    lienzo.texto(ancho - MARGEN, alto - 18, "Informe de demanda educativa", tam=8, alinear="der", color="gris")
+    lienzo.linea(MARGEN, 30, ancho - MARGEN, 30, color="gris")
+    lienzo.texto(ancho - MARGEN, 18, f"Página {numero} de {total}", tam=7, alinear="der", color="gris")
+    return lienzo.contenido()
+
+
+def pdf_desde_paginas(paginas):
+    """Arma un PDF con una página A4 por cada contenido (operaciones de dibujo)."""
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Páginas, se completa al final
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    hijos = []
+    for i, contenido in enumerate(paginas, 1):
+        flujo = zlib.compress(_marco_pagina(i, len(paginas)) + b"\n" + contenido)
+        objetos.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(flujo) + flujo + b"\nendstream")
+        objetos.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+                       % (A4[0], A4[1], len(objetos)))
+        hijos.append(b"%d 0 R" % len(objetos))
+    objetos[1] = b"<< /Type /Pages /Kids [" + b" ".join(hijos) + b"] /Count %d >>" % len(hijos)
+
+    salida = io.BytesIO()
+    salida.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    posiciones = []
+    for i, objeto in enumerate(objetos, 1):
+        posiciones.append(salida.tell())
+        salida.write(b"%d 0 obj\n" % i + objeto + b"\nendobj\n")
+    inicio_xref = salida.tell()
+    salida.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1))
+    for posicion in posiciones:
+        salida.write(b"%010d 00000 n \n" % posicion)
+    salida.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, inicio_xref))
+    return salida.getvalue()
+
+
+# ##################################
+# CONTENIDO DEL INFORME
+# ##################################
+def _tablas_edad_anio(resultados):
+    return (
+        ("Matrícula efectiva con proyecto", resultados["dic_mat_efec_cp"]),
+        ("Matrícula efectiva sin proyecto", resultados["dic_mat_efec_sp"]),
+        ("Población demandante potencial", resultados["dic_pop_potencial"]),
+    )
+
+
+def _indicadores(datos, resultados):
+    aulas = resultados.get("aulas_by_edad", {})
+    return (
+        ("Máxima demanda con proyecto", resultados["max_suma_tot_byaño_dic_mat_efec_cp"]),
+        ("Máxima demanda sin proyecto", resultados["max_suma_tot_byaño_dic_mat_efec_sp"]),
+        ("Población potencial máxima", resultados["max_suma_tot_byaño_dic_pop_potencial"]),
+        ("Aulas necesarias", sum(a["aulas_necesarias"] for a in aulas.values())),
+        ("Secciones", sum(a["secciones_total"] for a in aulas.values())),
+        ("Tasa de crecimiento del distrito", f"{resultados.get('tasa_poptotal', 0):.4%}"),
+    )
+
+
+def pdf_reporte(datos, resultados):
+    """Informe en PDF de un proyecto: datos generales, indicadores, gráficos y tablas."""
+    ancho_util = A4[0] - 2 * MARGEN
+    paginas = []
+    pagina = Lienzo()
+    y = A4[1] - 55
+
+    for linea in envolver(datos.get("nombre_colegio", ""), ancho_util, 14, True):
+        pagina.texto(MARGEN, y, linea, tam=14, negrita=True)
+        y -= 17
+    generales = (
+        f"Proyecto: {datos.get('nombre_proyecto', '')}",
+        f"Distrito: {datos.get('distrito', '')}  -  Nivel educativo: {datos.get('nivel', '')}  -  Año de formulación: {datos.get('anio_form', '')}",
+        f"Área del distrito: {_redondeado(datos.get('area_distrito'))} km²  -  Radio de influencia: {_redondeado(datos.get('radio_influencia'))} km  -  "
+        f"Área de influencia: {_redondeado(resultados.get('area_influencia'))} km²",
+        f"Turnos: {datos.get('turnos', '')}  -  Estudiantes por aula: {_redondeado(datos.get('est_by_aula'))}",
+    )
+    for linea in generales:
+        pagina.texto(MARGEN, y, linea, tam=8.5)
+        y -= 12
+
+    # Indicadores en dos columnas
+    y -= 6
+    for i, (nombre, valor) in enumerate(_indicadores(datos, resultados)):
+        x = MARGEN + (i % 2) * ancho_util / 2
+        pagina.texto(x, y, f"{nombre}:", tam=8.5)
+        pagina.texto(x + ancho_util / 2 - 12, y, _numero(valor), tam=8.5, negrita=True, alinear="der")
+        if i % 2:
+            y -= 12
+    y -= 14
+
+    anios = list(resultados["suma_tot_byaño_dic_mat_efec_cp"])
+    alto = 140
+    y -= alto
+    pagina.incluir(grafico("barras", ancho_util, alto, "Demanda total por año", anios, [
+        ("Con proyecto", list(resultados["suma_tot_byaño_dic_mat_efec_cp"].values()), "azul"),
+        ("Sin proyecto", list(resultados["suma_tot_byaño_dic_mat_efec_sp"].values()), "rojo"),
+    ]), MARGEN, y)
+    y -= 20 + alto
+    edades = list(resultados["dic_mat_efec_cp"])
+    pagina.incluir(grafico("lineas", ancho_util / 2 - 10, alto, "Matrícula con proyecto por edad", anios, [
+        (f"Edad {edad}", list(resultados["dic_mat_efec_cp"][edad].values()), PALETA[i % len(PALETA)]) for i, edad in enumerate(edades)
+    ]), MARGEN, y)
+    pagina.incluir(grafico("barras", ancho_util / 2 - 10, alto, "Aulas necesarias por edad", [str(e) for e in edades], [
+        ("Aulas necesarias", [resultados["aulas_by_edad"][e]["aulas_necesarias"] for e in edades], "amarillo"),
+    ]), MARGEN + ancho_util / 2 + 10, y)
+    y -= 20 + alto
+    # La población del distrito es la misma para todos los colegios del distrito: su gráfico se reutiliza
+    if y > MARGEN:
+        pagina.incluir(grafico("barras", ancho_util, alto, f"Población total del distrito {datos.get('distrito', '')}", list(resultados["dic_pop_total"]), [
+            ("Población total", list(resultados["dic_pop_total"].values()), "verde"),
+        ]), MARGEN, y)
+    paginas.append(pagina.contenido())
+
+    # Tablas edad×año, de a 10 años por bloque
+    pagina, y = Lienzo(), A4[1] - 55
+    columnas = 10
+    for titulo, filas in _tablas_edad_anio(resultados):
+        for inicio in range(0, len(anios), columnas):
+            bloque = anios[inicio:inicio + columnas]
+            altura = 14 * (len(edades) + 2) + 30
+            if y - altura < MARGEN:
+                paginas.append(pagina.contenido())
+                pagina, y = Lienzo(), A4[1] - 55
+            pagina.texto(MARGEN, y, titulo if inicio == 0 else f"{titulo} (continuación)", tam=10, negrita=True)
+            cuerpo = [[f"Edad {e}"] + [filas[e][a] for a in bloque] for e in edades]
+            cuerpo.append(["Total"] + [sum(filas[e][a] for e in edades) for a in bloque])
+            anchos = [60] + [(ancho_util - 60) / columnas] * len(bloque)
+            y = tabla(pagina, MARGEN, y - 8, ["Edad \\ Año"] + [str(a) for a in bloque], cuerpo, anchos) - 18
+
+    # Aulas por edad
+    if y - 14 * (len(edades) + 2) - 30 < MARGEN:
+        paginas.append(pagina.contenido())
+        pagina, y = Lienzo(), A4[1] - 55
+    pagina.texto(MARGEN, y, "Aulas por edad", tam=10, negrita=True)
+    aulas = resultados["aulas_by_edad"]
+    cuerpo = [[f"Edad {e}", aulas[e]["secciones_total"], aulas[e]["aulas_necesarias"]] for e in edades]
+    cuerpo.append(["Total", sum(aulas[e]["secciones_total"] for e in edades), sum(aulas[e]["aulas_necesarias"] for e in edades)])
+    y = tabla(pagina, MARGEN, y - 8, ["Edad", "Secciones", "Aulas necesarias"], cuerpo, [60, 90, 90]) - 18
+
+    # Aulas por nivel y cantidad de turnos
+    por_nivel = resultados.get("aulas_by_nivel")
+    if por_nivel:
+        turnos = list(resultados["list_turnos"])
+        if y - 14 * (len(por_nivel) + 1) - 30 < MARGEN:
+            paginas.append(pagina.contenido())
+            pagina, y = Lienzo(), A4[1] - 55
+        pagina.texto(MARGEN, y, "Aulas por nivel y turnos", tam=10, negrita=True)
+        cuerpo = [[nivel, a["secciones_total"]] + [a["aulas_by_turnos"][t] for t in turnos] for nivel, a in por_nivel.items()]
+        tabla(pagina, MARGEN, y - 8, ["Nivel", "Secciones"] + [f"{t} turno{'s' if t > 1 else ''}" for t in turnos], cuerpo,
+              [110, 70] + [70] * len(turnos))
+    paginas.append(pagina.contenido())
+    return pdf_desde_paginas(paginas)
+
+
+# ##################################
+# XLSX
+# ##################################
+def _columna(i):
+    letras = ""
+    i += 1
+    while i:
+        i, resto = divmod(i - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _hoja_xml(filas):
+    partes = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+              '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>']
+    for i, fila in enumerate(filas, 1):
+        partes.append(f'<row r="{i}">')
+        estilo = ' s="1"' if i == 1 else ""
+        for j, valor in enumerate(fila):
+            ref = f"{_columna(j)}{i}"
+            if valor is None:
+                continue
+            if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                partes.append(f'<c r="{ref}"{estilo}><v>{valor!r}</v></c>')
+            else:
+                texto = escape(re.sub(r"[\x00-\x08\x0b\x0c\x0e-\x1f]", "", str(valor)))
+                partes.append(f'<c r="{ref}"{estilo} t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>')
+        partes.append("</row>")
+    partes.append("</sheetData></worksheet>")
+    return "".join(partes)
+
+
+def xlsx_desde_hojas(hojas):
+    """Libro XLSX a partir de [(nombre, filas)]; la primera fila de cada hoja va en negrita."""
+    salida = io.BytesIO()
+    with zipfile.ZipFile(salida, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml",
+                   '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                   '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                   '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                   '<Default Extension="xml" ContentType="application/xml"/>'
+                   '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                   '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+                   + "".join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                             for i in range(1, len(hojas) + 1))
+                   + "</Types>")
+        z.writestr("_rels/.rels",
+                   '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                   '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+                   "</Relationships>")
+        z.writestr("xl/workbook.xml",
+                   '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                   '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                   'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+                   + "".join(f'<sheet name="{escape(nombre[:31])}" sheetId="{i}" r:id="rId{i}"/>' for i, (nombre, _) in enumerate(hojas, 1))
+                   + "</sheets></workbook>")
+        z.writestr("xl/_rels/workbook.xml.rels",
+                   '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                   '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   + "".join(f'<Relationship Id="rId{i}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                             for i in range(1, len(hojas) + 1))
+                   + f'<Relationship Id="rId{len(hojas) + 1}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+                   "</Relationships>")
+        z.writestr("xl/styles.xml",
+                   '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                   '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                   '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+                   '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+                   '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+                   '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+                   '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+                   '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+                   '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+                   "</styleSheet>")
+        for i, (_, filas) in enumerate(hojas, 1):
+            z.writestr(f"xl/worksheets/sheet{i}.xml", _hoja_xml(filas))
+    return salida.getvalue()
+
+
+def xlsx_reporte(datos, resultados):
+    """Libro XLSX de un proyecto: resumen, tablas edad×año, aulas, totales y tasas."""
+    anios = list(resultados["suma_tot_byaño_dic_mat_efec_cp"])
+    edades = list(resultados["dic_mat_efec_cp"])
+    resumen = [["Campo", "Valor"]] + [[nombre, datos.get(campo)] for nombre, campo in (
+        ("Proyecto", "nombre_proyecto"), ("Colegio", "nombre_colegio"), ("Distrito", "distrito"), ("Nivel", "nivel"),
+        ("Año de formulación", "anio_form"), ("Radio de influencia (km)", "radio_influencia"),
+        ("Área del distrito (km²)", "area_distrito"), ("Estudiantes por aula", "est_by_aula"), ("Turnos", "turnos"),
+    )] + [[nombre, valor] for nombre, valor in _indicadores(datos, resultados)]
+    hojas = [("Resumen", resumen)]
+    for titulo, filas in _tablas_edad_anio(resultados):
+        cuerpo = [["Edad"] + anios] + [[e] + [filas[e][a] for a in anios] for e in edades]
+        cuerpo.append(["Total"] + [sum(filas[e][a] for e in edades) for a in anios])
+        hojas.append((titulo, cuerpo))
+    aulas = resultados["aulas_by_edad"]
+    hojas.append(("Aulas por edad", [["Edad", "Secciones", "Aulas necesarias"]]
+                  + [[e, aulas[e]["secciones_total"], aulas[e]["aulas_necesarias"]] for e in edades]))
+    por_nivel = resultados.get("aulas_by_nivel")
+    if por_nivel:
+        turnos = list(resultados["list_turnos"])
+        hojas.append(("Aulas por nivel", [["Nivel", "Edades", "Secciones"] + [f"Aulas con {t} turno{'s' if t > 1 else ''}" for t in turnos]]
+                      + [[nivel, f"{a['edades'][0]}-{a['edades'][-1]}", a["secciones_total"]] + [a["aulas_by_turnos"][t] for t in turnos]
+                         for nivel, a in por_nivel.items()]))
+    hojas.append(("Totales por año", [["Año", "Población total", "Población referencial", "Población potencial",
+                                       "Matrícula sin proyecto", "Matrícula con proyecto"]]
+                  + [[a, resultados["dic_pop_total"][a], resultados["dic_pop_ref"][a], resultados["suma_tot_byaño_dic_pop_potencial"][a],
+                      resultados["suma_tot_byaño_dic_mat_efec_sp"][a], resultados["suma_tot_byaño_dic_mat_efec_cp"][a]] for a in anios]))
+    hojas.append(("Tasas", [["Edad", "Tasa de crecimiento", "Tasa de transición", "Tasa con proyecto"]]
+                  + [[e, resultados["tasa_by_edad"].get(e), resultados["tasa_transicion"].get(e), resultados["tasas_cp"].get(e)] for e in edades]))
+    return xlsx_desde_hojas(hojas)
+
+
+def reporte(datos, resultados, formato):
+    """Bytes del informe en `formato` ("pdf" o "xlsx")."""
+    if formato == "pdf":
+        return pdf_reporte(datos, resultados)
+    if formato == "xlsx":
+        return xlsx_reporte(datos, resultados)
+    raise ValueError(f"Formato de informe desconocido: {formato}")
+
+
+# ##################################
+# MODO LOTE
+# ##################################
+def nombre_archivo(id_proyecto):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", str(id_proyecto)).strip("._") or "proyecto"
+
+
+def escribir_reporte(datos, resultados, ruta_base, formatos=("pdf", "xlsx")):
+    """Escribe un informe por formato en `ruta_base`.<formato> y devuelve las rutas."""
+    rutas = []
+    for formato in formatos:
+        ruta = f"{ruta_base}.{formato}"
+        with open(ruta, "wb") as f:
+            f.write(reporte(datos, resultados, formato))
+        rutas.append(ruta)
+    return rutas
+
+
+def generar_reportes(proyectos, directorio, formatos=("pdf", "xlsx"), workers=None, avance=None):
+    """Calcula los proyectos en lote y escribe un informe por colegio, en paralelo.
+
+    El cálculo y los informes comparten un solo pool de `workers` procesos: cada informe
+    se encarga en cuanto su proyecto está calculado. Devuelve [{"id", "archivos", "error"}]
+    en el orden de entrada. avance(hechos, total) informa el progreso de ambas fases:
+    cada proyecto cuenta una vez al calcularse y otra al escribirse (o descartarse) su informe.
+    """
+    proyectos = list(proyectos)
+    os.makedirs(directorio, exist_ok=True)
+    salida, pendientes, usados = [], [], set()
+    total, hechos = 2 * len(proyectos), 0
+
+    def informar():
+        if avance is not None:
+            avance(hechos, total)
+
+    informar()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for proyecto, fila in zip(proyectos, evaluar_lote_paralelo(proyectos, executor=executor)):
+            item = {"id": fila["id"], "archivos": [], "error": fila["error"]}
+            salida.append(item)
+            # Un proyecto con error no tiene informe: sus dos pasos cuentan ya
+            hechos += 2 if fila["error"] else 1
+            informar()
+            if fila["error"]:
+                continue
+            nombre = nombre_archivo(fila["id"])
+            while nombre in usados:
+                nombre += "_"
+            usados.add(nombre)
+            pendientes.append((item, executor.submit(escribir_reporte, proyecto, fila["resultados"], os.path.join(directorio, nombre), formatos)))
+        for item, futuro in pendientes:
+            try:
+                item["archivos"] = [os.path.basename(ruta) for ruta in futuro.result()]
+            except Exception as e:
+                item["error"] = f"Error al generar el informe: {e}"
+            hechos += 1
+            informar()
+    return salida
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Informes PDF/XLSX en lote, uno por colegio")
+    parser.add_argument("entrada", help="Archivo JSON con la lista de proyectos")
+    parser.add_argument("salida", help="Carpeta donde se escriben los informes")
+    parser.add_argument("--formatos", default="pdf,xlsx")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    with open(args.entrada, encoding="utf-8") as f:
+        proyectos = json.load(f)
+    for item in generar_reportes(proyectos, args.salida, tuple(args.formatos.split(",")), args.workers):
+        if item["error"]:
+            print(f"{item['id']}: {item['error']}")
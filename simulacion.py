@@ -0,0 +1,117 @@
+# Simulación de Monte Carlo: bandas de incertidumbre de la matrícula y de las aulas
+#
+# prop_1g y tasa_transicion son medias geométricas de unos pocos cocientes históricos.
+# Cada muestra remuestrea con reemplazo los años históricos (bootstrap por años
+# completos): los años sorteados son los mismos para el primer grado y para todas las
+# transiciones, de modo que un año de alta matrícula se repite en todas las edades a la
+# vez. Con las tasas remuestreadas se proyectan las cohortes. Todo se calcula con arrays
+# muestras×edades×años; las muestras se generan por bloques con semillas derivadas de
+# una sola, de modo que el resultado no depende de si los bloques corren en paralelo.
+#
+# prop_np_1g se calcula con un solo año (el último histórico), así que no tiene
+# variabilidad que remuestrear y se mantiene en su valor puntual.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from proyeccion import ERROR_POBLACION_NULA, calcular_aulas, media_geometrica, proyectar, proyectar_cohortes, ratios_de_transicion
+
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def remuestrear_anios(n_anios, n_muestras, rng):
+    """Índices de años históricos sorteados con reemplazo, (n_muestras, n_anios)."""
+    return rng.integers(n_anios, size=(n_muestras, n_anios))
+
+
+def remuestrear_media_geometrica(valores, mascara, indices, puntual):
+    """Media geométrica de los años `indices` (último eje de `valores`). Devuelve (n_muestras, ...).
+
+    Los años sorteados que no son válidos para una edad se descartan; si ninguno lo es,
+    esa edad conserva su valor `puntual`.
+    """
+    muestras = np.moveaxis(np.take(valores, indices, axis=-1), -2, 0)
+    validos = np.moveaxis(np.take(mascara, indices, axis=-1), -2, 0)
+    media = media_geometrica(muestras, validos)
+    return np.where(validos.any(axis=-1), media, puntual)
+
+
+def _simular_bloque(entrada, puntual, n_muestras, semilla):
+    # Matrícula sin y con proyecto (muestras, edades, años) y aulas por edad de un bloque
+    rng = np.random.default_rng(semilla)
+    n_hist = entrada["n_hist"]
+    matricula = entrada["matricula"]
+
+    # Un año histórico t aporta la tasa de primer grado de t y la transición que llega a t
+    # (el primer año no tiene transición). Los cocientes de transición van en el orden de
+    # ratios_de_transicion, que coincide con el de los años cuando no hay matrícula nula.
+    ratios, mascara = ratios_de_transicion(matricula, n_hist)
+    ratios = np.concatenate([np.ones(ratios.shape[:-1] + (1,)), ratios], axis=-1)
+    mascara = np.concatenate([np.zeros(mascara.shape[:-1] + (1,), dtype=bool), mascara], axis=-1)
+    indices = remuestrear_anios(n_hist, n_muestras, rng)
+    prop_1g = remuestrear_media_geometrica(puntual["tasas_1g"], puntual["mascara_1g"], indices, puntual["prop_1g"])
+    tasa_transicion = remuestrear_media_geometrica(ratios, mascara, indices, puntual["tasa_transicion"])
+
+    pot_1g = puntual["potencial"][0, n_hist:]
+    inicial = np.broadcast_to(matricula[:, n_hist - 1], (n_muestras, matricula.shape[0]))
+    tasas_sp = np.concatenate([prop_1g[:, None], tasa_transicion], axis=-1)
+    tasas_cp = np.concatenate([(prop_1g * (puntual["prop_np_1g"] + 1))[:, None], np.where(tasa_transicion > 1, tasa_transicion, 1.0)], axis=-1)
+    primer_sp = np.where(prop_1g[:, None] > 0, np.rint(pot_1g * prop_1g[:, None]), 0)
+    primer_cp = np.where(tasas_cp[:, :1] > 0, np.rint(pot_1g * tasas_cp[:, :1]), 0)
+    mat_efec_sp = proyectar_cohortes(inicial, primer_sp, tasas_sp)
+    mat_efec_cp = proyectar_cohortes(inicial, primer_cp, tasas_cp)
+    _, aulas = calcular_aulas(mat_efec_cp, entrada["est_by_aula"], entrada["turnos"])
+    return mat_efec_sp[..., 1:], mat_efec_cp[..., 1:], aulas
+
+
+def _bandas(muestras, percentiles):
+    # Percentiles sobre el eje de muestras, como listas planas por percentil
+    valores = np.rint(np.percentile(muestras, percentiles, axis=0)).astype(int)
+    return {f"p{p:g}": v.ravel().tolist() if v.ndim else int(v) for p, v in zip(percentiles, valores)}
+
+
+def simular(entrada, n_muestras=10_000, semilla=0, percentiles=PERCENTILES, workers=None, tam_bloque=2_500, distrito=None):
+    """Bandas de percentiles de la matrícula proyectada y de las aulas necesarias.
+
+    Con workers > 1 los bloques de `tam_bloque` muestras se reparten en un
+    ProcessPoolExecutor. Las tablas edad×año se devuelven planas (la edad varía más
+    lento), como en la API de resultados. Lanza ZeroDivisionError si la entrada no es válida.
+    """
+    n_muestras = int(n_muestras)
+    if n_muestras < 1:
+        raise ValueError("La cantidad de muestras debe ser al menos 1.")
+    puntual = proyectar(entrada, distrito)
+    if puntual["invalido"]:
+        raise ZeroDivisionError(ERROR_POBLACION_NULA)
+
+    tamanios = [min(tam_bloque, n_muestras - i) for i in range(0, n_muestras, tam_bloque)]
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanios))
+    argumentos = [(entrada, puntual, n, s) for n, s in zip(tamanios, semillas)]
+    if workers and workers > 1 and len(argumentos) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, os.cpu_count() or 1)) as executor:
+            bloques = list(executor.map(_simular_bloque, *zip(*argumentos)))
+    else:
+        bloques = [_simular_bloque(*a) for a in argumentos]
+    mat_efec_sp, mat_efec_cp, aulas = (np.concatenate(partes) for partes in zip(*bloques))
+
+    n_hist = entrada["n_hist"]
+    return {
+        "muestras": n_muestras,
+        "semilla": semilla,
+        "percentiles": list(percentiles),
+        "edades": list(entrada["edades"]),
+        "anios": entrada["anios_total"][n_hist:].tolist(),
+        "dic_mat_efec_sp": _bandas(mat_efec_sp, percentiles),
+        "dic_mat_efec_cp": _bandas(mat_efec_cp, percentiles),
+        "suma_tot_byaño_dic_mat_efec_sp": _bandas(mat_efec_sp.sum(axis=1), percentiles),
+        "suma_tot_byaño_dic_mat_efec_cp": _bandas(mat_efec_cp.sum(axis=1), percentiles),
+        "aulas_by_edad": _bandas(aulas, percentiles),
+        "aulas_total": _bandas(aulas.sum(axis=-1), percentiles),
+        # Valores puntuales (sin remuestreo), para comparar con las bandas
+        "puntual": {
+            "suma_tot_byaño_dic_mat_efec_cp": puntual["mat_efec_cp"][:, 1:].sum(axis=0).astype(int).tolist(),
+            "aulas_total": int(puntual["aulas_necesarias"].sum()),
+        },
+    }
@@ -0,0 +1,49 @@
+# Pruebas de los almacenes de sesión
+
+import pytest
+
+from almacen import AlmacenMemoria, AlmacenSQLite, crear_almacen
+
+
+def test_memoria_descarta_la_sesion_menos_usada():
+    almacen = AlmacenMemoria(max_sesiones=2)
+    almacen.guardar("a", "datos", 1)
+    almacen.guardar("b", "datos", 2)
+    assert almacen.leer("a", "datos") == 1  # "a" pasa a ser la más reciente
+    almacen.guardar("c", "datos", 3)
+    assert almacen.leer("b", "datos") is None
+    assert almacen.leer("a", "datos") == 1
+    assert almacen.leer("c", "datos") == 3
+
+
+def test_memoria_devuelve_copias():
+    almacen = AlmacenMemoria()
+    almacen.guardar("a", "datos", {"edades": [12]})
+    almacen.leer("a", "datos")["edades"].append(13)
+    assert almacen.leer("a", "datos") == {"edades": [12]}
+
+
+def test_sqlite_ida_y_vuelta(tmp_path):
+    ruta = str(tmp_path / "sesiones.db")
+    datos = {"edades": [12, 13], "dic_pop_edad": {2020: {12: 5}}}
+    assert AlmacenSQLite(ruta).guardar("a", "datos", datos) > 0
+    # Otra instancia (otro proceso) lee lo mismo
+    otro = AlmacenSQLite(ruta)
+    assert otro.leer("a", "datos") == datos
+    assert otro.leer("a", "resultados") is None
+    assert otro.leer("b", "datos") is None
+
+
+def test_sqlite_descarta_sesiones_vencidas(tmp_path):
+    almacen = AlmacenSQLite(str(tmp_path / "sesiones.db"), ttl=-1)
+    almacen.guardar("a", "datos", 1)
+    # Cada escritura elimina lo que lleva más de `ttl` segundos sin uso
+    almacen.guardar("b", "datos", 2)
+    assert almacen.leer("a", "datos") is None
+
+
+def test_crear_almacen(tmp_path):
+    assert isinstance(crear_almacen("memoria"), AlmacenMemoria)
+    assert isinstance(crear_almacen(f"sqlite:{tmp_path / 's.db'}"), AlmacenSQLite)
+    with pytest.raises(ValueError):
+        crear_almacen("redis")
@@ -0,0 +1,91 @@
+# Pruebas de las rutas de la aplicación Flask
+
+import pytest
+
+import app as modulo_app
+from conftest import datos_defecto
+from modelo import ERROR_VALOR_GRANDE
+from proyeccion import ERROR_POBLACION_NULA
+
+
+@pytest.fixture
+def cliente():
+    return modulo_app.app.test_client()
+
+
+def con_sesion(cliente, datos):
+    """Guarda `datos` en la sesión del servidor de `cliente` y devuelve el id de sesión."""
+    with modulo_app.app.test_request_context("/"):
+        modulo_app.guardar_sesion("datos", datos)
+        sid = modulo_app.id_sesion()
+    with cliente.session_transaction() as sesion:
+        sesion["sid"] = sid
+    return sid
+
+
+def test_paso3_muestra_los_resultados(cliente):
+    con_sesion(cliente, datos_defecto())
+    respuesta = cliente.get("/paso3")
+    assert respuesta.status_code == 200
+    assert "máxima demanda de 1026 estudiantes" in respuesta.get_data(as_text=True)
+
+
+def test_paso3_con_poblacion_nula_muestra_el_error(cliente):
+    datos = datos_defecto()
+    for fila in datos["dic_pop_edad"].values():
+        fila[12] = 0
+    con_sesion(cliente, datos)
+    respuesta = cliente.get("/paso3")
+    assert respuesta.status_code == 200
+    assert ERROR_POBLACION_NULA in respuesta.get_data(as_text=True)
+
+
+@pytest.mark.parametrize("datos", [{}, {"edades": [12, 13]}])
+def test_paso3_sin_sesion_vuelve_al_paso1(cliente, datos):
+    con_sesion(cliente, datos)
+    respuesta = cliente.get("/paso3")
+    assert respuesta.status_code == 302
+    assert respuesta.headers["Location"].endswith("/")
+
+
+def test_api_resultados_con_etag(cliente):
+    con_sesion(cliente, datos_defecto())
+    assert cliente.get("/paso3").status_code == 200
+    with cliente.session_transaction() as sesion:
+        sid = sesion["sid"]
+    resultados = modulo_app.almacen.leer(sid, "resultados")
+    url = f"/api/resultados/{resultados.id}/dic_pop_total"
+
+    respuesta = cliente.get(url)
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()["valores"] == list(resultados["dic_pop_total"].values())
+    # La misma huella no cambia: el navegador revalida sin volver a descargar
+    repetida = cliente.get(url, headers={"If-None-Match": respuesta.headers["ETag"]})
+    assert repetida.status_code == 304
+
+    assert cliente.get(f"/api/resultados/{resultados.id}/no_existe").status_code == 404
+    assert cliente.get("/api/resultados/desconocido/dic_pop_total").status_code == 404
+
+
+def test_api_resultados_no_sirve_otras_sesiones(cliente):
+    con_sesion(cliente, datos_defecto())
+    assert cliente.get("/paso3").status_code == 200
+    with cliente.session_transaction() as sesion:
+        id_resultados = modulo_app.almacen.leer(sesion["sid"], "resultados").id
+    # Otro cliente, con su propia sesión, no puede leer esos resultados aunque estén en el cache
+    otro = modulo_app.app.test_client()
+    con_sesion(otro, datos_defecto())
+    assert otro.get(f"/api/resultados/{id_resultados}/dic_pop_total").status_code == 404
+
+
+def test_paso2_con_valor_desmedido_muestra_el_error(cliente):
+    datos = datos_defecto()
+    con_sesion(cliente, datos)
+    formulario = {"pob_censo1": datos["pob_censo1"], "pob_censo2": datos["pob_censo2"]}
+    for anio in datos["anios_hist"]:
+        for edad in datos["edades"]:
+            formulario[f"matricula_{anio}_{edad}"] = datos["dic_mat_by_anio"][anio][edad]
+    formulario[f"matricula_{datos['anios_hist'][0]}_12"] = "99999999999999999999"
+    respuesta = cliente.post("/paso2", data=formulario)
+    assert respuesta.status_code == 200
+    assert ERROR_VALOR_GRANDE in respuesta.get_data(as_text=True)
@@ -0,0 +1,17 @@
+# Pruebas del cache de resultados por huella de las entradas
+
+import json
+
+from cache import CacheResultados, calcular_resultados_con_cache
+from conftest import como_json
+from proyeccion import calcular_resultados
+
+
+def test_cache_devuelve_los_mismos_resultados(proyectos):
+    cache = CacheResultados()
+    primero = calcular_resultados_con_cache(proyectos[5], cache)
+    # Mismos datos con las claves de las tablas como texto (como llegan de la sesión JSON)
+    segundo = calcular_resultados_con_cache(json.loads(json.dumps(proyectos[5])), cache)
+    assert cache.estadisticas()["aciertos"] == 1
+    assert segundo.id == primero.id
+    assert como_json(segundo) == {**como_json(calcular_resultados(proyectos[5])), "id": primero.id}
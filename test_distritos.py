@@ -0,0 +1,42 @@
+# Pruebas del índice de series de distrito
+
+import copy
+
+from cache import CacheResultados, calcular_resultados_con_cache
+from conftest import como_json, datos_defecto
+from distritos import IndiceDistritos
+from proyeccion import calcular_resultados
+
+
+def colegios_del_distrito():
+    """Tres colegios del mismo distrito y censo, con distinto radio y matrícula."""
+    colegios = []
+    for i, radio in enumerate((3, 1.5, 6)):
+        datos = copy.deepcopy(datos_defecto())
+        datos["nombre_proyecto"] = f"Colegio {i}"
+        datos["radio_influencia"] = radio
+        for fila in datos["dic_mat_by_anio"].values():
+            for edad in fila:
+                fila[edad] += 7 * i
+        colegios.append(datos)
+    return colegios
+
+
+def test_indice_reutiliza_series_del_distrito():
+    indice = IndiceDistritos()
+    cache = CacheResultados()
+    for datos in colegios_del_distrito():
+        resultados = calcular_resultados_con_cache(datos, cache, indice)
+        esperado = calcular_resultados(copy.deepcopy(datos))
+        assert como_json(resultados) == {**como_json(esperado), "id": resultados.id}
+    # Solo el primer colegio calcula las series del distrito
+    assert (indice.fallos, indice.aciertos) == (1, 2)
+
+
+def test_indice_separa_distritos_con_distinto_censo():
+    indice = IndiceDistritos()
+    a, b = colegios_del_distrito()[:2]
+    b["pob_censo2"] += 1000
+    calcular_resultados_con_cache(a, CacheResultados(), indice)
+    calcular_resultados_con_cache(b, CacheResultados(), indice)
+    assert (indice.fallos, indice.aciertos) == (2, 0)
@@ -0,0 +1,41 @@
+# Pruebas del barrido de escenarios
+
+import copy
+import itertools
+
+import numpy as np
+import pytest
+
+from conftest import datos_defecto
+from escenarios import barrer, matriz_aulas, rango
+from proyeccion import calcular_resultados, entrada_desde_datos
+
+
+def test_barrido_coincide_con_calculos_individuales():
+    datos = datos_defecto()
+    radios, est_by_aula, turnos = [1.5, 3, 4.25], [25, 30, 40], [1, 2, 3]
+    cubo = barrer(entrada_desde_datos(datos), radios, est_by_aula, turnos)
+    secciones = np.reshape(cubo["secciones_total"], cubo["forma"])
+    aulas = np.reshape(cubo["aulas_necesarias"], cubo["forma"])
+    for (i, radio), (j, est), (k, turno) in itertools.product(enumerate(radios), enumerate(est_by_aula), enumerate(turnos)):
+        escenario = copy.deepcopy(datos)
+        escenario.update(radio_influencia=radio, est_by_aula=est, turnos=turno)
+        por_edad = calcular_resultados(escenario)["aulas_by_edad"]
+        assert secciones[i, j, k].tolist() == [por_edad[e]["secciones_total"] for e in cubo["edad"]]
+        assert aulas[i, j, k].tolist() == [por_edad[e]["aulas_necesarias"] for e in cubo["edad"]]
+    assert matriz_aulas(cubo, 2) == aulas[:, :, 1].sum(axis=-1).tolist()
+
+
+def test_barrido_ordena_y_quita_repetidos():
+    cubo = barrer(entrada_desde_datos(datos_defecto()), [3, 1, 3], [30], [2, 1])
+    assert (cubo["radio"], cubo["turnos"], cubo["forma"][:3]) == ([1.0, 3.0], [1, 2], [2, 1, 2])
+
+
+def test_barrido_valida_la_grilla():
+    entrada = entrada_desde_datos(datos_defecto())
+    with pytest.raises(ValueError):
+        barrer(entrada, [0, 3], [30], [1])
+    with pytest.raises(ValueError):
+        barrer(entrada, [], [30], [1])
+    with pytest.raises(ValueError):
+        rango(1, 2, 0)
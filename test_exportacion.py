@@ -0,0 +1,30 @@
+# Pruebas de la exportación de resultados en formato largo
+
+import copy
+
+import pandas as pd
+import pytest
+
+from exportacion import EscritorResultados, TABLAS_EDAD_ANIO, parquet_disponible
+from proyeccion import calcular_resultados
+
+
+@pytest.mark.parametrize("formato", ["csv", "parquet"])
+def test_exportar_resultados(proyectos, tmp_path, formato):
+    if formato == "parquet" and not parquet_disponible():
+        pytest.skip("pyarrow no está instalado")
+    ruta = tmp_path / f"resultados.{formato}"
+    calculados = {str(p["id"]): calcular_resultados(copy.deepcopy(p)) for p in proyectos[:8]}
+    # Grupos de 3 proyectos: el último grupo queda incompleto
+    with EscritorResultados(str(ruta), formato, proyectos_por_grupo=3) as escritor:
+        for id_proyecto, resultados in calculados.items():
+            escritor.escribir(id_proyecto, resultados)
+
+    leido = pd.read_csv(ruta, dtype={"proyecto": str}) if formato == "csv" else pd.read_parquet(ruta)
+    assert set(leido["proyecto"]) == set(calculados)
+    for id_proyecto, resultados in calculados.items():
+        propias = leido[leido["proyecto"] == id_proyecto]
+        for tabla in TABLAS_EDAD_ANIO:
+            filas = propias[propias["tabla"] == tabla]
+            exportada = {(int(e), int(a)): v for e, a, v in zip(filas["edad"], filas["anio"], filas["valor"])}
+            assert exportada == {(int(e), int(a)): float(v) for e, fila in resultados[tabla].items() for a, v in fila.items()}
@@ -0,0 +1,49 @@
+# Pruebas de la importación de tablas edad x año desde CSV/Parquet
+
+import io
+
+import pandas as pd
+import pytest
+
+from importacion import importar_tablas
+from modelo import TablaEdadAnio
+
+
+NOMBRES_TABLA = {"dic_pop_edad": "poblacion", "dic_mat_by_anio": "matricula", "dic_no_promv": "no_promovidos"}
+
+
+def tablas_en_formato_largo(proyectos):
+    filas = [
+        (str(p["id"]), NOMBRES_TABLA[tabla], anio, edad, valor)
+        for p in proyectos for tabla in NOMBRES_TABLA
+        for anio, fila in p[tabla].items() for edad, valor in fila.items()
+    ]
+    return pd.DataFrame(filas, columns=["proyecto", "tabla", "anio", "edad", "valor"])
+
+
+def verificar_importadas(importadas, proyectos):
+    assert set(importadas) == {str(p["id"]) for p in proyectos}
+    for p in proyectos:
+        for tabla in NOMBRES_TABLA:
+            assert importadas[str(p["id"])][tabla] == TablaEdadAnio.desde_dict(p[tabla])
+
+
+@pytest.mark.parametrize("tam_bloque", [13, 100_000])
+def test_importar_csv_por_bloques(proyectos, tam_bloque):
+    # Con bloques pequeños un mismo proyecto queda repartido entre varios bloques
+    csv = tablas_en_formato_largo(proyectos).to_csv(index=False)
+    verificar_importadas(importar_tablas(io.StringIO(csv), "csv", tam_bloque=tam_bloque), proyectos)
+
+
+def test_importar_csv_ancho_y_celdas_repetidas():
+    # Sin columna de proyecto; la última celda repetida gana
+    csv = "tabla,anio,12,13\nmatricula,2020,1,2\nmatricula,2021,3,4\nmatricula,2020,9,9\n"
+    tablas = importar_tablas(io.StringIO(csv), "csv", tam_bloque=1)
+    assert tablas[""]["dic_mat_by_anio"].a_dict() == {2020: {12: 9, 13: 9}, 2021: {12: 3, 13: 4}}
+
+
+def test_importar_parquet(proyectos, tmp_path):
+    pytest.importorskip("pyarrow")
+    ruta = tmp_path / "tablas.parquet"
+    tablas_en_formato_largo(proyectos).to_parquet(ruta, index=False)
+    verificar_importadas(importar_tablas(str(ruta), tam_bloque=50), proyectos)
@@ -0,0 +1,35 @@
+# Pruebas del recálculo incremental por etapas
+
+import numpy as np
+
+from conftest import como_json
+from incremental import EvaluadorIncremental
+from proyeccion import entrada_desde_datos, proyectar, resultados_desde_arrays
+
+
+def test_incremental_coincide_con_calculo_completo(proyectos):
+    # 40 ediciones de un solo campo sobre la misma sesión
+    rng = np.random.default_rng(3)
+    evaluador = EvaluadorIncremental()
+    entrada = entrada_desde_datos(proyectos[0])
+    for _ in range(40):
+        entrada = dict(entrada)
+        campo = rng.choice(["turnos", "radio", "est_by_aula", "matricula", "pob_censo", "area"])
+        if campo == "turnos":
+            entrada["turnos"] = np.asarray(int(rng.integers(1, 5)))
+        elif campo in ("radio", "est_by_aula", "area"):
+            entrada[campo] = np.asarray(float(entrada[campo]) * rng.uniform(0.5, 1.5))
+        else:
+            entrada[campo] = entrada[campo] * (1 + (rng.random(entrada[campo].shape) < 0.2))
+        arrays, _ = evaluador.proyectar("sesion", entrada)
+        assert como_json(resultados_desde_arrays(entrada, arrays)) == como_json(resultados_desde_arrays(entrada, proyectar(entrada)))
+    assert evaluador.etapas_reutilizadas > 0
+
+
+def test_cambiar_turnos_solo_recalcula_las_aulas(proyectos):
+    evaluador = EvaluadorIncremental()
+    entrada = entrada_desde_datos(proyectos[0])
+    evaluador.proyectar("sesion", entrada)
+    calculadas = evaluador.etapas_calculadas
+    evaluador.proyectar("sesion", {**entrada, "turnos": np.asarray(int(entrada["turnos"]) % 4 + 1)})
+    assert evaluador.etapas_calculadas - calculadas == 1
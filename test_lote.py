@@ -0,0 +1,46 @@
+# Pruebas de la evaluación en lote
+
+import json
+
+import pytest
+
+from conftest import como_json
+from lote import evaluar_lote, evaluar_lote_paralelo, fila_a_json
+from proyeccion import calcular_resultados
+
+
+def test_lote_coincide_con_calculo_individual(proyectos):
+    filas = evaluar_lote(proyectos)
+    assert [fila["error"] for fila in filas] == [None] * len(proyectos)
+    for proyecto, fila in zip(proyectos, filas):
+        assert fila["id"] == proyecto["id"]
+        assert json.loads(json.dumps(fila_a_json(fila)["resultados"])) == como_json(calcular_resultados(proyecto))
+
+
+@pytest.mark.parametrize("cambio", [
+    {"turnos": 0},
+    {"pob_censo1": -5},
+    {"est_by_aula": "a"},
+    {"dic_mat_by_anio": {2019: {12: -1}}},
+    {"dic_mat_by_anio": {2019: {12: "a"}}},
+    {"dic_mat_by_anio": {"2019": [1, 2]}},
+    {"dic_mat_by_anio": {"2019": 5}},
+])
+def test_lote_informa_datos_invalidos_por_proyecto(proyectos, cambio):
+    filas = evaluar_lote([{**proyectos[0], **cambio}, proyectos[1]])
+    assert filas[0]["resultados"] is None and filas[0]["error"].startswith("Datos inválidos")
+    assert filas[1]["error"] is None
+
+
+def test_lote_paralelo_coincide_con_lote(proyectos):
+    # Bloques pequeños: varios bloques por proceso, entregados en el orden de entrada
+    esperado = [fila_a_json(fila) for fila in evaluar_lote(proyectos)]
+    paralelo = [fila_a_json(fila) for fila in evaluar_lote_paralelo(proyectos, workers=2, tam_bloque=7)]
+    assert json.loads(json.dumps(paralelo)) == json.loads(json.dumps(esperado))
+
+
+def test_lote_paralelo_aisla_proyectos_invalidos(proyectos):
+    entrada = [proyectos[0], {**proyectos[1], "turnos": 0}, proyectos[2]]
+    filas = list(evaluar_lote_paralelo(entrada, workers=2, tam_bloque=1))
+    assert [fila["id"] for fila in filas] == [p["id"] for p in entrada]
+    assert [fila["error"] is None for fila in filas] == [True, False, True]
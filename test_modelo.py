@@ -0,0 +1,48 @@
+# Pruebas del modelo compacto: tablas edad×año y formato binario de resultados
+
+import copy
+import pickle
+
+import numpy as np
+import pytest
+
+from conftest import como_json, datos_defecto
+from modelo import ERROR_VALOR_GRANDE, INT32_MAX, Resultados, TablaEdadAnio
+from proyeccion import calcular_resultados
+
+
+def test_tabla_desde_dict_y_formulario():
+    tabla = TablaEdadAnio.desde_dict({"2020": {"12": "5", "13": None}, 2021: {12: 7}})
+    assert (tabla.edades, tabla.anios) == ((12, 13), (2020, 2021))
+    assert tabla.valores.dtype == np.int32
+    assert tabla.a_dict() == {2020: {12: 5, 13: 0}, 2021: {12: 7, 13: 0}}
+    formulario = {"matricula_2020_12": "5", "matricula_2021_12": "7", "matricula_2020_13": "x"}
+    assert TablaEdadAnio.desde_formulario(formulario, "matricula", [2020, 2021], [12, 13]) == tabla
+
+
+@pytest.mark.parametrize("valor", [INT32_MAX + 1, -(INT32_MAX + 1), 99999999999999999999, "99999999999999999999"])
+def test_valores_fuera_de_int32(valor):
+    with pytest.raises(ValueError, match=ERROR_VALOR_GRANDE):
+        TablaEdadAnio.desde_dict({2020: {12: valor}})
+    with pytest.raises(ValueError, match=ERROR_VALOR_GRANDE):
+        TablaEdadAnio.desde_formulario({"pop_edad_2020_12": valor}, "pop_edad", [2020], [12])
+
+
+def test_resultados_ida_y_vuelta_en_bytes(proyectos):
+    for proyecto in proyectos[:10]:
+        resultados = calcular_resultados(copy.deepcopy(proyecto))
+        resultados.id = f"proyecto-{proyecto['id']}"
+        for copia in (Resultados.desde_bytes(resultados.a_bytes()), pickle.loads(pickle.dumps(resultados))):
+            assert copia.id == resultados.id
+            assert copia.edades == resultados.edades and copia.anios == resultados.anios
+            assert como_json(copia) == como_json(resultados)
+
+
+def test_resultados_ida_y_vuelta_con_int64():
+    # Una tasa de crecimiento desmedida desborda int32: esos campos pasan a int64
+    datos = {**datos_defecto(), "pob_censo2": 10**9, "anio_f": 2040}
+    resultados = calcular_resultados(datos)
+    assert resultados.pop_total.dtype == np.int64
+    copia = Resultados.desde_bytes(resultados.a_bytes())
+    assert copia.pop_total.dtype == np.int64
+    assert como_json(copia) == como_json(resultados)
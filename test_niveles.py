@@ -0,0 +1,69 @@
+# Pruebas del cálculo combinado de varios niveles
+
+import copy
+
+import numpy as np
+import pytest
+
+from conftest import datos_defecto
+from niveles import OTRAS_EDADES, aulas_de_secciones, edades_de_niveles, niveles_de, tramos_por_nivel
+from proyeccion import calcular_resultados
+
+
+def primaria_y_secundaria():
+    """El proyecto por defecto como colegio de Primaria y Secundaria (edades 6 a 16)."""
+    rng = np.random.default_rng(5)
+    datos = datos_defecto()
+    edades = edades_de_niveles(niveles_de({"nivel": "Primaria y Secundaria"}))
+    datos.update(nivel="Primaria y Secundaria", edades=edades)
+    datos["dic_pop_edad"] = {a: {e: int(rng.integers(8_000, 12_000)) for e in edades} for a in (2007, 2017)}
+    datos["dic_mat_by_anio"] = {a: {e: int(rng.integers(150, 200)) for e in edades} for a in datos["anios_hist"]}
+    datos["dic_no_promv"] = {a: {e: int(rng.integers(0, 10)) for e in edades} for a in datos["anios_hist"]}
+    return datos
+
+
+def test_niveles_y_edades():
+    assert niveles_de({"nivel": "Primaria y Secundaria"}) == ["Primaria", "Secundaria"]
+    assert niveles_de({"niveles": ["Secundaria", "Inicial"]}) == ["Inicial", "Secundaria"]
+    assert niveles_de({"nivel": ""}) == ["Secundaria"]
+    assert edades_de_niveles(["Primaria", "Secundaria"]) == list(range(6, 17))
+    with pytest.raises(ValueError):
+        edades_de_niveles(["Inicial", "Secundaria"])
+    assert [nivel for nivel, _ in tramos_por_nivel([17, 11, 12])] == ["Primaria", "Secundaria", OTRAS_EDADES]
+    assert aulas_de_secciones(np.array([7, 6]), 2).tolist() == [4, 3]
+
+
+def test_aulas_por_nivel_primaria_y_secundaria():
+    datos = primaria_y_secundaria()
+    resultados = calcular_resultados(copy.deepcopy(datos))
+    por_nivel, por_edad = resultados["aulas_by_nivel"], resultados["aulas_by_edad"]
+    assert list(por_nivel) == ["Primaria", "Secundaria"]
+    assert por_nivel["Primaria"]["edades"] == list(range(6, 12))
+    assert por_nivel["Secundaria"]["edades"] == list(range(12, 17))
+    for nivel in por_nivel.values():
+        assert nivel["secciones_total"] == sum(por_edad[e]["secciones_total"] for e in nivel["edades"])
+        # Con los turnos del proyecto coincide con la suma de las aulas por edad
+        assert nivel["aulas_by_turnos"][datos["turnos"]] == sum(por_edad[e]["aulas_necesarias"] for e in nivel["edades"])
+        assert sorted(nivel["aulas_by_turnos"]) == list(range(1, datos["turnos"] + 1))
+
+
+def test_los_12_anios_vienen_de_la_cohorte_de_11():
+    # En el cálculo combinado los 12 años son una transición más (desde 11), no un primer
+    # grado: dependen de la matrícula de 11 años y no de la población de 12
+    datos = primaria_y_secundaria()
+    base = calcular_resultados(copy.deepcopy(datos))["dic_mat_efec_sp"][12][2024]
+
+    con_mas_matricula = copy.deepcopy(datos)
+    con_mas_matricula["dic_mat_by_anio"][2023][11] *= 2
+    assert calcular_resultados(con_mas_matricula)["dic_mat_efec_sp"][12][2024] > base
+
+    # Mayor crecimiento de la población de 12 años entre censos
+    con_mas_poblacion = copy.deepcopy(datos)
+    con_mas_poblacion["dic_pop_edad"][2007][12] //= 2
+    assert calcular_resultados(con_mas_poblacion)["dic_mat_efec_sp"][12][2024] == base
+
+    # Solo Secundaria: los 12 años son el primer grado y sí dependen de su población
+    secundaria = {**copy.deepcopy(con_mas_poblacion), "nivel": "Secundaria", "edades": list(range(12, 17))}
+    solo = copy.deepcopy(secundaria)
+    solo["dic_pop_edad"] = datos["dic_pop_edad"]
+    assert calcular_resultados(secundaria)["dic_mat_efec_sp"][12][2024] != calcular_resultados(solo)["dic_mat_efec_sp"][12][2024]
@@ -0,0 +1,30 @@
+# Pruebas del motor vectorizado contra el paso3 original
+
+import pytest
+
+from conftest import como_json, datos_defecto
+from proyeccion import ERROR_POBLACION_NULA, calcular_resultados
+
+
+def test_proyecto_defecto_coincide_con_paso3_original():
+    # Valores del paso3 anterior al motor vectorizado para el proyecto por defecto
+    resultados = como_json(calcular_resultados(datos_defecto()))
+    assert resultados["suma_tot_byaño_dic_mat_efec_cp"] == dict(zip(
+        map(str, range(2024, 2037)), [788, 835, 884, 907, 934, 945, 956, 967, 978, 990, 1002, 1014, 1026]))
+    assert resultados["suma_tot_byaño_dic_mat_efec_sp"] == dict(zip(
+        map(str, range(2024, 2037)), [739, 745, 760, 766, 781, 788, 797, 807, 817, 827, 838, 849, 860]))
+    assert resultados["max_suma_tot_byaño_dic_pop_potencial"] == 20856
+    assert resultados["tasa_poptotal"] == pytest.approx(0.02698095020549629, rel=1e-12)
+    assert resultados["prop_1g"] == pytest.approx(0.042803717335364526, rel=1e-12)
+    assert resultados["tasa_transicion"] == pytest.approx(
+        {"13": 0.9470352357393771, "14": 0.9061859685361999, "15": 0.9374673377793047, "16": 0.9514915302208318}, rel=1e-12)
+    assert resultados["aulas_by_edad"] == {str(e): {"secciones_total": 7, "aulas_necesarias": 4} for e in range(12, 17)}
+    assert resultados["dic_mat_efec_cp"]["12"]["2036"] == 210
+
+
+def test_poblacion_nula_del_primer_grado_con_matricula():
+    datos = datos_defecto()
+    for fila in datos["dic_pop_edad"].values():
+        fila[12] = 0
+    with pytest.raises(ZeroDivisionError, match=ERROR_POBLACION_NULA):
+        calcular_resultados(datos)
@@ -0,0 +1,58 @@
+# Pruebas de la tabla de referencia de tasas de crecimiento
+
+import pytest
+
+from conftest import datos_defecto
+from proyeccion import calcular_resultados
+from referencia import TablaReferencia, cargar_referencia, referencia
+
+
+@pytest.fixture
+def tabla():
+    return TablaReferencia(
+        ["15", "1501", "150101", "08"],
+        ["LIMA", "LIMA", "LIMA", "CUSCO"],
+        [0.01, 0.02, 0.03, 0.005],
+    )
+
+
+def test_buscar_usa_provincia_o_departamento_si_falta_el_distrito(tabla):
+    assert tabla.buscar("150101") == {"ubigeo": "150101", "nombre": "LIMA", "tic": 0.03}
+    assert tabla.buscar("150199")["ubigeo"] == "1501"
+    assert tabla.buscar("159999")["ubigeo"] == "15"
+    assert tabla.buscar("990101") is None
+    assert tabla.buscar("") is None
+
+
+def test_tasa_por_ubigeo_o_nombre_de_departamento(tabla):
+    assert tabla.tasa("080101") == 0.005
+    assert tabla.tasa(departamento=" cúsco ") == 0.005
+    # El ubigeo manda sobre el nombre; si no está, se usa el departamento
+    assert tabla.tasa("150101", "CUSCO") == 0.03
+    assert tabla.tasa("990101", "Cusco") == 0.005
+    assert tabla.tasa("990101", "Narnia") is None
+
+
+def test_tabla_versionada():
+    tabla = referencia()
+    assert tabla is referencia()
+    assert tabla.version and len(tabla) > 0
+    assert tabla.tasa(departamento="Amazonas") == pytest.approx(0.0024458725302197804)
+    with pytest.raises(ValueError):
+        tabla.tasas[0] = 1
+
+
+def test_ubigeos_repetidos(tmp_path):
+    ruta = tmp_path / "tasas.csv"
+    ruta.write_text("ubigeo,nombre,tic\n01,A,0.1\n01,B,0.2\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        cargar_referencia(str(ruta))
+
+
+def test_falta_un_censo_se_usa_la_tasa_de_referencia():
+    datos = datos_defecto()
+    datos.update(pob_censo1=0, tasa_referencia=0.015)
+    assert calcular_resultados(datos)["tasa_poptotal"] == pytest.approx(0.015)
+    # Sin tasa de referencia se mantiene el cálculo con los censos
+    datos.update(tasa_referencia=None)
+    assert calcular_resultados(datos)["tasa_poptotal"] == 0
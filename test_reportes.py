@@ -0,0 +1,94 @@
+# Pruebas de los informes PDF/XLSX
+
+import copy
+import io
+import re
+import zipfile
+import zlib
+from xml.etree import ElementTree
+
+import pytest
+
+from conftest import datos_defecto
+from proyeccion import calcular_resultados
+from reportes import generar_reportes, reporte
+
+
+def verificar_pdf(contenido):
+    """Comprueba la estructura del PDF (tabla xref y trailer) y devuelve el texto de sus flujos."""
+    assert contenido.startswith(b"%PDF-1.4\n") and contenido.endswith(b"%%EOF\n")
+    inicio_xref = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", contenido).group(1))
+    assert contenido[inicio_xref:].startswith(b"xref\n")
+    cantidad = int(re.match(rb"xref\n0 (\d+)\n", contenido[inicio_xref:]).group(1))
+    posiciones = re.findall(rb"(\d{10}) 00000 n \n", contenido[inicio_xref:])
+    assert len(posiciones) == cantidad - 1
+    for i, posicion in enumerate(posiciones, 1):
+        assert contenido[int(posicion):].startswith(b"%d 0 obj\n" % i)
+    assert b"/Size %d /Root 1 0 R" % cantidad in contenido
+    texto = b""
+    for flujo in re.finditer(rb"/Length (\d+) /Filter /FlateDecode >>\nstream\n", contenido):
+        fin = flujo.end() + int(flujo.group(1))
+        assert contenido[fin:].startswith(b"\nendstream")
+        texto += zlib.decompress(contenido[flujo.end():fin])
+    return texto
+
+
+def verificar_xlsx(contenido):
+    """Comprueba que el XLSX es un zip con XML bien formado y devuelve los nombres de hoja."""
+    with zipfile.ZipFile(io.BytesIO(contenido)) as z:
+        assert z.testzip() is None
+        for nombre in z.namelist():
+            ElementTree.fromstring(z.read(nombre))
+        libro = ElementTree.fromstring(z.read("xl/workbook.xml"))
+    return [hoja.get("name") for hoja in libro.iter("{http://schemas.openxmlformats.org/spreadsheetml/2006/main}sheet")]
+
+
+@pytest.fixture(scope="module")
+def calculado():
+    datos = datos_defecto()
+    return datos, calcular_resultados(copy.deepcopy(datos))
+
+
+def test_pdf_valido(calculado):
+    datos, resultados = calculado
+    contenido = reporte(datos, resultados, "pdf")
+    assert b"Colegio XYZ" in verificar_pdf(contenido)
+    pypdf = pytest.importorskip("pypdf")
+    lector = pypdf.PdfReader(io.BytesIO(contenido))
+    assert len(lector.pages) >= 1
+    assert "Colegio XYZ" in lector.pages[0].extract_text()
+
+
+def test_xlsx_valido(calculado):
+    datos, resultados = calculado
+    contenido = reporte(datos, resultados, "xlsx")
+    assert verificar_xlsx(contenido)[0] == "Resumen"
+    openpyxl = pytest.importorskip("openpyxl")
+    libro = openpyxl.load_workbook(io.BytesIO(contenido))
+    totales = list(libro["Totales por año"].iter_rows(min_row=2, values_only=True))
+    assert [fila[0] for fila in totales] == list(resultados["suma_tot_byaño_dic_mat_efec_cp"])
+    assert [fila[-1] for fila in totales] == list(resultados["suma_tot_byaño_dic_mat_efec_cp"].values())
+
+
+def test_formato_desconocido(calculado):
+    with pytest.raises(ValueError):
+        reporte(*calculado, "docx")
+
+
+def test_generar_reportes_en_lote(proyectos, tmp_path):
+    # Dos proyectos con el mismo id (nombres de archivo distintos) y uno inválido
+    entrada = [proyectos[0], {**proyectos[1], "id": proyectos[0]["id"]}, {**proyectos[2], "turnos": 0}]
+    avances = []
+    indice = generar_reportes(entrada, str(tmp_path), workers=2, avance=lambda hechos, total: avances.append((hechos, total)))
+
+    assert [item["id"] for item in indice] == [p["id"] for p in entrada]
+    assert indice[2]["archivos"] == [] and indice[2]["error"].startswith("Datos inválidos")
+    archivos = indice[0]["archivos"] + indice[1]["archivos"]
+    assert len(set(archivos)) == 4
+    for item in indice[:2]:
+        assert item["error"] is None
+        pdf, xlsx = item["archivos"]
+        verificar_pdf((tmp_path / pdf).read_bytes())
+        verificar_xlsx((tmp_path / xlsx).read_bytes())
+    assert avances[0] == (0, 6) and avances[-1] == (6, 6)
+    assert [h for h, _ in avances] == sorted(h for h, _ in avances)
@@ -0,0 +1,34 @@
+# Pruebas de la simulación de Monte Carlo
+
+import numpy as np
+
+from conftest import datos_defecto
+from proyeccion import entrada_desde_datos, ratios_de_transicion
+from simulacion import remuestrear_media_geometrica, simular
+
+
+def test_bandas_ordenadas_y_reproducibles():
+    entrada = entrada_desde_datos(datos_defecto())
+    bandas = simular(entrada, n_muestras=600, semilla=11, tam_bloque=250)
+    for tabla in ("dic_mat_efec_cp", "suma_tot_byaño_dic_mat_efec_sp", "aulas_by_edad"):
+        p5, p50, p95 = (np.asarray(bandas[tabla][p]) for p in ("p5", "p50", "p95"))
+        assert np.all(p5 <= p50) and np.all(p50 <= p95)
+    assert bandas["aulas_total"]["p5"] <= bandas["aulas_total"]["p95"]
+    # Misma semilla, mismas bandas, aunque los bloques corran en otros procesos
+    assert simular(entrada, n_muestras=600, semilla=11, tam_bloque=250) == bandas
+    assert simular(entrada, n_muestras=600, semilla=11, tam_bloque=250, workers=2) == bandas
+    assert simular(entrada, n_muestras=600, semilla=12, tam_bloque=250) != bandas
+
+
+def test_remuestreo_comparte_los_anios_entre_edades():
+    entrada = entrada_desde_datos(datos_defecto())
+    ratios, mascara = ratios_de_transicion(entrada["matricula"], entrada["n_hist"])
+    puntual = np.full(ratios.shape[0], -1.0)
+    # Una muestra con todos los años y otras que repiten un solo año
+    indices = np.array([[0, 1, 2, 3], [1, 1, 1, 1], [3, 3, 3, 3]])
+    tasas = remuestrear_media_geometrica(ratios, mascara, indices, puntual)
+    completa = np.exp(np.log(ratios).mean(axis=-1))
+    np.testing.assert_allclose(tasas, [completa, ratios[:, 1], ratios[:, 3]])
+    # Si ningún año sorteado es válido se conserva el valor puntual
+    sin_validos = remuestrear_media_geometrica(ratios, np.zeros_like(mascara), indices[:1], puntual)
+    np.testing.assert_array_equal(sin_validos, [puntual])
@@ -0,0 +1,81 @@
+# Pruebas de la cola de trabajos en segundo plano
+
+import json
+import sqlite3
+import time
+
+import pytest
+
+import trabajos
+from conftest import datos_defecto
+from trabajos import ColaTrabajos
+
+
+@pytest.fixture
+def cola(tmp_path):
+    cola = ColaTrabajos(str(tmp_path), intervalo=0.01, plazo=60, latido=0.05)
+    yield cola
+    cola.detener()
+
+
+def esperar(cola, id_trabajo, limite=30):
+    """Estado del trabajo cuando termina (o falla)."""
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        estado = cola.estado(id_trabajo)
+        if estado["estado"] in ("terminado", "error"):
+            return estado
+        time.sleep(0.01)
+    raise AssertionError(f"El trabajo {id_trabajo} no terminó")
+
+
+def test_encolar_y_terminar(cola):
+    id_trabajo = cola.encolar("escenarios", {"datos": datos_defecto(), "radio": [3], "est_by_aula": [30], "turnos": [2]})
+    estado = esperar(cola, id_trabajo)
+    assert (estado["estado"], estado["progreso"], estado["error"]) == ("terminado", 1.0, None)
+    with open(cola.ruta_resultado(id_trabajo, "escenarios"), encoding="utf-8") as f:
+        assert json.load(f)["aulas_total"] == [20]
+
+
+def test_trabajo_con_error(cola):
+    with pytest.raises(ValueError):
+        cola.encolar("desconocido", {})
+    id_trabajo = cola.encolar("escenarios", {"datos": datos_defecto(), "radio": [0], "est_by_aula": [30], "turnos": [2]})
+    estado = esperar(cola, id_trabajo)
+    assert estado["estado"] == "error" and estado["error"].startswith("ValueError")
+    assert cola.estado("no_existe") is None
+
+
+def test_latido_durante_el_trabajo(cola, monkeypatch):
+    # Un trabajo que no informa avance sigue latiendo
+    monkeypatch.setitem(trabajos.TIPOS, "lento", (lambda parametros, avance, salida: time.sleep(0.3), ".json"))
+    id_trabajo = cola.encolar("lento", {})
+    assert esperar(cola, id_trabajo)["estado"] == "terminado"
+    iniciado, latido = cola._conexion().execute("SELECT iniciado, latido FROM trabajos WHERE id = ?", (id_trabajo,)).fetchone()
+    assert latido - iniciado >= 0.1
+
+
+def test_recuperar_solo_trabajos_sin_latido(cola):
+    ahora = time.time()
+    con = cola._conexion()
+    for id_trabajo, latido in (("abandonado", ahora - 120), ("vivo", ahora - 1)):
+        # Ambos empezaron hace mucho más que el plazo
+        con.execute(
+            "INSERT INTO trabajos (id, tipo, estado, parametros, hechos, total, creado, iniciado, latido) "
+            "VALUES (?, 'lote', 'en_curso', NULL, 0, 0, ?, ?, ?)",
+            (id_trabajo, ahora - 7200, ahora - 7200, latido),
+        )
+    cola._recuperar()
+    assert cola.estado("abandonado")["estado"] == "error"
+    assert cola.estado("vivo")["estado"] == "en_curso"
+
+
+def test_agrega_el_latido_a_colas_anteriores(tmp_path):
+    with sqlite3.connect(tmp_path / "trabajos.sqlite3") as con:
+        con.execute(
+            "CREATE TABLE trabajos (id TEXT PRIMARY KEY, tipo TEXT, estado TEXT, parametros BLOB, hechos INTEGER, "
+            "total INTEGER, creado REAL, iniciado REAL, terminado REAL, error TEXT)"
+        )
+    cola = ColaTrabajos(str(tmp_path))
+    columnas = {fila[1] for fila in cola._conexion().execute("PRAGMA table_info(trabajos)")}
+    assert "latido" in columnas
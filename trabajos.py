@@ -0,0 +1,305 @@
+# Cola de trabajos en segundo plano (lotes, simulaciones, barridos)
+#
+# Los trabajos largos no se ejecutan dentro de la petición: se guardan en una cola en
+# SQLite y los atienden hilos despachadores que delegan el cálculo pesado a pools de
+# procesos (evaluar_lote_paralelo, simular con workers). La petición solo recibe el id
+# del trabajo y consulta el avance. Varios procesos web (o `python trabajos.py` como
+# proceso aparte) pueden compartir el mismo archivo: cada trabajo se toma una sola vez.
+#
+# Los resultados se escriben como archivos en el directorio de la cola (JSON Lines para
+# los lotes, zip para los informes, JSON para el resto).
+
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+import zipfile
+
+from escenarios import barrer
+from lote import evaluar_lote_paralelo, fila_a_json
+from proyeccion import entrada_desde_datos
+from reportes import generar_reportes
+from registro import registrar
+from simulacion import simular
+
+
+# ##################################
+# TIPOS DE TRABAJO
+# ##################################
+# Cada tipo recibe (parametros, avance, ruta de salida) y escribe su resultado en la
+# ruta. avance(hechos, total) informa el progreso.
+def _trabajo_lote(parametros, avance, salida):
+    proyectos = parametros["proyectos"]
+    total = len(proyectos)
+    avance(0, total)
+    with open(salida, "w", encoding="utf-8") as f:
+        filas = evaluar_lote_paralelo(proyectos, parametros.get("workers"), parametros.get("tam_bloque", 250))
+        for hechos, fila in enumerate(filas, 1):
+            f.write(json.dumps(fila_a_json(fila), ensure_ascii=False) + "\n")
+            avance(hechos, total)
+
+
+def _trabajo_simulacion(parametros, avance, salida):
+    avance(0, 1)
+    bandas = simular(entrada_desde_datos(parametros["datos"]), parametros.get("muestras", 10_000),
+                     parametros.get("semilla", 0), workers=parametros.get("workers"))
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(bandas, f, ensure_ascii=False)
+    avance(1, 1)
+
+
+def _trabajo_escenarios(parametros, avance, salida):
+    avance(0, 1)
+    cubo = barrer(entrada_desde_datos(parametros["datos"]), parametros["radio"], parametros["est_by_aula"], parametros["turnos"])
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(cubo, f, ensure_ascii=False)
+    avance(1, 1)
+
+
+def _trabajo_reportes(parametros, avance, salida):
+    # Un informe por colegio, empaquetados en un zip junto con un índice (y los errores)
+    proyectos = parametros["proyectos"]
+    with tempfile.TemporaryDirectory() as directorio:
+        indice = generar_reportes(proyectos, directorio, tuple(parametros.get("formatos", ("pdf", "xlsx"))),
+                                  parametros.get("workers"), avance)
+        with zipfile.ZipFile(salida, "w", zipfile.ZIP_DEFLATED) as z:
+            z.writestr("indice.json", json.dumps(indice, ensure_ascii=False, indent=1))
+            for item in indice:
+                for archivo in item["archivos"]:
+                    z.write(os.path.join(directorio, archivo), archivo)
+
+
+TIPOS = {
+    "lote": (_trabajo_lote, ".jsonl"),
+    "simulacion": (_trabajo_simulacion, ".json"),
+    "escenarios": (_trabajo_escenarios, ".json"),
+    "reportes": (_trabajo_reportes, ".zip"),
+}
+
+
+class ColaTrabajos:
+    """Cola de trabajos en un archivo SQLite, con hilos despachadores en este proceso.
+
+    Estados: pendiente, en_curso, terminado o error.
+    Los despachadores se inician con `iniciar()` (o al encolar el primer trabajo), y
+    `iniciar()` reemplaza a los que hayan terminado. Mientras un trabajo corre, su
+    proceso actualiza `latido` cada `latido` segundos; los trabajos en_curso sin latido
+    desde hace más de `plazo` segundos (su proceso terminó sin cerrarlos) pasan a error.
+    Se descartan los trabajos terminados hace más de `ttl` segundos, con sus archivos.
+    """
+
+    def __init__(self, directorio=None, hilos=1, ttl=24 * 3600, intervalo=0.5, plazo=300, latido=30):
+        self.directorio = directorio or os.path.join(tempfile.gettempdir(), "trabajos_demanda")
+        os.makedirs(self.directorio, exist_ok=True)
+        self.ruta = os.path.join(self.directorio, "trabajos.sqlite3")
+        self.hilos = hilos
+        self.ttl = ttl
+        self.intervalo = intervalo
+        self.plazo = plazo
+        self.latido = latido
+        self._local = threading.local()
+        self._despachadores = []
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+        with self._conexion() as con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS trabajos ("
+                "id TEXT PRIMARY KEY, tipo TEXT, estado TEXT, parametros BLOB, hechos INTEGER, total INTEGER, "
+                "creado REAL, iniciado REAL, terminado REAL, error TEXT, latido REAL)"
+            )
+            con.execute("CREATE INDEX IF NOT EXISTS idx_estado ON trabajos (estado, creado)")
+            # Colas creadas antes de que existiera el latido
+            if "latido" not in {fila[1] for fila in con.execute("PRAGMA table_info(trabajos)")}:
+                try:
+                    con.execute("ALTER TABLE trabajos ADD COLUMN latido REAL")
+                except sqlite3.OperationalError:
+                    pass  # Otro proceso la agregó al mismo tiempo
+
+    def _conexion(self):
+        # Una conexión por hilo
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.ruta, timeout=10, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            self._local.con = con
+        return con
+
+    def ruta_resultado(self, id_trabajo, tipo):
+        return os.path.join(self.directorio, f"{id_trabajo}{TIPOS[tipo][1]}")
+
+    def encolar(self, tipo, parametros):
+        """Guarda un trabajo pendiente y devuelve su id. Lanza ValueError si el tipo no existe."""
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo de trabajo desconocido: {tipo}")
+        id_trabajo = uuid.uuid4().hex
+        self._conexion().execute(
+            "INSERT INTO trabajos (id, tipo, estado, parametros, hechos, total, creado) VALUES (?, ?, 'pendiente', ?, 0, 0, ?)",
+            (id_trabajo, tipo, pickle.dumps(parametros, protocol=pickle.HIGHEST_PROTOCOL), time.time()),
+        )
+        self.iniciar()
+        return id_trabajo
+
+    def estado(self, id_trabajo):
+        """Estado, avance y tiempo restante estimado de un trabajo, o None si no existe."""
+        fila = self._conexion().execute(
+            "SELECT tipo, estado, hechos, total, creado, iniciado, terminado, error FROM trabajos WHERE id = ?", (id_trabajo,)
+        ).fetchone()
+        if fila is None:
+            return None
+        tipo, estado, hechos, total, creado, iniciado, terminado, error = fila
+        eta = None
+        if estado == "en_curso" and hechos and total:
+            eta = round((time.time() - iniciado) / hechos * (total - hechos), 1)
+        return {
+            "id": id_trabajo,
+            "tipo": tipo,
+            "estado": estado,
+            "hechos": hechos,
+            "total": total,
+            "progreso": round(hechos / total, 4) if total else (1.0 if estado == "terminado" else 0.0),
+            "eta_segundos": eta,
+            "creado": creado,
+            "iniciado": iniciado,
+            "terminado": terminado,
+            "error": error,
+        }
+
+    # ##################################
+    # DESPACHO
+    # ##################################
+    def _tomar(self):
+        # Toma el trabajo pendiente más antiguo; la transacción IMMEDIATE evita que dos
+        # procesos tomen el mismo
+        con = self._conexion()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            fila = con.execute(
+                "SELECT id, tipo, parametros FROM trabajos WHERE estado = 'pendiente' ORDER BY creado LIMIT 1"
+            ).fetchone()
+            if fila is not None:
+                ahora = time.time()
+                con.execute("UPDATE trabajos SET estado = 'en_curso', iniciado = ?, latido = ? WHERE id = ?", (ahora, ahora, fila[0]))
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        return fila
+
+    def _escribir(self, sql, parametros, intentos=5):
+        # Escritura que reintenta si la base está bloqueada por otro proceso
+        for intento in range(intentos):
+            try:
+                return self._conexion().execute(sql, parametros)
+            except sqlite3.OperationalError:
+                if intento == intentos - 1:
+                    raise
+                time.sleep(self.intervalo * (intento + 1))
+
+    def _latir(self, id_trabajo, fin):
+        # Hilo aparte: el trabajo sigue vivo aunque pase mucho tiempo sin informar avance
+        while not fin.wait(self.latido):
+            try:
+                self._conexion().execute("UPDATE trabajos SET latido = ? WHERE id = ?", (time.time(), id_trabajo))
+            except sqlite3.OperationalError:
+                pass
+
+    def _ejecutar(self, id_trabajo, tipo, parametros):
+        con = self._conexion()
+        ultimo = [0.0]
+
+        def avance(hechos, total):
+            # Como máximo una escritura cada `intervalo` segundos (y siempre la última).
+            # El avance es informativo: si la base está bloqueada, se omite.
+            ahora = time.monotonic()
+            if hechos == total or ahora - ultimo[0] >= self.intervalo:
+                ultimo[0] = ahora
+                try:
+                    con.execute("UPDATE trabajos SET hechos = ?, total = ?, latido = ? WHERE id = ?", (hechos, total, time.time(), id_trabajo))
+                except sqlite3.OperationalError:
+                    pass
+
+        fin = threading.Event()
+        latido = threading.Thread(target=self._latir, args=(id_trabajo, fin), daemon=True, name="latido-trabajo")
+        latido.start()
+        try:
+            funcion, _ = TIPOS[tipo]
+            funcion(pickle.loads(parametros), avance, self.ruta_resultado(id_trabajo, tipo))
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            fin.set()
+        if error is None:
+            self._escribir("UPDATE trabajos SET estado = 'terminado', terminado = ? WHERE id = ?", (time.time(), id_trabajo))
+        else:
+            self._escribir("UPDATE trabajos SET estado = 'error', error = ?, terminado = ? WHERE id = ?", (error, time.time(), id_trabajo))
+
+    def _recuperar(self):
+        # Trabajos en_curso de procesos que terminaron sin cerrarlos (por ejemplo, un
+        # worker reciclado): sin latido reciente, pasan a error para que quien consulta
+        # vea un estado final. Un trabajo largo de otro proceso vivo sigue latiendo.
+        limite = time.time() - self.plazo
+        self._escribir(
+            "UPDATE trabajos SET estado = 'error', error = ?, terminado = ? "
+            "WHERE estado = 'en_curso' AND COALESCE(latido, iniciado) < ?",
+            ("Trabajo interrumpido: el proceso que lo atendía terminó sin completarlo.", time.time(), limite),
+        )
+
+    def _limpiar(self):
+        con = self._conexion()
+        limite = time.time() - self.ttl
+        viejos = con.execute("SELECT id, tipo FROM trabajos WHERE estado IN ('terminado', 'error') AND terminado < ?", (limite,)).fetchall()
+        for id_trabajo, tipo in viejos:
+            try:
+                os.remove(self.ruta_resultado(id_trabajo, tipo))
+            except (OSError, KeyError):
+                pass
+        con.execute("DELETE FROM trabajos WHERE estado IN ('terminado', 'error') AND terminado < ?", (limite,))
+
+    def atender(self, detener=None):
+        """Atiende la cola hasta que se active `detener` (un threading.Event)."""
+        detener = detener or self._detener
+        recuperado = None
+        while not detener.is_set():
+            # Un error (base bloqueada, trabajo corrupto) se registra y el despachador sigue
+            try:
+                # Trabajos abandonados: al empezar y luego una vez por cada latido
+                if recuperado is None or time.monotonic() - recuperado >= self.latido:
+                    self._recuperar()
+                    recuperado = time.monotonic()
+                fila = self._tomar()
+                if fila is None:
+                    self._limpiar()
+                    detener.wait(self.intervalo)
+                    continue
+                self._ejecutar(*fila)
+            except Exception as e:
+                registrar(logging.ERROR, "trabajos.despacho", {"error": f"{type(e).__name__}: {e}", "excepcion": traceback.format_exc()})
+                detener.wait(self.intervalo)
+
+    def iniciar(self):
+        """Inicia los hilos despachadores de este proceso que falten (o hayan terminado)."""
+        with self._lock:
+            self._despachadores = [hilo for hilo in self._despachadores if hilo.is_alive()]
+            for _ in range(self.hilos - len(self._despachadores)):
+                hilo = threading.Thread(target=self.atender, daemon=True, name="despachador-trabajos")
+                hilo.start()
+                self._despachadores.append(hilo)
+
+    def detener(self):
+        self._detener.set()
+        for hilo in self._despachadores:
+            hilo.join()
+
+
+if __name__ == "__main__":
+    # Proceso dedicado a la cola (por ejemplo, un "worker" aparte del servidor web):
+    #   TRABAJOS_DIR=/ruta/compartida python trabajos.py
+    ColaTrabajos(os.environ.get("TRABAJOS_DIR"), ttl=float(os.environ.get("TRABAJOS_TTL", 24 * 3600)),
+                 plazo=float(os.environ.get("TRABAJOS_PLAZO", 300))).atender()